@@ -0,0 +1,4 @@
+# benchmarks/__init__.py
+"""故障树分析基准测试：合成模型生成器与运行器，运行方式见 runner 模块说明"""
+from .generators import GENERATORS, SWEEPS, Model
+from .runner import run_suite, compare
@@ -0,0 +1,143 @@
+# benchmarks/generators.py
+"""
+合成故障树生成器
+
+每个生成器接收规模参数 size 与随机种子 seed，返回 Model：
+多行定义文本（与 GUI 逻辑表达式格式相同，每行只含一种运算符，两种解析器均可解析）、
+顶事件名称和底事件概率。同一 (生成器, size, seed) 总是得到相同的模型。
+"""
+import itertools
+import random
+from typing import Callable, Dict, List, NamedTuple
+
+
+class Model(NamedTuple):
+    name: str
+    size: int
+    seed: int
+    top_event: str
+    lines: List[str]
+    events: Dict[str, float]
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
+def _events(names, rng):
+    return {name: round(rng.uniform(1e-4, 0.2), 6) for name in names}
+
+
+def random_dag(size: int, seed: int = 0) -> Model:
+    """随机相干 DAG：size 个门逐层引用较低层的门或底事件，子节点被多个门共享"""
+    rng = random.Random(seed)
+    basics = [f"E{i}" for i in range(max(size, 4))]
+    pool = list(basics)
+    lines = []
+    for i in range(size - 1, -1, -1):
+        name = "TOP" if i == 0 else f"G{i}"
+        children = rng.sample(pool, min(len(pool), rng.randint(2, 4)))
+        operator = " and " if rng.random() < 0.35 else " or "
+        lines.append(f"{name} = {operator.join(children)}")
+        pool.append(name)
+    lines.reverse()
+    return Model("random_dag", size, seed, "TOP", lines, _events(basics, rng))
+
+
+def deep_chain(size: int, seed: int = 0) -> Model:
+    """深链：每个门引用下一个门和一个底事件，与/或交替，深度为 size"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(size):
+        name = "TOP" if i == 0 else f"G{i}"
+        child = f"G{i + 1}" if i + 1 < size else f"E{size}"
+        operator = " and " if i % 2 else " or "
+        lines.append(f"{name} = {child}{operator}E{i}")
+    return Model("deep_chain", size, seed, "TOP", lines, _events([f"E{i}" for i in range(size + 1)], rng))
+
+
+def wide_or(size: int, seed: int = 0) -> Model:
+    """宽或门：顶事件直接由 size 个底事件相或"""
+    rng = random.Random(seed)
+    basics = [f"E{i}" for i in range(size)]
+    return Model("wide_or", size, seed, "TOP", [f"TOP = {' or '.join(basics)}"], _events(basics, rng))
+
+
+def and_of_or(size: int, seed: int = 0, width: int = 3) -> Model:
+    """与-或爆炸：size 个或门（各含 width 个独立底事件）相与，最小割集数为 width ** size"""
+    rng = random.Random(seed)
+    groups = [f"O{i}" for i in range(size)]
+    lines = [f"TOP = {' and '.join(groups)}"]
+    basics = []
+    for i, group in enumerate(groups):
+        members = [f"E{i}_{j}" for j in range(width)]
+        basics.extend(members)
+        lines.append(f"{group} = {' or '.join(members)}")
+    return Model("and_of_or", size, seed, "TOP", lines, _events(basics, rng))
+
+
+def k_of_n(size: int, seed: int = 0, k: int = 3) -> Model:
+    """k/n 表决门按组合展开：size 个底事件中任意 k 个同时发生，共 C(size, k) 个与门"""
+    rng = random.Random(seed)
+    basics = [f"E{i}" for i in range(size)]
+    combos = list(itertools.combinations(basics, min(k, size)))
+    gates = [f"C{i}" for i in range(len(combos))]
+    lines = [f"TOP = {' or '.join(gates)}"]
+    lines.extend(f"{gate} = {' and '.join(combo)}" for gate, combo in zip(gates, combos))
+    return Model("k_of_n", size, seed, "TOP", lines, _events(basics, rng))
+
+
+def vote(size: int, seed: int = 0, k: int = 3) -> Model:
+    """与 k_of_n 相同的逻辑，直接写作 VOTE(k, ...) 表决门"""
+    rng = random.Random(seed)
+    basics = [f"E{i}" for i in range(size)]
+    return Model("vote", size, seed, "TOP", [f"TOP = VOTE({min(k, size)}, {', '.join(basics)})"],
+                 _events(basics, rng))
+
+
+def shared_events(size: int, seed: int = 0) -> Model:
+    """大量共享：size 个与门只引用约 sqrt(size) 个底事件，再由两层或门汇总"""
+    rng = random.Random(seed)
+    basics = [f"E{i}" for i in range(max(int(size ** 0.5), 3))]
+    gates = [f"A{i}" for i in range(size)]
+    lines = [f"{gate} = {' and '.join(rng.sample(basics, 2))}" for gate in gates]
+    middles = []
+    for start in range(0, size, 10):
+        middle = f"M{start // 10}"
+        middles.append(middle)
+        lines.append(f"{middle} = {' or '.join(gates[start:start + 10])}")
+    lines.insert(0, f"TOP = {' or '.join(middles)}")
+    return Model("shared_events", size, seed, "TOP", lines, _events(basics, rng))
+
+
+GENERATORS: Dict[str, Callable[..., Model]] = {
+    "random_dag": random_dag,
+    "deep_chain": deep_chain,
+    "wide_or": wide_or,
+    "and_of_or": and_of_or,
+    "k_of_n": k_of_n,
+    "vote": vote,
+    "shared_events": shared_events,
+}
+
+# 各生成器的规模扫描，按从小到大排列（运行器依此跳过已超时的阶段）
+SWEEPS = {
+    "quick": {
+        "random_dag": [10, 30, 60],
+        "deep_chain": [100, 500, 2000],
+        "wide_or": [100, 1000, 5000],
+        "and_of_or": [4, 6, 8],
+        "k_of_n": [8, 12, 16],
+        "vote": [8, 12, 16],
+        "shared_events": [50, 200, 800],
+    },
+    "full": {
+        "random_dag": [10, 30, 60, 100, 200],
+        "deep_chain": [100, 500, 2000, 10000, 100000],
+        "wide_or": [100, 1000, 10000, 100000],
+        "and_of_or": [4, 6, 8, 10, 12],
+        "k_of_n": [8, 12, 16, 20, 25],
+        "vote": [8, 12, 16, 20, 25],
+        "shared_events": [50, 200, 800, 3200, 12800],
+    },
+}
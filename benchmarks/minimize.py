@@ -0,0 +1,87 @@
+# benchmarks/minimize.py
+"""
+割集最小化基准：比较原来的集合两两比较与位集索引化最小化（fta_bitset）
+
+候选由若干个或门相与展开得到（未化简），各或门从共享的底事件池中取 width 个事件：
+池较小时大量候选重复或互相包含，池较大时候选几乎都是最小割集（两两比较的最坏情况）。
+两两比较超过 --budget 秒时停止，按已处理的比例以平方关系外推总耗时。
+
+    python -m benchmarks.minimize --candidates 100000 200000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+from fta_bitset import EventIndex, minimize
+
+
+def candidate_family(count: int, pool: int, width: int = 6, seed: int = 0) -> List[List[str]]:
+    rng = random.Random(seed)
+    events = [f"E{i}" for i in range(pool)]
+    candidates = [[]]
+    while len(candidates) < count:
+        group = rng.sample(events, min(width, pool))
+        candidates = [cut_set + [event] for cut_set in candidates for event in group][:count]
+    return candidates
+
+
+def pairwise_minimize(candidates: List[List[str]], budget: float) -> Dict[str, Any]:
+    """原 find_minimal_cut_sets 的做法：转为 set、按长度排序后与已保留的每个割集做 issubset"""
+    start = time.perf_counter()
+    all_cut_sets = sorted((set(cs) for cs in candidates), key=len)
+    minimal_sets = []
+    for done, cs in enumerate(all_cut_sets):
+        if done % 1000 == 0 and time.perf_counter() - start > budget:
+            elapsed = time.perf_counter() - start
+            fraction = done / len(all_cut_sets)
+            return {"seconds": elapsed / fraction ** 2, "complete": False, "processed": fraction}
+        if not any(existing.issubset(cs) for existing in minimal_sets):
+            minimal_sets.append(cs)
+    return {"seconds": time.perf_counter() - start, "complete": True, "kept": len(minimal_sets)}
+
+
+def bitset_minimize(candidates: List[List[str]]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    index = EventIndex()
+    kept = [index.decode(mask) for mask in minimize([index.mask(cs) for cs in candidates])]
+    return {"seconds": time.perf_counter() - start, "complete": True, "kept": len(kept)}
+
+
+def run(counts: List[int], pools: List[int], budget: float, seed: int = 0, log=sys.stderr) -> List[Dict[str, Any]]:
+    rows = []
+    for count in counts:
+        for pool in pools:
+            candidates = candidate_family(count, pool, seed=seed)
+            row = {"candidates": len(candidates), "pool": pool,
+                   "pairwise": pairwise_minimize(candidates, budget), "bitset": bitset_minimize(candidates)}
+            row["speedup"] = row["pairwise"]["seconds"] / max(row["bitset"]["seconds"], 1e-9)
+            rows.append(row)
+            if log:
+                pairwise = row["pairwise"]
+                estimate = "" if pairwise["complete"] else f"（外推，完成 {pairwise['processed']:.1%}）"
+                print(f"候选={row['candidates']:>8} 事件池={pool:>5} 保留={row['bitset']['kept']:>7} "
+                      f"两两比较={pairwise['seconds']:9.2f}s{estimate} 位集={row['bitset']['seconds']:7.2f}s "
+                      f"加速={row['speedup']:.0f}x", file=log)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.minimize", description="割集最小化基准")
+    parser.add_argument("--candidates", type=int, nargs="+", default=[100000, 200000], help="候选割集数")
+    parser.add_argument("--pools", type=int, nargs="+", default=[20, 2000], help="底事件池大小")
+    parser.add_argument("--budget", type=float, default=30.0, help="两两比较的耗时上限（秒），超过后外推")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="结果 JSON 文件")
+    args = parser.parse_args(argv)
+    rows = run(args.candidates, args.pools, args.budget, args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+# benchmarks/runner.py
+"""
+基准测试运行器
+
+对每个 (生成器, 规模) 依次运行各分析阶段，记录耗时、tracemalloc 峰值内存和割集数量，
+结果写为 JSON。--compare 与基线文件比较，耗时或内存超过阈值、割集数量不一致时视为回归。
+
+    python -m benchmarks --suite quick -o bench.json
+    python -m benchmarks --suite quick --compare bench_baseline.json
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import platform
+import queue as queue_module
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from fta_engine import compile_tree, ProbabilityEvaluator, minimal_cut_sets
+from fta_parser import parse_event_definitions, parse_strict_expression
+
+from .generators import GENERATORS, SWEEPS, Model
+
+try:
+    import fta_api
+except ImportError:  # 未安装 FastAPI 时跳过 API 阶段
+    fta_api = None
+
+try:
+    from fta_new import FaultTreeApp
+except ImportError:  # 没有 tkinter / graphviz 时跳过 GUI 阶段
+    FaultTreeApp = None
+
+
+class _HeadlessRoot:
+    def after(self, delay, callback):
+        callback()
+
+
+class _HeadlessApp:
+    """只提供 FaultTreeApp.calculate_results 用到的属性，用于在无界面环境下运行 GUI 的迭代算法"""
+
+    def __init__(self, definitions):
+        self.root = _HeadlessRoot()
+        self.event_definitions = definitions
+        self.event_hierarchy = {}
+        self.node_probabilities = {}
+        self.live_model = None
+        self.analysis_results = {}
+
+    def update_results(self, *args):
+        pass
+
+    def show_error(self, message):
+        raise RuntimeError(message)
+
+
+def resolve_definitions(top_event: str, definitions: Dict[str, Dict]) -> Dict:
+    """把引用已定义事件的 BASIC 子节点替换为定义本身，得到 API 函数可直接处理的门结构（共享子树共用同一对象）"""
+    # 显式栈的后序遍历，深链模型不受递归深度限制
+    resolved: Dict[int, Dict] = {}
+
+    def target(node):
+        if node['type'] == 'BASIC' and node['name'] in definitions:
+            return definitions[node['name']]
+        return node
+
+    root = definitions[top_event]
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if id(node) in resolved:
+            continue
+        if node['type'] == 'BASIC':
+            resolved[id(node)] = node
+        elif not expanded:
+            stack.append((node, True))
+            stack.extend((target(child), False) for child in reversed(node.get('children', [])))
+        else:
+            children = [resolved[id(target(child))] for child in node.get('children', [])]
+            resolved[id(node)] = {**node, 'children': children}
+    return resolved[id(root)]
+
+
+class _Context:
+    """阶段之间传递的中间结果"""
+
+    def __init__(self, model: Model):
+        self.model = model
+        self.definitions = None
+        self.tree = None
+        self.resolved = None
+        self.api_probability = None
+
+
+def _phases(ctx: _Context) -> List[tuple]:
+    """返回 [(阶段名, 函数, 取割集数量的函数或 None)]，函数返回值会保存在上下文中"""
+    model = ctx.model
+
+    def parse_gui():
+        ctx.definitions = parse_event_definitions(model.text)
+
+    def parse_strict():
+        parse_event_definitions(model.text, parse_strict_expression)
+
+    def compile_phase():
+        ctx.tree = compile_tree(ctx.definitions[model.top_event], ctx.definitions)
+
+    phases = [
+        ("parse_gui", parse_gui, None),
+        ("parse_strict", parse_strict, None),
+        ("compile", compile_phase, None),
+        ("engine_probability", lambda: ProbabilityEvaluator(ctx.tree, model.events).top_probability(), None),
+        ("engine_cut_sets", lambda: minimal_cut_sets(ctx.tree), len),
+    ]
+    if fta_api is not None:
+        def api_probability():
+            ctx.resolved = resolve_definitions(model.top_event, ctx.definitions)
+            ctx.api_probability = fta_api.calculate_probability(ctx.resolved, model.events)
+
+        phases += [
+            ("api_probability", api_probability, None),
+            ("api_cut_sets", lambda: fta_api.find_minimal_cut_sets(ctx.resolved), len),
+            ("api_importance",
+             lambda: fta_api.calculate_importance(ctx.api_probability, ctx.resolved, model.events), None),
+        ]
+    if FaultTreeApp is not None:
+        def gui_calculate_results():
+            app = _HeadlessApp(ctx.definitions)
+            FaultTreeApp.calculate_results(app, [model.top_event], model.events, [ctx.definitions[model.top_event]],
+                                           ctx.tree)
+            return app.analysis_results["minimal_cut_sets"]
+
+        phases.append(("gui_calculate_results", gui_calculate_results, len))
+    return phases
+
+
+def _measure(func: Callable[[], Any], repeat: int, memory: bool) -> Dict[str, Any]:
+    """计时取 repeat 次的最小值；峰值内存在单独一次运行中测量，避免 tracemalloc 开销计入耗时"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    record = {"seconds": best, "result": result}
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            record["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return record
+
+
+# 其余阶段依赖这些阶段的中间结果，即使被跳过也要在子进程中执行（不计时）
+PREREQUISITES = {"parse_gui", "compile", "api_probability"}
+
+
+def _run_model(name: str, size: int, seed: int, repeat: int, memory: bool, skip, queue) -> None:
+    """子进程入口：依次运行各阶段并通过队列报告 ("start", 阶段) 与 ("done", 结果行)"""
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    model = GENERATORS[name](size, seed)
+    ctx = _Context(model)
+    for phase, func, count in _phases(ctx):
+        if phase in skip:
+            if phase in PREREQUISITES:
+                func()
+            continue
+        row = {"generator": name, "size": size, "seed": seed, "phase": phase,
+               "lines": len(model.lines), "events": len(model.events)}
+        queue.put(("start", phase))
+        try:
+            measured = _measure(func, repeat, memory)
+        except (Exception, RecursionError) as e:
+            row.update(status="error", error=f"{type(e).__name__}: {str(e)[:200]}")
+            queue.put(("done", row))
+            if phase in PREREQUISITES:
+                break
+            continue
+        row.update(status="ok", seconds=measured["seconds"])
+        if "peak_bytes" in measured:
+            row["peak_bytes"] = measured["peak_bytes"]
+        if count is not None:
+            row["cut_sets"] = count(measured["result"])
+        if phase == "compile":
+            row["nodes"] = len(ctx.tree)
+        queue.put(("done", row))
+    queue.put(("finished", None))
+
+
+def run_suite(suite: str = "quick", generators: Optional[List[str]] = None, seed: int = 0, repeat: int = 1,
+              memory: bool = True, max_seconds: float = 10.0, timeout: float = 60.0,
+              log=sys.stderr) -> List[Dict[str, Any]]:
+    """
+    运行规模扫描，每个模型在独立子进程中运行。
+
+    单个阶段超过 timeout 秒未完成时终止子进程并记为 timeout，其余阶段在新的子进程中继续；
+    某阶段在较小规模下超过 max_seconds、超时或失败时，同一生成器更大规模的该阶段直接标记为 skipped。
+    """
+    results = []
+    for name in generators or list(SWEEPS[suite]):
+        stopped: Dict[str, str] = {}
+        for size in SWEEPS[suite][name]:
+            for phase, reason in stopped.items():
+                results.append({"generator": name, "size": size, "seed": seed, "phase": phase,
+                                "status": "skipped", "reason": reason})
+            skip = set(stopped)
+            finished = False
+            while not finished:
+                queue = multiprocessing.Queue()
+                process = multiprocessing.Process(target=_run_model,
+                                                  args=(name, size, seed, repeat, memory, skip, queue))
+                process.start()
+                current = None
+                while True:
+                    try:
+                        kind, payload = queue.get(timeout=timeout)
+                    except queue_module.Empty:
+                        if process.is_alive() or current is None:
+                            status, detail = "timeout", f"超过 {timeout} 秒未完成"
+                        else:
+                            status, detail = "error", f"子进程异常退出 (exitcode={process.exitcode})"
+                        process.terminate()
+                        process.join()
+                        if current is None:
+                            finished = True
+                            break
+                        row = {"generator": name, "size": size, "seed": seed, "phase": current,
+                               "status": status, "error": detail}
+                        results.append(row)
+                        _log_row(row, log)
+                        skip.add(current)
+                        stopped[current] = f"{current} 在规模 {size} 时{'超时' if status == 'timeout' else '失败'}"
+                        if current in PREREQUISITES:
+                            finished = True
+                        break
+                    if kind == "start":
+                        current = payload
+                    elif kind == "done":
+                        current = None
+                        skip.add(payload["phase"])
+                        results.append(payload)
+                        _log_row(payload, log)
+                        if payload["status"] != "ok":
+                            stopped[payload["phase"]] = f"{payload['phase']} 在规模 {size} 时失败"
+                        elif payload["seconds"] > max_seconds:
+                            stopped[payload["phase"]] = f"{payload['phase']} 在规模 {size} 时超过 {max_seconds} 秒"
+                    else:
+                        process.join()
+                        finished = True
+                        break
+    return results
+
+
+def _log_row(row, log):
+    if not log:
+        return
+    prefix = f"{row['generator']:>14} {row['size']:>7} {row['phase']:<22}"
+    if row["status"] != "ok":
+        print(f"{prefix} {row['status']}: {row.get('error', '')}", file=log)
+        return
+    extra = f" 割集={row['cut_sets']}" if "cut_sets" in row else ""
+    memory_text = f" 峰值={row['peak_bytes'] / 1e6:.1f}MB" if "peak_bytes" in row else ""
+    print(f"{prefix} {row['seconds'] * 1000:10.2f}ms{memory_text}{extra}", file=log)
+
+
+def _key(row):
+    return row["generator"], row["size"], row["seed"], row["phase"]
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], threshold: float = 0.25,
+            min_seconds: float = 0.005) -> List[Dict[str, Any]]:
+    """
+    与基线比较，返回回归列表。
+
+    耗时与峰值内存超过基线 (1 + threshold) 倍视为回归，耗时差小于 min_seconds 时忽略（避免计时噪声）；
+    割集数量变化、基线中成功而本次失败也视为回归。
+    """
+    base = {_key(row): row for row in baseline}
+    regressions = []
+    for row in results:
+        old = base.get(_key(row))
+        if old is None or old.get("status") != "ok":
+            continue
+        if row.get("status") != "ok":
+            if row.get("status") == "error":
+                regressions.append({**_describe(row), "metric": "status", "baseline": "ok", "current": row["error"]})
+            continue
+        if row["seconds"] > old["seconds"] * (1 + threshold) and row["seconds"] - old["seconds"] > min_seconds:
+            regressions.append({**_describe(row), "metric": "seconds", "baseline": old["seconds"],
+                                "current": row["seconds"], "ratio": row["seconds"] / max(old["seconds"], 1e-12)})
+        if "peak_bytes" in row and "peak_bytes" in old and row["peak_bytes"] > old["peak_bytes"] * (1 + threshold) \
+                and row["peak_bytes"] - old["peak_bytes"] > 64 * 1024:
+            regressions.append({**_describe(row), "metric": "peak_bytes", "baseline": old["peak_bytes"],
+                                "current": row["peak_bytes"], "ratio": row["peak_bytes"] / max(old["peak_bytes"], 1)})
+        if "cut_sets" in old and row.get("cut_sets") != old["cut_sets"]:
+            regressions.append({**_describe(row), "metric": "cut_sets", "baseline": old["cut_sets"],
+                                "current": row.get("cut_sets")})
+    return regressions
+
+
+def _describe(row):
+    return {"generator": row["generator"], "size": row["size"], "phase": row["phase"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="故障树分析基准测试")
+    parser.add_argument("--suite", choices=sorted(SWEEPS), default="quick", help="规模扫描方案")
+    parser.add_argument("--generator", action="append", choices=sorted(GENERATORS),
+                        help="只运行指定生成器，可重复")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="每个阶段重复次数，耗时取最小值")
+    parser.add_argument("--no-memory", action="store_true", help="不测量峰值内存")
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="单阶段耗时上限，超过后跳过更大规模")
+    parser.add_argument("--timeout", type=float, default=60.0, help="单阶段超时秒数，超时后终止并记为 timeout")
+    parser.add_argument("-o", "--output", help="结果 JSON 文件")
+    parser.add_argument("--compare", help="基线结果 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=0.25, help="回归阈值（相对增幅）")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.suite, args.generator, args.seed, args.repeat, not args.no_memory, args.max_seconds,
+                        args.timeout)
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "suite": args.suite,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for item in regressions:
+            ratio = f" ({item['ratio']:.2f}x)" if "ratio" in item else ""
+            print(f"回归: {item['generator']} size={item['size']} {item['phase']} {item['metric']}: "
+                  f"{item['baseline']} -> {item['current']}{ratio}", file=sys.stderr)
+        print(f"共 {len(regressions)} 项回归", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
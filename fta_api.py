@@ -5,149 +5,228 @@
 本模块负责处理所有与FTA相关的后端逻辑与API接口。
 它提供了一个专业的分析工具，用于对复杂系统的故障逻辑进行定性和定量评估。
 """
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Response
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Set
+from typing import List, Dict, Any, Set, Optional
+from collections import OrderedDict
+import os
 import re
+import threading
+import uuid
+import numpy as np
 import pandas as pd
 import io
-from pyparsing import infixNotation, opAssoc, Word, alphas, alphanums, ParseException
+
+from fta_engine import (compile_tree, compile_tops, gate_label, fussell_vesely, minimal_cut_sets,
+                        top_minimal_cut_sets, cut_set_probability, evaluate_arrays, ProbabilityEvaluator)
+from fta_bdd import build_bdd, build_bdd_tops, top_prime_implicants
+from fta_spill import bounded_minimal_cut_sets
+from fta_parallel import parallel_top_minimal_cut_sets
+from fta_ccf import CCFGroup, expand_groups, ccf_contributions
+from fta_reliability import validate_model, time_grid, unavailability_matrix, propagate, mean_value
+from fta_uncertainty import validate_distribution, QuantileTransform, propagate_samples, summarize
+from fta_sensitivity import sweep_levels, run_sweep, tornado
+from fta_approx import select_method
+from fta_parser import robust_parse_logic_expression, parse_event_definitions
+from fta_layout import layered_layout, estimate_label_width, LAYER_HEIGHT
+from fta_metrics import MetricsRegistry, NULL_TIMER, new_timer
+from fta_progress import ProgressToken, AnalysisCancelled, NULL_PROGRESS
 
 router = APIRouter()
 
+# 设置环境变量 FTA_API_METRICS=0 可关闭跨请求的指标汇总（请求中的 include_diagnostics 仍然有效）
+METRICS_ENABLED = os.environ.get("FTA_API_METRICS", "1") != "0"
+# 请求给出 memory_budget_mb 时，割集生成的溢出文件写入该目录（缺省为系统临时目录）
+SPILL_DIR = os.environ.get("FTA_SPILL_DIR") or None
+metrics = MetricsRegistry()
 
-def setup_parser():
-    event = Word(alphas, alphanums + "_-")
-    operator = [("and", 2, opAssoc.LEFT), ("or", 2, opAssoc.LEFT)]
-    parser = infixNotation(event, operator)
-    return parser
 
+def calculate_probability(gate: Dict, events: Dict[str, float]) -> float:
+    # 在编译后的DAG上按拓扑序计算，每个节点只计算一次，不使用递归；NOT/XOR 按独立性假设，
+    # 非相干树的精确概率由 BDD 计算
+    return ProbabilityEvaluator(compile_tree(gate), events).top_probability()
 
-boolean_parser = setup_parser()
 
+def find_minimal_cut_sets(gate: Dict, timer=NULL_TIMER, tree=None, progress=NULL_PROGRESS) -> List[Set[str]]:
+    # 在编译后的DAG上按拓扑序生成，每个门的割集以位集表示并即时化简（见 fta_engine.minimal_cut_sets）
+    minimal_sets = [set(cut_set) for cut_set in minimal_cut_sets(tree or compile_tree(gate), progress=progress)]
+    timer.count("cut_sets_kept", len(minimal_sets))
+    return minimal_sets
 
-def convert_parsed_to_dict(parsed_list: list) -> Dict[str, Any]:
-    if isinstance(parsed_list, str):
-        return {"type": "BASIC", "name": parsed_list}
-    if len(parsed_list) >= 3:
-        op, op_type = parsed_list[-2], parsed_list[-2].upper()
-        right = convert_parsed_to_dict(parsed_list[-1])
-        left = convert_parsed_to_dict(parsed_list[:-2])
-        if left.get("type") == op_type:
-            return {"type": op_type, "children": [*left["children"], right]}
-        else:
-            return {"type": op_type, "children": [left, right]}
-    elif len(parsed_list) == 1:
-        return convert_parsed_to_dict(parsed_list[0])
-    raise ValueError(f"无效的解析结构: {parsed_list}")
 
+def calculate_importance(top_prob: float, gate_structure: Dict, base_events: Dict[str, float],
+                         minimal_cut_sets: Optional[List[Set[str]]] = None) -> Dict[str, float]:
+    if top_prob == 0:
+        return {event: 0 for event in base_events}
+    if minimal_cut_sets is None:
+        minimal_cut_sets = find_minimal_cut_sets(gate_structure)
+    # 每个割集只遍历一次，累加到其包含的事件上，耗时与割集总大小成正比
+    return fussell_vesely(minimal_cut_sets, base_events, top_prob)
 
-def robust_parse_logic_expression(expr_str: str) -> Dict[str, Any]:
-    try:
-        parsed_result = boolean_parser.parseString(expr_str, parseAll=True)[0].asList()
-        return convert_parsed_to_dict(parsed_result)
-    except ParseException as e:
-        raise ValueError(f"逻辑表达式语法错误: {e}")
-    except Exception as e:
-        raise ValueError(f"解析表达式时发生未知错误: {e}")
 
+def _graph_node_style(gate_type: str, name: str, events: Dict, k: int = 0, n: int = 0) -> Dict[str, str]:
+    if gate_type == 'BASIC':
+        prob = events.get(name, 0.0)
+        return {'label': f"{name}\nP={prob:.4f}", 'shape': 'box', 'color': 'lightcoral'}
+    return {'label': gate_label(gate_type, k, n), 'shape': 'ellipse', 'color': 'lightyellow'}
 
-def calculate_probability(gate: Dict, events: Dict[str, float]) -> float:
-    if gate['type'] == 'BASIC':
-        return events.get(gate['name'], 0.0)
-    elif gate['type'] == 'OR':
-        p = 1.0
-        for child in gate.get('children', []): p *= (1 - calculate_probability(child, events))
-        return 1 - p
-    elif gate['type'] == 'AND':
-        p = 1.0
-        for child in gate.get('children', []): p *= calculate_probability(child, events)
-        return p
-    return 0.0
-
-
-def find_minimal_cut_sets(gate: Dict) -> List[Set[str]]:
-    def find_sets(sub_gate):
-        if sub_gate['type'] == 'BASIC':
-            return [[sub_gate['name']]]
-        elif sub_gate['type'] == 'OR':
-            cut_sets = []
-            for child in sub_gate.get('children', []): cut_sets.extend(find_sets(child))
-            return cut_sets
-        elif sub_gate['type'] == 'AND':
-            from itertools import product
-            child_cut_sets = [find_sets(child) for child in sub_gate.get('children', [])]
-            if not child_cut_sets: return []
-            result = [sum(combo, []) for combo in list(product(*child_cut_sets))]
-            return result
-        return []
-
-    all_cut_sets = [set(cs) for cs in find_sets(gate)]
-    all_cut_sets.sort(key=len)
-    minimal_sets = []
-    for cs in all_cut_sets:
-        is_minimal = True
-        for existing in minimal_sets:
-            if existing.issubset(cs): is_minimal = False; break
-        if is_minimal: minimal_sets.append(cs)
-    return minimal_sets
 
+def _top_node_ids(count: int) -> List[str]:
+    """顶事件节点 id：第一个为 'TOP'，其余为 'TOP1'、'TOP2'..."""
+    return ['TOP' if i == 0 else f'TOP{i}' for i in range(count)]
 
-def calculate_importance(top_prob: float, gate_structure: Dict, base_events: Dict[str, float]) -> Dict[str, float]:
-    if top_prob == 0:
-        return {event: 0 for event in base_events}
-    minimal_cut_sets = find_minimal_cut_sets(gate_structure)
-    importance = {}
-    for event, prob in base_events.items():
-        cut_sets_with_event = [cs for cs in minimal_cut_sets if event in cs]
-        prob_sum_of_cut_sets = 0
-        for cs in cut_sets_with_event:
-            p_cut_set = 1.0
-            for item in cs: p_cut_set *= base_events.get(item, 0)
-            prob_sum_of_cut_sets += p_cut_set
-        fv_importance = prob_sum_of_cut_sets / top_prob if top_prob > 0 else 0
-        importance[event] = fv_importance
-    return importance
-
-
-def generate_graph_json(top_event: str, events: Dict, gate_structure: Dict) -> Dict:
-    nodes, edges, node_counter = [], [], {'count': 0}
-
-    def add_node(parent_id, gate):
-        node_id = f"node{node_counter['count']}";
-        node_counter['count'] += 1
-        node_data = {'id': node_id}
-        if gate['type'] == 'BASIC':
-            prob = events.get(gate['name'], 0.0)
-            node_data['label'] = f"{gate['name']}\nP={prob:.4f}";
-            node_data['shape'] = 'box';
-            node_data['color'] = 'lightcoral'
-        else:
-            node_data['label'] = "或门 (OR)" if gate['type'] == 'OR' else "与门 (AND)";
-            node_data['shape'] = 'ellipse';
-            node_data['color'] = 'lightyellow'
-        nodes.append(node_data)
-        if parent_id: edges.append({'from': parent_id, 'to': node_id})
-        if 'children' in gate:
-            for child in gate['children']: add_node(node_id, child)
-        return node_id
-
-    top_node_id = 'TOP'
-    nodes.append({'id': top_node_id, 'label': f'顶事件: {top_event}', 'shape': 'rectangle', 'color': 'lightblue'})
-    add_node(top_node_id, gate_structure)
+
+def generate_graph_json(top_event: str, events: Dict, gate_structure: Dict, expanded: bool = False) -> Dict:
+    """
+    生成前端渲染用的节点与边。
+
+    默认每个门和底事件只输出一次，被多个父节点引用时为每个父节点各添加一条边，
+    输出规模与DAG大小成正比；expanded=True 时保持旧行为，逐次展开共享子树。
+    """
+    return generate_tops_graph_json([top_event], events, [gate_structure], expanded=expanded)
+
+
+def generate_tops_graph_json(top_events: List[str], events: Dict, gates: List[Dict],
+                             definitions: Optional[Dict[str, Dict]] = None, tree=None,
+                             expanded: bool = False) -> Dict:
+    """
+    多个顶事件共用一张图：每个顶事件一个 TOP 节点，共享的门与底事件只输出一次。
+
+    definitions 为多行定义解析出的 {事件名: 门结构}；tree 为已编译的 compile_tops 结果，缺省时重新编译。
+    """
+    definitions = definitions or {}
+    top_ids = _top_node_ids(len(top_events))
+    nodes = [{'id': top_id, 'label': f'顶事件: {name}', 'shape': 'rectangle', 'color': 'lightblue'}
+             for top_id, name in zip(top_ids, top_events)]
+
+    if not expanded:
+        tree = tree or compile_tops(gates, definitions)
+        for idx in range(len(tree) - 1, -1, -1):
+            nodes.append({'id': f"node{idx}", **_graph_node_style(tree.types[idx], tree.names[idx], events,
+                                                                  tree.k[idx], len(tree.children[idx]))})
+        edges = [{'from': top_id, 'to': f"node{root}"} for top_id, root in zip(top_ids, tree.roots)]
+        edges.extend({'from': f"node{parent}", 'to': f"node{child}"} for parent, child in tree.edges())
+        return {'nodes': nodes, 'edges': edges}
+
+    def resolve(node):
+        if node['type'] == 'BASIC' and node.get('name') in definitions:
+            return definitions[node['name']]
+        return node
+
+    # 显式栈的先序遍历，节点编号与逐层递归展开的顺序相同
+    edges, stack = [], [(top_id, resolve(gate)) for top_id, gate in reversed(list(zip(top_ids, gates)))]
+    while stack:
+        parent_id, gate = stack.pop()
+        node_id = f"node{len(nodes) - len(top_ids)}"
+        nodes.append({'id': node_id, **_graph_node_style(gate['type'], gate.get('name'), events,
+                                                         gate.get('k', 0), len(gate.get('children', [])))})
+        edges.append({'from': parent_id, 'to': node_id})
+        stack.extend((node_id, resolve(child)) for child in reversed(gate.get('children', [])))
     return {'nodes': nodes, 'edges': edges}
 
 
+LAYOUT_CACHE_SIZE = 64
+_layout_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_layout_cache_lock = threading.Lock()
+
+
+def compute_graph_layout(tree, base_hash: Optional[str] = None, timer=NULL_TIMER,
+                         progress=NULL_PROGRESS) -> Dict[str, Any]:
+    """
+    在编译后的DAG上计算分层布局，按结构哈希缓存，仅概率变化时直接复用。
+
+    base_hash 为上一次分析的结构哈希；若其布局仍在缓存中，结构哈希相同的子树沿用原坐标，
+    只对改动部分重新排布（增量布局）。
+    """
+    node_hashes = tree.node_hashes()
+    structure_hash = tree.structure_hash(node_hashes)
+    with _layout_cache_lock:
+        layout = _layout_cache.get(structure_hash)
+        if layout is not None:
+            _layout_cache.move_to_end(structure_hash)
+            timer.count("layout_cache_hit")
+            return layout
+        timer.count("layout_cache_miss")
+        base = _layout_cache.get(base_hash) if base_hash else None
+
+    # 宽度只按结构估算（概率固定占位），保证仅概率变化时布局不变
+    widths = [estimate_label_width(_graph_node_style(node_type, name, {}, k, len(kids))['label'])
+              for node_type, name, k, kids in zip(tree.types, tree.names, tree.k, tree.children)]
+    if base is not None:
+        coords = layered_layout(tree.children, widths, sweeps=2,
+                                initial_x=[base['x_by_hash'].get(h) for h in node_hashes], progress=progress)
+    else:
+        coords = layered_layout(tree.children, widths, progress=progress)
+
+    # 顶事件节点位于各自根门正上方，其余节点整体下移一层
+    positions = {f"node{idx}": (x, y + LAYER_HEIGHT) for idx, (x, y) in enumerate(coords)}
+    for top_id, root in zip(_top_node_ids(len(tree.roots)), tree.roots):
+        positions[top_id] = (coords[root][0], 0.0)
+    layout = {'positions': positions, 'x_by_hash': {h: coords[idx][0] for idx, h in enumerate(node_hashes)}}
+
+    with _layout_cache_lock:
+        _layout_cache[structure_hash] = layout
+        while len(_layout_cache) > LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+    return layout
+
+
+class ReliabilityModel(BaseModel):
+    kind: str = Field(..., description="模型类型：constant、exponential、repairable 或 periodic。", example="repairable")
+    probability: Optional[float] = Field(None, description="constant 模型的固定概率。")
+    failure_rate: Optional[float] = Field(None, description="失效率 λ（每单位时间）。", example=1e-4)
+    repair_rate: Optional[float] = Field(None, description="repairable 模型的修复率 μ。", example=0.05)
+    test_interval: Optional[float] = Field(None, description="periodic 模型的试验间隔 τ。", example=720)
+    first_test: Optional[float] = Field(None, description="periodic 模型的首次试验时间，缺省为 τ。")
+
+
+class UncertaintyDistribution(BaseModel):
+    kind: str = Field(..., description="分布类型：lognormal、beta 或 uniform。", example="lognormal")
+    error_factor: Optional[float] = Field(None, description="对数正态分布的误差因子 EF = P95 / P50。", example=3)
+    median: Optional[float] = Field(None, description="对数正态分布的中位数；缺省时以 probability 作为均值。")
+    alpha: Optional[float] = Field(None, description="beta 分布参数 α。")
+    beta: Optional[float] = Field(None, description="beta 分布参数 β。")
+    low: Optional[float] = Field(None, description="均匀分布下限。")
+    high: Optional[float] = Field(None, description="均匀分布上限。")
+
+
 class BaseEvent(BaseModel):
     event: str = Field(..., description="底事件的唯一名称。", example="电源失效")
-    probability: float = Field(..., description="该底事件发生的概率。", example=0.001)
+    probability: Optional[float] = Field(None, description="该底事件发生的概率；只给出 reliability 时仅可用于时变分析。",
+                                         example=0.001)
+    reliability: Optional[ReliabilityModel] = Field(None, description="时变不可用度模型，供 /fta/unavailability 使用。")
+    distribution: Optional[UncertaintyDistribution] = Field(None, description="概率的不确定性分布，供 /fta/uncertainty 使用。")
+
+
+class CCFGroupSpec(BaseModel):
+    name: str = Field(..., description="共因失效组名称，共因事件命名为 \"组名[成员,...]\"。", example="泵组")
+    members: List[str] = Field(..., description="组内成员底事件（至少 2 个，每个底事件只能属于一个组）。")
+    model: str = Field(..., description="参数模型：beta 或 alpha。", example="beta")
+    beta: Optional[float] = Field(None, description="beta 因子模型的 β。", example=0.05)
+    alphas: Optional[List[float]] = Field(None, description="alpha 因子模型的 α_1...α_m（非交错试验），个数等于成员数。")
+    total_probability: Optional[float] = Field(None, description="成员总失效概率 Qt，缺省取成员概率的平均值。")
 
 
 class FTAnalysisRequest(BaseModel):
-    top_event: str = Field(..., description="顶事件的名称。", example="系统故障")
-    logic_expression: str = Field(..., description="描述故障树逻辑关系的完整表达式。",
+    top_event: Optional[str] = Field(None, description="顶事件的名称；给出 top_events 时可省略。", example="系统故障")
+    top_events: Optional[List[str]] = Field(None, description="一次分析多个顶事件：logic_expression 为多行定义（每行 "
+                                                              "\"事件 = 表达式\"），共用的子树只计算一次，"
+                                                              "各顶事件的结果见响应的 top_events。",
+                                            example=["系统故障", "电源失效"])
+    logic_expression: str = Field(..., description="描述故障树逻辑关系的完整表达式，支持 and、or、xor、not、"
+                                                   "表决门 VOTE(k, 事件1, 事件2, ...) 与禁止门 INHIBIT(输入, 条件)。",
                                   example="系统故障 = (电源失效 and 控制器失效) or 软件Bug")
     base_events: List[BaseEvent] = Field(..., description="项目中所有底事件及其概率的列表。")
+    expand_shared_subtrees: bool = Field(False, description="为 true 时图形按树形展开，共享子树在每个引用处重复输出。")
+    include_layout: bool = Field(False, description="为 true 时在服务端计算分层布局，为 graph_json 的每个节点附加 x/y 坐标（仅非展开模式）。")
+    layout_base_hash: Optional[str] = Field(None, description="上一次分析返回的 structure_hash，用于结构小改动后的增量布局。")
+    include_diagnostics: bool = Field(False, description="为 true 时在响应中附加 diagnostics（各阶段耗时与计数）。")
+    ccf_groups: List[CCFGroupSpec] = Field([], description="共因失效组，由引擎隐式处理，无需在逻辑表达式中展开。")
+    memory_budget_mb: Optional[float] = Field(None, gt=0, description="最小割集生成的内存预算（MB）；中间割集族超出预算时"
+                                                                     "溢出到磁盘，溢出统计见 structure_info.spill。")
+    workers: Optional[int] = Field(None, ge=1, description="大于 1 时较大的与门割集组合分配到多个进程计算，"
+                                                          "统计见 structure_info.parallel；与 memory_budget_mb 同时给出时以后者为准。")
 
 
 class ImportanceResult(BaseModel):
@@ -155,13 +234,27 @@ class ImportanceResult(BaseModel):
     fv_importance: float = Field(..., description="Fussell-Vesely重要度，值域[0,1]，越高越关键。")
 
 
+class TopEventResult(BaseModel):
+    top_event: str
+    top_event_probability: float
+    minimal_cut_sets: List[List[str]]
+    importance_analysis: List[ImportanceResult]
+    structure_info: Dict[str, Any] = Field(..., description="该顶事件的门类型、子节点数等结构信息。")
+    ccf_analysis: Optional[List[Dict[str, Any]]] = None
+
+
 class FTAnalysisResponse(BaseModel):
     top_event_probability: float = Field(..., description="计算出的顶事件总发生概率。")
-    minimal_cut_sets: List[List[str]] = Field(..., description="导致顶事件发生的所有最小底事件组合。")
+    minimal_cut_sets: List[List[str]] = Field(..., description="导致顶事件发生的所有最小底事件组合；含 not/xor 的非相干树"
+                                                               "返回质蕴涵，取反的事件写作 \"NOT 事件名\"。")
     graph_json: Dict[str, List[Dict]] = Field(..., description="用于前端渲染故障树图形的结构化数据。")
     structure_info: Dict[str, Any] = Field(..., description="故障树的顶层结构信息。")
     importance_analysis: List[ImportanceResult] = Field(...,
                                                         description="所有底事件的关键重要度分析结果，按重要度降序排列。")
+    diagnostics: Optional[Dict[str, Any]] = Field(None, description="请求 include_diagnostics 时返回的各阶段耗时（毫秒）与计数。")
+    ccf_analysis: Optional[List[Dict[str, Any]]] = Field(None, description="各共因失效组的共因事件概率、所在割集数及其对顶事件的贡献。")
+    top_events: Optional[List[TopEventResult]] = Field(None, description="请求给出 top_events 时各顶事件的结果（顺序相同）；"
+                                                                         "顶层各字段为第一个顶事件的结果，graph_json 包含全部顶事件。")
 
 
 @router.post(
@@ -190,41 +283,597 @@ async def import_fta_events(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"文件处理失败: {str(e)}")
 
 
+def _parse_top_expression(logic_expression: str) -> Dict:
+    match = re.match(r".*?=\s*(.*)", logic_expression)
+    if not match:
+        raise ValueError("逻辑表达式格式无效，必须包含 '=' 符号。")
+    return robust_parse_logic_expression(match.group(1).strip())
+
+
+def _bounded_cut_sets(tree, memory_budget_mb: float, substitutes=None, timer=NULL_TIMER, progress=NULL_PROGRESS):
+    """内存受限地生成各顶事件的最小割集，返回 (各顶事件的割集列表, 溢出统计)"""
+    with bounded_minimal_cut_sets(tree, int(memory_budget_mb * 2 ** 20), SPILL_DIR, substitutes,
+                                  progress) as spilled:
+        cut_sets = [list(top) for top in spilled.tops]
+        stats = spilled.stats
+    timer.count("spilled_sets", stats["spilled_sets"])
+    return cut_sets, stats
+
+
+def _parallel_cut_sets(tree, workers: int, substitutes=None, timer=NULL_TIMER, progress=NULL_PROGRESS):
+    """多进程生成各顶事件的最小割集，返回 (各顶事件的割集列表, 并行统计)"""
+    cut_sets, stats = parallel_top_minimal_cut_sets(tree, workers, substitutes, progress=progress)
+    timer.count("parallel_chunks", stats["chunks"])
+    return cut_sets, stats
+
+
+def _coherent_cut_sets(tree, request: "FTAnalysisRequest", substitutes=None, timer=NULL_TIMER,
+                       progress=NULL_PROGRESS):
+    """按请求的内存预算或进程数选择生成方式，返回 (各顶事件的割集列表, 溢出统计, 并行统计)"""
+    if request.memory_budget_mb:
+        cut_sets, spill = _bounded_cut_sets(tree, request.memory_budget_mb, substitutes, timer, progress)
+        return cut_sets, spill, None
+    if request.workers and request.workers > 1:
+        cut_sets, parallel = _parallel_cut_sets(tree, request.workers, substitutes, timer, progress)
+        return cut_sets, None, parallel
+    return top_minimal_cut_sets(tree, substitutes, progress=progress), None, None
+
+
+def _parse_tops(request: "FTAnalysisRequest", progress=NULL_PROGRESS):
+    """返回 (顶事件名列表, 各顶事件的门结构, 事件定义)；只给出 top_event 时沿用单行表达式的解析"""
+    if request.top_events:
+        definitions = parse_event_definitions(request.logic_expression, progress=progress)
+        for name in request.top_events:
+            if name not in definitions:
+                raise ValueError(f"顶事件 '{name}' 未在逻辑表达式中定义")
+        return list(request.top_events), [definitions[name] for name in request.top_events], definitions
+    if not request.top_event:
+        raise ValueError("必须给出 top_event 或 top_events")
+    progress.start("parse")
+    return [request.top_event], [_parse_top_expression(request.logic_expression)], {}
+
+
+def _exact_by_top(tree) -> List[bool]:
+    """独立性公式对各顶事件是否精确：其子图中没有被多个父节点引用的节点（重复事件）"""
+    result = []
+    for root in tree.roots:
+        seen, stack, exact = {root}, [root], True
+        while stack and exact:
+            for child in tree.children[stack.pop()]:
+                if child in seen:
+                    exact = False
+                    break
+                seen.add(child)
+                stack.append(child)
+        result.append(exact)
+    return result
+
+
+def _static_probabilities(base_events: List[BaseEvent]) -> Dict[str, float]:
+    missing = [be.event for be in base_events if be.probability is None]
+    if missing:
+        raise ValueError(f"以下底事件未给出 probability（时变模型请使用 /fta/unavailability）: {', '.join(missing[:20])}")
+    return {be.event: be.probability for be in base_events}
+
+
+def _run_analysis(request: FTAnalysisRequest, timer=NULL_TIMER, progress=NULL_PROGRESS) -> FTAnalysisResponse:
+    """
+    /fta/analyze 与分析任务共用的分析流程；progress 被取消时抛出 AnalysisCancelled。
+
+    多个顶事件编译为一个共享的 DAG，概率、割集与 BDD 对每个节点只计算一次，再按顶事件拆分结果。
+    """
+    events_dict = _static_probabilities(request.base_events)
+    with timer.phase("parse"):
+        top_events, gates, definitions = _parse_tops(request, progress)
+    with timer.phase("compile"):
+        tree = compile_tops(gates, definitions, progress)
+    timer.count("nodes", len(tree))
+    if len(top_events) > 1:
+        timer.count("top_events", len(top_events))
+    importance_events = events_dict
+    ccf_tops = None
+    spill = None
+    parallel = None
+
+    if request.ccf_groups:
+        # 共因事件是成员之间的隐式共享事件：概率在 BDD 上精确计算，割集中成员替换为 "独立失效 or 共因事件"
+        with timer.phase("ccf"):
+            expansion = expand_groups([CCFGroup(**group.dict()) for group in request.ccf_groups], events_dict)
+            importance_events = {**events_dict, **expansion.probabilities}
+        with timer.phase("bdd"):
+            bdd, roots = build_bdd_tops(tree, expansion.substitutes, progress=progress)
+        timer.count("bdd_nodes", len(bdd))
+        with timer.phase("probability"):
+            probabilities = [importance_events.get(name, 0.0) for name in bdd.variables]
+            p_tops = bdd.probabilities(roots, probabilities)
+        with timer.phase("cut_sets"):
+            if tree.coherent:
+                cut_sets_tops, spill, parallel = _coherent_cut_sets(tree, request, expansion.substitutes, timer,
+                                                                    progress)
+            else:
+                cut_sets_tops = top_prime_implicants(tree, bdd, roots, progress)
+    elif tree.coherent:
+        with timer.phase("probability"):
+            p_tops = ProbabilityEvaluator(tree, events_dict, progress).top_probabilities()
+        with timer.phase("cut_sets"):
+            cut_sets_tops, spill, parallel = _coherent_cut_sets(tree, request, timer=timer, progress=progress)
+    else:
+        # 非相干树：在 BDD 上计算精确概率与质蕴涵
+        with timer.phase("bdd"):
+            bdd, roots = build_bdd_tops(tree, progress=progress)
+        timer.count("bdd_nodes", len(bdd))
+        with timer.phase("probability"):
+            probabilities = [events_dict.get(name, 0.0) for name in bdd.variables]
+            p_tops = bdd.probabilities(roots, probabilities)
+        with timer.phase("cut_sets"):
+            cut_sets_tops = top_prime_implicants(tree, bdd, roots, progress)
+    cut_set_total = sum(len(cut_sets) for cut_sets in cut_sets_tops)
+    timer.count("cut_sets_kept" if tree.coherent else "prime_implicants", cut_set_total)
+
+    progress.start("importance", cut_set_total)
+    with timer.phase("importance"):
+        importance_tops = []
+        for cut_sets, p_top in zip(cut_sets_tops, p_tops):
+            importance_dict = fussell_vesely(cut_sets, importance_events, p_top)
+            importance_list = [ImportanceResult(event=event, fv_importance=importance_dict[event])
+                               for event in events_dict]
+            importance_list.sort(key=lambda x: x.fv_importance, reverse=True)
+            importance_tops.append(importance_list)
+            progress.step(len(cut_sets))
+        if request.ccf_groups:
+            ccf_tops = [ccf_contributions(cut_sets, [cut_set_probability(cs, importance_events) for cs in cut_sets],
+                                          expansion, p_top)
+                        for cut_sets, p_top in zip(cut_sets_tops, p_tops)]
+
+    progress.start("graph", len(tree))
+    with timer.phase("graph_json"):
+        graph_json = generate_tops_graph_json(top_events, events_dict, gates, definitions, tree,
+                                              expanded=request.expand_shared_subtrees)
+    timer.count("graph_nodes", len(graph_json['nodes']))
+    # 独立性公式只在没有重复事件（DAG 中无多父节点）时精确；否则可用 /fta/approximate 得到严格的界
+    exact = _exact_by_top(tree) if tree.coherent and not request.ccf_groups else None
+    top_infos = []
+    for i, (name, gate) in enumerate(zip(top_events, gates)):
+        info = {"top_event": name, "gate_type": gate['type'], "children_count": len(gate.get('children', []))}
+        if exact is not None:
+            info["probability_exact"] = exact[i]
+        top_infos.append(info)
+    structure_info = {"top_event": top_events[0], "gate_type": gates[0]['type'],
+                      "children_count": len(gates[0].get('children', [])),
+                      "structure_hash": tree.structure_hash(), "coherent": tree.coherent,
+                      "analysis_method": "minimal_cut_sets" if tree.coherent else "bdd_prime_implicants"}
+    if exact is not None:
+        structure_info["probability_exact"] = exact[0]
+    if request.ccf_groups:
+        structure_info["ccf_groups"] = len(request.ccf_groups)
+    if spill is not None:
+        structure_info["spill"] = spill
+    if parallel is not None:
+        structure_info["parallel"] = parallel
+    if request.include_layout and not request.expand_shared_subtrees:
+        with timer.phase("layout"):
+            positions = compute_graph_layout(tree, request.layout_base_hash, timer, progress)['positions']
+            for node in graph_json['nodes']:
+                node['x'], node['y'] = positions[node['id']]
+
+    top_results = None
+    if request.top_events:
+        top_results = [TopEventResult(top_event=name, top_event_probability=p_top, minimal_cut_sets=cut_sets,
+                                      importance_analysis=importance_list, structure_info=info,
+                                      ccf_analysis=ccf_tops[i] if ccf_tops else None)
+                       for i, (name, p_top, cut_sets, importance_list, info)
+                       in enumerate(zip(top_events, p_tops, cut_sets_tops, importance_tops, top_infos))]
+
+    return FTAnalysisResponse(
+        top_event_probability=p_tops[0],
+        minimal_cut_sets=cut_sets_tops[0],
+        graph_json=graph_json,
+        structure_info=structure_info,
+        importance_analysis=importance_tops[0],
+        diagnostics=timer.diagnostics() if request.include_diagnostics else None,
+        ccf_analysis=ccf_tops[0] if ccf_tops else None,
+        top_events=top_results
+    )
+
+
+def _timing_headers(timer) -> Optional[Dict[str, str]]:
+    """失败的请求同样返回 Server-Timing：注入的 response 不会并入 HTTPException 生成的响应"""
+    return {"Server-Timing": timer.server_timing()} if timer.enabled else None
+
+
 @router.post(
     "/fta/analyze",
     response_model=FTAnalysisResponse,
     summary="执行完整的故障树分析",
     description="接收一个完整的故障树定义，并执行所有相关的定性、定量及重要度分析。"
 )
-def analyze_fault_tree(request: FTAnalysisRequest):
-    events_dict = {be.event: be.probability for be in request.base_events}
+def analyze_fault_tree(request: FTAnalysisRequest, response: Response):
+    timer = new_timer(METRICS_ENABLED or request.include_diagnostics)
+    status = "ok"
+    try:
+        result = _run_analysis(request, timer)
+        if timer.enabled:
+            response.headers["Server-Timing"] = timer.server_timing()
+        return result
+    except ValueError as e:
+        status = "invalid"
+        raise HTTPException(status_code=400, detail=str(e), headers=_timing_headers(timer))
+    except Exception as e:
+        status = "error"
+        raise HTTPException(status_code=500, detail=f"执行分析时发生未知错误: {str(e)}", headers=_timing_headers(timer))
+    finally:
+        if timer.enabled and METRICS_ENABLED:
+            metrics.record(timer, status)
+
+
+# 已结束的分析任务最多保留这么多个，超出时丢弃最早的
+JOB_HISTORY = 64
+_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+class AnalysisJob(BaseModel):
+    job_id: str
+    status: str = Field(..., description="queued、running、done、failed 或 cancelled。")
+    progress: Dict[str, Any] = Field({}, description="当前阶段 (phase/label)、已处理数量 done 与总数 total、"
+                                                     "候选割集数 candidates、本阶段已用时间与预计剩余时间（秒）。")
+    result: Optional[FTAnalysisResponse] = Field(None, description="status 为 done 时的分析结果，与 /fta/analyze 的响应相同。")
+    error: Optional[str] = Field(None, description="status 为 failed 时的错误信息。")
+
+
+def _job_view(job_id: str, job: Dict[str, Any]) -> AnalysisJob:
+    return AnalysisJob(job_id=job_id, status=job["status"], progress=job["token"].snapshot(),
+                       result=job["result"], error=job["error"])
+
+
+def _run_job(job: Dict[str, Any], request: FTAnalysisRequest) -> None:
+    """在后台线程中执行分析；任务的 ProgressToken 既报告进度也接收取消请求"""
+    timer = new_timer(METRICS_ENABLED or request.include_diagnostics)
+    status = "ok"
+    job["status"] = "running"
+    try:
+        job["result"] = _run_analysis(request, timer, job["token"])
+        job["status"] = "done"
+    except AnalysisCancelled:
+        status = job["status"] = "cancelled"
+    except ValueError as e:
+        status = "invalid"
+        job["status"], job["error"] = "failed", str(e)
+    except Exception as e:
+        status = "error"
+        job["status"], job["error"] = "failed", f"执行分析时发生未知错误: {str(e)}"
+    finally:
+        if timer.enabled and METRICS_ENABLED:
+            metrics.record(timer, status)
+
+
+def _get_job(job_id: str) -> Dict[str, Any]:
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"分析任务 '{job_id}' 不存在或已过期")
+    return job
+
+
+@router.post(
+    "/fta/jobs",
+    response_model=AnalysisJob,
+    status_code=202,
+    summary="提交后台分析任务",
+    description="与 /fta/analyze 接收相同的请求，但立即返回任务 id；分析在后台执行，"
+                "通过 GET /fta/jobs/{job_id} 查询进度与结果，DELETE 取消。"
+)
+def submit_analysis_job(request: FTAnalysisRequest):
+    job_id = uuid.uuid4().hex
+    job = {"status": "queued", "token": ProgressToken(), "result": None, "error": None}
+    with _jobs_lock:
+        _jobs[job_id] = job
+        finished = [key for key, value in _jobs.items() if value["status"] not in ("queued", "running")]
+        for key in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del _jobs[key]
+    thread = threading.Thread(target=_run_job, args=(job, request), daemon=True)
+    thread.start()
+    return _job_view(job_id, job)
+
+
+@router.get("/fta/jobs/{job_id}", response_model=AnalysisJob, summary="查询分析任务",
+            description="返回任务状态与当前阶段的进度（已处理节点数、候选割集数、预计剩余时间），完成后附带分析结果。")
+def get_analysis_job(job_id: str):
+    return _job_view(job_id, _get_job(job_id))
+
+
+@router.delete("/fta/jobs/{job_id}", response_model=AnalysisJob, summary="取消分析任务",
+               description="请求取消任务；分析线程在下一次检查进度时停止，状态随之变为 cancelled。")
+def cancel_analysis_job(job_id: str):
+    job = _get_job(job_id)
+    job["token"].cancel()
+    return _job_view(job_id, job)
+
+
+class UnavailabilityRequest(BaseModel):
+    top_event: str = Field(..., description="顶事件的名称。", example="系统故障")
+    logic_expression: str = Field(..., description="与 /fta/analyze 相同的逻辑表达式。")
+    base_events: List[BaseEvent] = Field(..., description="底事件；未给出 reliability 的底事件按固定 probability 处理。")
+    ccf_groups: List[CCFGroupSpec] = Field([], description="共因失效组，Qt 随时间取成员不可用度的平均值。")
+    times: Optional[List[float]] = Field(None, description="升序排列的时间点；给出时忽略 mission_time 与 points。")
+    mission_time: Optional[float] = Field(None, description="任务时间，时间网格为 [0, mission_time] 上等间距的 points 个点。",
+                                          example=8760)
+    points: int = Field(101, description="时间网格的点数。")
+
+
+class UnavailabilityResponse(BaseModel):
+    times: List[float]
+    top_unavailability: List[float] = Field(..., description="顶事件在各时间点的不可用度。")
+    mean_unavailability: float = Field(..., description="时间网格上的平均不可用度（梯形法）。")
+    peak_unavailability: float
+    peak_time: float
+    event_mean_unavailability: Dict[str, float] = Field(..., description="各底事件的平均不可用度。")
+
+
+@router.post(
+    "/fta/unavailability",
+    response_model=UnavailabilityResponse,
+    summary="时变不可用度分析",
+    description="按底事件的可靠性模型在时间网格上计算 (T × E) 不可用度矩阵，一次遍历故障树得到顶事件不可用度曲线。"
+)
+def analyze_unavailability(request: UnavailabilityRequest):
+    try:
+        times = time_grid(request.times, request.mission_time, request.points)
+        names, models = [], []
+        for be in request.base_events:
+            if be.reliability is not None:
+                model = be.reliability.dict()
+            elif be.probability is not None:
+                model = {"kind": "constant", "probability": be.probability}
+            else:
+                raise ValueError(f"底事件 '{be.event}' 既没有 probability 也没有 reliability")
+            validate_model(be.event, model)
+            names.append(be.event)
+            models.append(model)
+        matrix = unavailability_matrix(models, times)
+
+        tree = compile_tree(_parse_top_expression(request.logic_expression))
+        if tree.coherent and not request.ccf_groups:
+            curve = propagate(tree, names, matrix)
+        else:
+            # 非相干树或含共因组：数组同样可以沿 BDD 逐元素传播
+            columns = {name: matrix[:, j] for j, name in enumerate(names)}
+            substitutes = None
+            if request.ccf_groups:
+                expansion = expand_groups([CCFGroup(**group.dict()) for group in request.ccf_groups], columns)
+                columns.update(expansion.probabilities)
+                substitutes = expansion.substitutes
+            bdd, root = build_bdd(tree, substitutes)
+            top = bdd.probability(root, [columns.get(name, 0.0) for name in bdd.variables])
+            curve = np.broadcast_to(top, times.shape).astype(float)
+
+        peak = int(np.argmax(curve))
+        return UnavailabilityResponse(
+            times=times.tolist(),
+            top_unavailability=curve.tolist(),
+            mean_unavailability=mean_value(curve, times),
+            peak_unavailability=float(curve[peak]),
+            peak_time=float(times[peak]),
+            event_mean_unavailability={name: mean_value(matrix[:, j], times) for j, name in enumerate(names)},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"执行时变分析时发生未知错误: {str(e)}")
+
+
+class UncertaintyRequest(BaseModel):
+    top_event: str = Field(..., description="顶事件的名称。", example="系统故障")
+    logic_expression: str = Field(..., description="与 /fta/analyze 相同的逻辑表达式。")
+    base_events: List[BaseEvent] = Field(..., description="底事件；未给出 distribution 的底事件固定为 probability。")
+    ccf_groups: List[CCFGroupSpec] = Field([], description="共因失效组，Qt 取每个样本中成员概率的平均值。")
+    samples: int = Field(10000, ge=10, le=1_000_000, description="拉丁超立方样本数。")
+    seed: Optional[int] = Field(None, description="随机种子，给定时结果可复现。")
+    percentiles: List[float] = Field([5, 50, 95], description="需要输出的百分位数。")
+    include_sensitivity: bool = Field(False, description="为 true 时按 Spearman 秩相关系数对不确定事件排序。")
+
+
+class SensitivityRank(BaseModel):
+    event: str
+    spearman: float = Field(..., description="底事件抽样值与顶事件概率的 Spearman 秩相关系数。")
+
+
+class UncertaintyResponse(BaseModel):
+    point_estimate: Optional[float] = Field(None, description="以各底事件 probability 计算的点估计（有事件缺少 probability 时为空）。")
+    mean: float
+    std: float
+    percentiles: Dict[str, float] = Field(..., description="顶事件概率的百分位数，如 {\"p5\": ..., \"p95\": ...}。")
+    samples: int
+    sensitivity: Optional[List[SensitivityRank]] = Field(None, description="按 |Spearman 系数| 降序排列的不确定事件。")
+
+
+def _sample_evaluator(tree, ccf_groups: List[CCFGroupSpec]):
+    """返回 evaluate(events)：事件概率可以是数组，逐元素得到顶事件概率"""
+    if tree.coherent and not ccf_groups:
+        return lambda events: evaluate_arrays(tree, events)
+    groups = [CCFGroup(**group.dict()) for group in ccf_groups]
+
+    def evaluate(events):
+        substitutes = None
+        if groups:
+            expansion = expand_groups(groups, events)
+            events = {**events, **expansion.probabilities}
+            substitutes = expansion.substitutes
+        bdd, root = build_bdd(tree, substitutes)
+        return bdd.probability(root, [events.get(name, 0.0) for name in bdd.variables])
+    return evaluate
+
+
+@router.post(
+    "/fta/uncertainty",
+    response_model=UncertaintyResponse,
+    summary="参数不确定性分析",
+    description="按底事件概率的分布做拉丁超立方抽样，向量化计算全部样本的顶事件概率，返回均值、百分位数及可选的 Spearman 敏感性排序。"
+)
+def analyze_uncertainty(request: UncertaintyRequest):
+    try:
+        if any(not 0 <= p <= 100 for p in request.percentiles):
+            raise ValueError("百分位数必须在 0 到 100 之间")
+        fixed, names, specs, centers = {}, [], [], []
+        for be in request.base_events:
+            if be.distribution is not None:
+                spec = be.distribution.dict()
+                validate_distribution(be.event, spec, be.probability)
+                names.append(be.event)
+                specs.append(spec)
+                centers.append(be.probability)
+            elif be.probability is None:
+                raise ValueError(f"底事件 '{be.event}' 既没有 probability 也没有 distribution")
+            if be.probability is not None:
+                fixed[be.event] = be.probability
+
+        tree = compile_tree(_parse_top_expression(request.logic_expression))
+        evaluate = _sample_evaluator(tree, request.ccf_groups)
+        point = float(evaluate(fixed)) if len(fixed) == len(request.base_events) else None
+        sampled = set(names)
+        result = propagate_samples(evaluate, {k: v for k, v in fixed.items() if k not in sampled}, names,
+                                   QuantileTransform(specs, centers), request.samples, request.seed,
+                                   request.include_sensitivity)
+        summary = summarize(result["samples"], request.percentiles)
+
+        sensitivity = None
+        if request.include_sensitivity:
+            ranking = sorted(result["spearman"].items(), key=lambda item: abs(item[1]), reverse=True)
+            sensitivity = [SensitivityRank(event=event, spearman=rho) for event, rho in ranking]
+        return UncertaintyResponse(point_estimate=point, samples=request.samples, sensitivity=sensitivity, **summary)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"执行不确定性分析时发生未知错误: {str(e)}")
+
+
+class SensitivitySweep(BaseModel):
+    factors: List[float] = Field([], description="乘性因子，应用于 events 中的每个事件（结果截断到 [0, 1]）。",
+                                 example=[0.1, 0.5, 2, 10])
+    ranges: Dict[str, List[float]] = Field({}, description="按事件给出的绝对概率取值，优先于 factors。")
+    events: Optional[List[str]] = Field(None, description="参与扫描的事件，缺省为全部底事件与 ranges 中的事件。")
+
+
+class SensitivityRequest(BaseModel):
+    top_event: str = Field(..., description="顶事件的名称。", example="系统故障")
+    logic_expression: str = Field(..., description="与 /fta/analyze 相同的逻辑表达式。")
+    base_events: List[BaseEvent] = Field(..., description="基准概率。")
+    sweep: SensitivitySweep
+    method: str = Field("auto", description="auto、bdd（精确，利用对单个事件的线性）或 vectorized（独立性公式批量计算）。")
+    top_n: int = Field(0, ge=0, description="只返回摆幅最大的前 N 个事件，0 表示全部。")
+
+
+class TornadoBar(BaseModel):
+    event: str
+    baseline_probability: float
+    low_input: float
+    high_input: float
+    low_top: float
+    high_top: float
+    low_delta: float
+    high_delta: float
+    swing: float = Field(..., description="high_top - low_top，龙卷风图按此降序排列。")
+    points: List[Dict[str, float]] = Field(..., description="每个扰动取值及对应的顶事件概率。")
+
+
+class SensitivityResponse(BaseModel):
+    baseline_top_probability: float
+    method: str
+    perturbations: int
+    tornado: List[TornadoBar]
+    birnbaum_importance: Optional[Dict[str, float]] = Field(None, description="bdd 方法下顺带得到的 ∂P/∂p_i。")
+
+
+@router.post(
+    "/fta/sensitivity",
+    response_model=SensitivityResponse,
+    summary="单因素敏感性扫描（龙卷风图）",
+    description="对每个底事件分别按乘性因子或绝对取值扰动，批量计算全部扰动下的顶事件概率，返回龙卷风图数据。"
+)
+def analyze_sensitivity(request: SensitivityRequest):
     try:
-        match = re.match(r".*?=\s*(.*)", request.logic_expression)
-        if not match:
-            raise ValueError("逻辑表达式格式无效，必须包含 '=' 符号。")
-        expr_part = match.group(1).strip()
-
-        gate_structure = robust_parse_logic_expression(expr_part)
-        p_top = calculate_probability(gate_structure, events_dict)
-        min_cut_sets_set = find_minimal_cut_sets(gate_structure)
-        min_cut_sets_list = [list(s) for s in min_cut_sets_set]
-
-        importance_dict = calculate_importance(p_top, gate_structure, events_dict)
-        importance_list = [ImportanceResult(event=k, fv_importance=v) for k, v in importance_dict.items()]
-        importance_list.sort(key=lambda x: x.fv_importance, reverse=True)
-
-        graph_json = generate_graph_json(request.top_event, events_dict, gate_structure)
-        structure_info = {"top_event": request.top_event, "gate_type": gate_structure['type'],
-                          "children_count": len(gate_structure.get('children', []))}
-
-        return FTAnalysisResponse(
-            top_event_probability=p_top,
-            minimal_cut_sets=min_cut_sets_list,
-            graph_json=graph_json,
-            structure_info=structure_info,
-            importance_analysis=importance_list
+        events_dict = _static_probabilities(request.base_events)
+        unknown = [name for name in [*(request.sweep.events or []), *request.sweep.ranges] if name not in events_dict]
+        if unknown:
+            raise ValueError(f"以下事件未在底事件列表中定义: {', '.join(unknown[:20])}")
+        selected = list(request.sweep.events or events_dict)
+        selected += [name for name in request.sweep.ranges if name not in selected]
+        levels = sweep_levels(events_dict, request.sweep.factors, request.sweep.ranges, selected)
+        if not levels:
+            raise ValueError("扫描为空：请给出 factors 或 ranges")
+
+        tree = compile_tree(_parse_top_expression(request.logic_expression))
+        sweep = run_sweep(tree, events_dict, levels, request.method)
+        return SensitivityResponse(
+            baseline_top_probability=sweep["base"],
+            method=sweep["method"],
+            perturbations=sum(len(values) for values in levels.values()),
+            tornado=[TornadoBar(**bar) for bar in tornado(events_dict, levels, sweep, request.top_n)],
+            birnbaum_importance=sweep["birnbaum"],
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"执行分析时发生未知错误: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"执行敏感性分析时发生未知错误: {str(e)}")
+
+
+class ApproximationRequest(BaseModel):
+    top_event: str = Field(..., description="顶事件的名称。", example="系统故障")
+    logic_expression: str = Field(..., description="与 /fta/analyze 相同的逻辑表达式。")
+    base_events: List[BaseEvent] = Field(..., description="项目中所有底事件及其概率的列表。")
+    method: str = Field("auto", description="auto、structure、rare_event、mcub、esary_proschan 或 exact；"
+                                            "structure 不展开割集，只给出沿 DAG 传播的概率上下界（auto 首先尝试它）；"
+                                            "auto 选择满足精度要求的成本最低的方法。")
+    cutoff: float = Field(1e-12, ge=0, description="割集概率截断值，低于该值的部分割集在展开时丢弃。")
+    target_relative_error: float = Field(0.01, gt=0, description="要求的相对误差（误差估计 / 估计值）。")
+    max_cut_sets: int = Field(100, ge=0, description="响应中最多返回的割集数（按概率降序）。")
+
+
+class ApproximationResponse(BaseModel):
+    top_event_probability: float = Field(..., description="所选方法的顶事件概率估计值。")
+    method: str
+    lower_bound: float = Field(..., description="顶事件概率的严格下界。")
+    upper_bound: float = Field(..., description="顶事件概率的严格上界（含截断质量）。")
+    error_bound: float = Field(..., description="估计值到上下界的最大距离。")
+    relative_error: float
+    target_met: bool = Field(..., description="误差估计是否满足 target_relative_error。")
+    truncation: Optional[Dict[str, Any]] = Field(None, description="截断值、截断质量（被忽略概率的上界）与保留的割集数。")
+    minimal_cut_sets: List[List[str]] = Field([], description="概率最高的截断最小割集。")
+    attempts: List[Dict[str, Any]] = Field(..., description="按尝试顺序列出的各方法结果。")
+
+
+@router.post(
+    "/fta/approximate",
+    response_model=ApproximationResponse,
+    summary="大型故障树的概率近似与界",
+    description="基于按概率截断的最小割集计算稀有事件近似、最小割集上界或 Esary-Proschan 界，"
+                "给出由截断质量推出的严格上下界；auto 模式选择满足精度要求的成本最低的方法。"
+)
+def approximate_fault_tree(request: ApproximationRequest):
+    try:
+        events_dict = _static_probabilities(request.base_events)
+        tree = compile_tree(_parse_top_expression(request.logic_expression))
+        selection = select_method(tree, events_dict, request.cutoff, request.target_relative_error, request.method)
+        result = selection["result"]
+        return ApproximationResponse(
+            top_event_probability=result["estimate"],
+            method=result["method"],
+            lower_bound=result["lower_bound"],
+            upper_bound=result["upper_bound"],
+            error_bound=result["error_bound"],
+            relative_error=result["relative_error"],
+            target_met=result["target_met"],
+            truncation=selection["truncation"],
+            minimal_cut_sets=selection["cut_sets"][:request.max_cut_sets],
+            attempts=selection["attempts"],
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"执行近似分析时发生未知错误: {str(e)}")
+
+
+@router.get("/metrics", response_class=PlainTextResponse, summary="Prometheus 指标",
+            description="以 Prometheus 文本格式输出分析请求的累计指标（各阶段耗时直方图、规模计数与缓存命中）。")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,250 @@
+# fta_approx.py
+"""
+大型相干故障树的概率近似与界
+
+精确分析（BDD）在树很大时可能无法完成，这里基于按概率截断的最小割集
+（fta_engine.truncated_cut_sets）给出带误差估计的近似值。设保留的割集为 K，
+截断质量为 ε（被忽略的顶事件概率的上界），则 P(∪K) ≤ P_top ≤ P(∪K) + ε：
+
+- rare_event：稀有事件近似 S1 = Σ P(C)，上界 S1 + ε；
+- mcub：最小割集上界 1 - Π(1 - P(C))，即 Esary-Proschan 上界（相干树、底事件独立时成立），上界 MCUB + ε；
+- esary_proschan：上界同 mcub，下界额外计算二阶 Bonferroni 界 S1 - S2，取区间中点为估计值；
+- structure：不生成割集，沿 DAG 传播的结构界 structure_bounds，取区间中点为估计值，成本最低。
+
+所有方法的下界还取两两不相交割集（按概率从大到小贪心选取）之并的概率，以及沿 DAG
+传播的结构界 structure_bounds 的下界，上界同样与结构界取较紧者。误差估计为估计值到区间
+两端的最大距离。select_method 按成本从低到高尝试各方法，返回第一个满足精度要求的结果。
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fta_bdd import BDDTooLarge, build_bdd
+from fta_engine import CompiledTree, BASIC, VOTE, INHIBIT, truncated_cut_sets, vote_probability
+
+RARE_EVENT = 'rare_event'
+MCUB = 'mcub'
+ESARY_PROSCHAN = 'esary_proschan'
+STRUCTURE = 'structure'
+EXACT = 'exact'
+METHODS = (STRUCTURE, RARE_EVENT, MCUB, ESARY_PROSCHAN, EXACT)  # 按成本从低到高
+EXACT_NODE_LIMIT = 1_000_000
+PAIRWISE_LIMIT = 5_000     # S2 需要 O(n²) 次运算，割集数超过该值时 esary_proschan 只用不相交下界
+PAIRWISE_BLOCK = 512
+REFINEMENT_STEP = 100.0    # 截断误差占主导时截断值每次缩小的倍数
+
+
+def _independent_subset(order: List[int], supports: List[int]) -> List[int]:
+    """按给定顺序贪心选出底事件集合两两不相交（因而相互独立）的子节点"""
+    used, picked = 0, []
+    for child in order:
+        if not supports[child] & used:
+            used |= supports[child]
+            picked.append(child)
+    return picked
+
+
+def structure_bounds(tree: CompiledTree, events: Dict[str, float]) -> Tuple[float, float]:
+    """
+    沿 DAG 一次遍历得到顶事件概率的严格上下界 (相干树)。
+
+    相干树中各门事件都是底事件的增函数，彼此正相关，因此与门 ≥ 子节点概率之积、
+    或门 ≤ 1 - Π(1 - 子节点概率)；底事件集合（以整数位集表示）互不相交的子节点相互独立，
+    对它们可以精确组合。没有共享事件的树上下界相等，即精确值。
+    """
+    bit: Dict[str, int] = {}
+    supports: List[int] = []
+    lower: List[float] = []
+    upper: List[float] = []
+    for idx, node_type in enumerate(tree.types):
+        kids = tree.children[idx]
+        if node_type == BASIC:
+            name = tree.names[idx]
+            supports.append(1 << bit.setdefault(name, len(bit)))
+            p = events.get(name, 0.0)
+            lower.append(p)
+            upper.append(p)
+            continue
+        support = 0
+        for child in kids:
+            support |= supports[child]
+        supports.append(support)
+        independent = sum(bin(supports[c]).count('1') for c in kids) == bin(support).count('1')
+        if not kids:
+            lo = hi = 0.0
+        elif node_type == 'OR':
+            q_upper = 1.0
+            for child in kids:
+                q_upper *= 1 - upper[child]
+            q_lower = 1.0
+            for child in _independent_subset(sorted(kids, key=lambda c: -lower[c]), supports):
+                q_lower *= 1 - lower[child]
+            lo, hi = 1 - q_lower, 1 - q_upper
+        elif node_type in ('AND', INHIBIT):
+            lo = 1.0
+            for child in kids:
+                lo *= lower[child]
+            hi = 1.0
+            for child in _independent_subset(sorted(kids, key=lambda c: upper[c]), supports):
+                hi *= upper[child]
+        elif node_type == VOTE:
+            k = tree.k[idx]
+            if independent:
+                lo = vote_probability([lower[c] for c in kids], k)
+                hi = vote_probability([upper[c] for c in kids], k)
+            else:
+                # 任意 k 个子节点同时发生即可；发生个数的期望不小于 k·P
+                lo = 1.0
+                for value in sorted((lower[c] for c in kids), reverse=True)[:k]:
+                    lo *= value
+                hi = min(1.0, sum(upper[c] for c in kids) / k) if k > 0 else 1.0
+        else:
+            raise ValueError("结构界只适用于相干树")
+        lower.append(lo)
+        upper.append(max(hi, lo))
+    return lower[tree.root], upper[tree.root]
+
+
+def disjoint_lower_bound(cut_sets: List[List[str]], probabilities: List[float]) -> float:
+    """两两不相交的割集相互独立，1 - Π(1 - P(C)) 是 P(∪K) 的下界"""
+    used = set()
+    q = 1.0
+    for cut_set, p in zip(cut_sets, probabilities):  # 已按概率降序
+        if used.isdisjoint(cut_set):
+            used.update(cut_set)
+            q *= 1 - p
+    return 1 - q
+
+
+def bonferroni_second_order(cut_sets: List[List[str]], probabilities: List[float],
+                            events: Dict[str, float]) -> float:
+    """
+    S2 = Σ_{i<j} P(Ci ∩ Cj)。
+
+    log P(Ci ∩ Cj) = log P(Ci) + log P(Cj) - Σ_{e∈Ci∩Cj} log p_e，
+    交集部分由 (割集 × 事件) 关联矩阵按行分块做矩阵乘法得到。
+    """
+    names = sorted({name for cut_set in cut_sets for name in cut_set})
+    column = {name: j for j, name in enumerate(names)}
+    log_p = np.log([events[name] for name in names])
+    incidence = np.zeros((len(cut_sets), len(names)))
+    for i, cut_set in enumerate(cut_sets):
+        incidence[i, [column[name] for name in cut_set]] = 1.0
+    log_cut = np.log(probabilities)
+    weighted = incidence * log_p
+    total = 0.0
+    for start in range(0, len(cut_sets), PAIRWISE_BLOCK):
+        stop = min(start + PAIRWISE_BLOCK, len(cut_sets))
+        shared = weighted[start:stop] @ incidence.T
+        joint = np.exp(log_cut[start:stop, None] + log_cut[None, :] - shared)
+        # 只取 j > i 的上三角部分
+        mask = np.arange(len(cut_sets))[None, :] > np.arange(start, stop)[:, None]
+        total += float(joint[mask].sum())
+    return total
+
+
+def _result(method, estimate, lower, upper, **extra) -> Dict[str, Any]:
+    error = max(upper - estimate, estimate - lower, 0.0)
+    return {"method": method, "estimate": estimate, "lower_bound": lower, "upper_bound": upper,
+            "error_bound": error, "relative_error": error / estimate if estimate > 0 else (0.0 if error == 0 else 1.0),
+            **extra}
+
+
+def approximate(method: str, cut_sets: List[List[str]], probabilities: List[float], truncated_mass: float,
+                events: Dict[str, float], bounds: Tuple[float, float] = (0.0, 1.0)) -> Dict[str, Any]:
+    """对截断割集应用一种近似方法，返回估计值、严格的上下界与误差估计；bounds 为已知的结构界"""
+    # 含概率为 0 事件的割集对各界都没有贡献
+    kept = [(cut_set, p) for cut_set, p in zip(cut_sets, probabilities) if p > 0]
+    cut_sets, probabilities = [c for c, _ in kept], [p for _, p in kept]
+    p_array = np.array(probabilities, dtype=float)
+    s1 = float(p_array.sum())
+    mcub = float(-np.expm1(np.log1p(-np.minimum(p_array, 1.0)).sum())) if len(p_array) else 0.0
+    lower = max(disjoint_lower_bound(cut_sets, probabilities), bounds[0])
+    if method == RARE_EVENT:
+        return _result(method, s1, lower, min(s1 + truncated_mass, bounds[1]))
+    upper = min(mcub + truncated_mass, bounds[1])
+    if method == MCUB:
+        return _result(method, mcub, lower, upper)
+    if method != ESARY_PROSCHAN:
+        raise ValueError(f"未知的近似方法 '{method}'，应为 {', '.join(METHODS)} 之一")
+    pairwise = len(cut_sets) <= PAIRWISE_LIMIT
+    if pairwise and len(cut_sets) > 1:
+        lower = max(lower, s1 - bonferroni_second_order(cut_sets, probabilities, events))
+    lower = min(lower, upper)
+    return _result(method, (lower + upper) / 2, lower, upper, pairwise=pairwise)
+
+
+def exact_probability(tree: CompiledTree, events: Dict[str, float]) -> Dict[str, Any]:
+    """在节点数受限的 BDD 上计算精确概率，超限时抛出 BDDTooLarge"""
+    bdd, root = build_bdd(tree, max_nodes=EXACT_NODE_LIMIT)
+    p = bdd.probability(root, [events.get(name, 0.0) for name in bdd.variables])
+    return _result(EXACT, p, p, p, bdd_nodes=len(bdd))
+
+
+def select_method(tree: CompiledTree, events: Dict[str, float], cutoff: float, target_relative_error: float,
+                  method: str = 'auto', max_refinements: int = 2) -> Dict[str, Any]:
+    """
+    method 为 auto 时依次尝试 structure、rare_event、mcub、esary_proschan，都不满足精度时尝试精确 BDD；
+    BDD 超限且截断质量是误差的主要来源时，把截断值缩小 REFINEMENT_STEP 倍重新生成割集。
+    仍不满足时返回误差最小的结果，target_met 为 False。
+
+    返回值包含选中的结果 (result)、截断信息 (truncation) 与全部尝试 (attempts)。
+    """
+    if method != 'auto' and method not in METHODS:
+        raise ValueError(f"未知的近似方法 '{method}'，应为 auto 或 {', '.join(METHODS)} 之一")
+    if cutoff < 0:
+        raise ValueError("截断值 cutoff 不能为负")
+    attempts: List[Dict[str, Any]] = []
+    truncation: Optional[Dict[str, Any]] = None
+    cut_sets: List[List[str]] = []
+
+    def finish(result):
+        result["target_met"] = result["relative_error"] <= target_relative_error
+        return {"result": result, "truncation": truncation, "cut_sets": cut_sets, "attempts": attempts}
+
+    def try_exact():
+        try:
+            result = exact_probability(tree, events)
+        except BDDTooLarge:
+            attempts.append({"method": EXACT, "skipped": f"BDD 节点数超过 {EXACT_NODE_LIMIT}"})
+            return None
+        attempts.append(result)
+        return result
+
+    if not tree.coherent and method not in ('auto', EXACT):
+        raise ValueError("故障树含非门或异或门（非相干），割集近似与结构界均不适用，请使用 exact")
+    if method == EXACT or (method == 'auto' and not tree.coherent):
+        result = exact_probability(tree, events) if method == EXACT else try_exact()
+        if result is None:
+            raise ValueError("非相干树只能做精确分析，而 BDD 节点数超过上限")
+        return finish(result)
+
+    bounds = structure_bounds(tree, events)
+    if method in ('auto', STRUCTURE):
+        result = _result(STRUCTURE, sum(bounds) / 2, *bounds)
+        attempts.append(result)
+        if method == STRUCTURE or result["relative_error"] <= target_relative_error:
+            return finish(result)
+    candidates = [RARE_EVENT, MCUB, ESARY_PROSCHAN] if method == 'auto' else [method]
+    exact_tried = False
+    for _ in range(max_refinements + 1):
+        cut_sets, probabilities, truncated_mass = truncated_cut_sets(tree, events, cutoff)
+        truncation = {"cutoff": cutoff, "truncated_mass": truncated_mass, "cut_sets": len(cut_sets)}
+        for name in candidates:
+            result = approximate(name, cut_sets, probabilities, truncated_mass, events, bounds)
+            result["cutoff"] = cutoff
+            attempts.append(result)
+            if result["relative_error"] <= target_relative_error:
+                return finish(result)
+        if method == 'auto' and not exact_tried:
+            exact_tried = True
+            result = try_exact()
+            if result is not None:
+                return finish(result)
+        best = min((a for a in attempts if "estimate" in a), key=lambda a: a["relative_error"])
+        # 截断质量不是误差的主要部分时，缩小截断值也无济于事
+        if cutoff == 0 or truncated_mass < best["error_bound"] / 2:
+            break
+        cutoff /= REFINEMENT_STEP
+    best = min((a for a in attempts if "estimate" in a), key=lambda a: a["relative_error"])
+    return finish(dict(best))
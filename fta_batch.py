@@ -0,0 +1,312 @@
+# fta_batch.py
+"""
+故障树批量分析命令行
+
+不依赖 tkinter，可在无图形界面的服务器上运行。输入为模型目录或清单文件：
+
+- 目录：每个模型为一个逻辑表达式文件 (*.txt / *.fta，格式与 GUI 的多行定义相同)，
+  同目录下同名的 .xlsx / .xls / .csv 文件为其底事件表；也可用 --events 指定公共事件表。
+- 清单 (.csv / .json / .jsonl)：每条记录包含 logic、events，可选 model、top_event，
+  相对路径以清单所在目录为基准。
+
+每个模型在进程池中独立分析，单个模型失败只记录错误，不会中断整个批次。
+结果写入 JSON Lines（每个模型一行）或 Parquet 文件，并附带各阶段耗时。
+
+示例:
+    python fta_batch.py models/ -o results.jsonl --workers 8
+"""
+import argparse
+import collections
+import concurrent.futures
+import importlib.util
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from fta_engine import compile_tree, ProbabilityEvaluator, minimal_cut_sets, fussell_vesely
+from fta_bdd import build_bdd, prime_implicants
+from fta_spill import bounded_minimal_cut_sets
+from fta_parser import parse_event_definitions, parse_strict_expression
+
+LOGIC_SUFFIXES = ('.txt', '.fta')
+EVENT_SUFFIXES = ('.xlsx', '.xls', '.csv')
+
+
+def read_event_table(path: str) -> Dict[str, float]:
+    """读取底事件表：优先使用 事件名称/发生概率 表头，否则取前两列"""
+    if path.lower().endswith('.csv'):
+        df = pd.read_csv(path, header=None)
+    else:
+        df = pd.read_excel(path, header=None, engine='openpyxl' if path.lower().endswith('.xlsx') else None)
+    if df.shape[1] < 2:
+        raise ValueError(f"事件表至少需要两列: {path}")
+
+    # 第一行的概率列不是数字时视为表头
+    header = [str(value).strip() for value in df.iloc[0]] if len(df) else []
+    if header and pd.isna(pd.to_numeric(df.iloc[0, 1], errors='coerce')):
+        df = df.iloc[1:]
+        if '事件名称' in header and '发生概率' in header:
+            names, probabilities = df.iloc[:, header.index('事件名称')], df.iloc[:, header.index('发生概率')]
+        else:
+            names, probabilities = df.iloc[:, 0], df.iloc[:, 1]
+    else:
+        names, probabilities = df.iloc[:, 0], df.iloc[:, 1]
+
+    names = names.map(str).str.strip()
+    probabilities = pd.to_numeric(probabilities, errors='coerce')
+    invalid = probabilities.isna() | (probabilities < 0) | (probabilities > 1)
+    if invalid.any():
+        rows = [str(i + 1) for i in invalid[invalid].index[:20]]
+        raise ValueError(f"事件表中概率无效（应为 0-1 之间的数字），行: {', '.join(rows)}")
+    return dict(zip(names, probabilities.astype(float)))
+
+
+def discover_jobs(source: str, shared_events: Optional[str] = None) -> List[Dict[str, Any]]:
+    """根据目录或清单文件生成任务列表"""
+    jobs = []
+    if os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            stem, suffix = os.path.splitext(filename)
+            if suffix.lower() not in LOGIC_SUFFIXES:
+                continue
+            events = shared_events
+            for event_suffix in EVENT_SUFFIXES:
+                candidate = os.path.join(source, stem + event_suffix)
+                if os.path.exists(candidate):
+                    events = candidate
+                    break
+            jobs.append({"model": stem, "logic": os.path.join(source, filename), "events": events, "top_event": None})
+        return jobs
+
+    base = os.path.dirname(os.path.abspath(source))
+    if source.lower().endswith('.csv'):
+        records = pd.read_csv(source, dtype=str).where(lambda df: df.notna(), None).to_dict('records')
+    elif source.lower().endswith('.jsonl'):
+        with open(source, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    elif source.lower().endswith('.json'):
+        with open(source, encoding='utf-8') as f:
+            records = json.load(f)
+    else:
+        raise ValueError(f"不支持的清单格式: {source}")
+
+    for record in records:
+        logic = os.path.join(base, record['logic'])
+        events = record.get('events') or shared_events
+        jobs.append({
+            "model": record.get('model') or os.path.splitext(os.path.basename(logic))[0],
+            "logic": logic,
+            "events": os.path.join(base, events) if events else None,
+            "top_event": record.get('top_event'),
+        })
+    return jobs
+
+
+def analyze_model(job: Dict[str, Any], strict: bool = False, include_cut_sets: bool = True,
+                  memory_budget_mb: Optional[float] = None, spill_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    分析单个模型，异常被记录在结果中而不是抛出。
+
+    给出 memory_budget_mb 时最小割集在内存预算内生成，超出部分溢出到 spill_dir；
+    不输出割集内容时割集从溢出文件惰性读取，只用于计数和重要度。
+    """
+    timings: Dict[str, float] = {}
+    result: Dict[str, Any] = {"model": job["model"], "top_event": job.get("top_event"), "status": "ok",
+                              "error": None, "timings": timings}
+    start = last = time.perf_counter()
+
+    def lap(phase):
+        nonlocal last
+        now = time.perf_counter()
+        timings[phase] = now - last
+        last = now
+
+    try:
+        if not job.get("events"):
+            raise ValueError("未找到底事件表")
+        events = read_event_table(job["events"])
+        lap("read_events")
+
+        with open(job["logic"], encoding='utf-8') as f:
+            logic_expr = f.read()
+        definitions = parse_event_definitions(logic_expr, parse_strict_expression if strict else None)
+        if not definitions:
+            raise ValueError("逻辑表达式为空")
+        top_event = job.get("top_event") or next(iter(definitions))
+        if top_event not in definitions:
+            raise ValueError(f"顶事件 '{top_event}' 未在逻辑表达式中定义")
+        result["top_event"] = top_event
+        lap("parse")
+
+        tree = compile_tree(definitions[top_event], definitions)
+        missing = [name for name in tree.basic_events() if name not in events]
+        if missing:
+            raise ValueError(f"以下基本事件未在底事件列表中定义: {', '.join(missing[:20])}")
+        result["node_count"] = len(tree)
+        result["structure_hash"] = tree.structure_hash()
+        lap("compile")
+
+        result["coherent"] = tree.coherent
+        if tree.coherent:
+            p_top = ProbabilityEvaluator(tree, events).top_probability()
+        else:
+            # 非相干树：BDD 上的精确概率，割集一栏输出质蕴涵
+            bdd, root = build_bdd(tree)
+            p_top = bdd.probability(root, [events[name] for name in bdd.variables])
+        result["probability"] = p_top
+        lap("probability")
+
+        basic_events = {name: events[name] for name in tree.basic_events()}
+        if tree.coherent and memory_budget_mb:
+            with bounded_minimal_cut_sets(tree, int(memory_budget_mb * 2 ** 20), spill_dir) as spilled:
+                result["cut_set_count"] = len(spilled)
+                if include_cut_sets:
+                    result["minimal_cut_sets"] = list(spilled)
+                result["spill"] = spilled.stats
+                lap("cut_sets")
+                importance = fussell_vesely(result.get("minimal_cut_sets", spilled), basic_events, p_top)
+        else:
+            cut_sets = minimal_cut_sets(tree) if tree.coherent else prime_implicants(tree, bdd, root)
+            result["cut_set_count"] = len(cut_sets)
+            if include_cut_sets:
+                result["minimal_cut_sets"] = cut_sets
+            lap("cut_sets")
+            importance = fussell_vesely(cut_sets, basic_events, p_top)
+        result["importance"] = dict(sorted(importance.items(), key=lambda item: item[1], reverse=True))
+        lap("importance")
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["traceback"] = traceback.format_exc(limit=5)
+
+    timings["total"] = time.perf_counter() - start
+    return result
+
+
+def _flatten(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Parquet 使用扁平列：耗时展开为 time_* 列，嵌套结构序列化为 JSON 字符串"""
+    row = {key: value for key, value in record.items() if key != "timings"}
+    for phase, seconds in record["timings"].items():
+        row[f"time_{phase}"] = seconds
+    for key in ("minimal_cut_sets", "importance", "spill"):
+        if key in row:
+            row[key] = json.dumps(row[key], ensure_ascii=False)
+    return row
+
+
+def _error_record(job: Dict[str, Any], error: BaseException) -> Dict[str, Any]:
+    """工作进程崩溃等无法在 analyze_model 内捕获的错误"""
+    return {"model": job["model"], "top_event": job.get("top_event"), "status": "error",
+            "error": f"{type(error).__name__}: {error}", "timings": {}}
+
+
+def _run_pool(queue: collections.deque, workers: int, args: tuple, write) -> List[Any]:
+    """
+    在一个进程池中依次取出 queue 中的任务执行，结果交给 write。同时最多提交 2 × workers 个任务
+    （每个工作进程再预取一个，避免空等），进程池崩溃时受牵连的任务数因此有界。
+
+    进程池因工作进程崩溃失效时返回已提交而未完成的 [(任务, 错误)]，未提交的任务仍留在 queue 中。
+    """
+    crashed = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        while (queue and not crashed) or running:
+            while queue and not crashed and len(running) < 2 * workers:
+                job = queue.popleft()
+                running[executor.submit(analyze_model, job, *args)] = job
+            finished, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.ALL_COMPLETED if crashed else concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                job = running.pop(future)
+                try:
+                    record = future.result()
+                except BrokenProcessPool as e:
+                    crashed.append((job, e))
+                    continue
+                except Exception as e:
+                    record = _error_record(job, e)
+                write(record)
+    return crashed
+
+
+def run_batch(jobs: List[Dict[str, Any]], output: str, workers: Optional[int] = None, strict: bool = False,
+              include_cut_sets: bool = True, log=sys.stderr, memory_budget_mb: Optional[float] = None,
+              spill_dir: Optional[str] = None) -> Dict[str, int]:
+    """
+    在进程池中分析全部任务，JSON Lines 输出按完成顺序逐行写入。
+
+    工作进程被杀死（内存不足、段错误等）时整个进程池失效，当时已提交的任务逐个在单独的
+    进程池中重试，只有再次导致崩溃的模型记为失败；其余任务在新的进程池中继续。
+    """
+    parquet = output.lower().endswith('.parquet')
+    rows = []
+    counts = {"ok": 0, "error": 0}
+    sink = None if parquet else open(output, 'w', encoding='utf-8')
+    args = (strict, include_cut_sets, memory_budget_mb, spill_dir)
+
+    def write(record):
+        counts[record["status"]] += 1
+        if parquet:
+            rows.append(_flatten(record))
+        else:
+            sink.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if log:
+            status = record["status"] if record["status"] == "ok" else f"失败 - {record['error']}"
+            print(f"[{counts['ok'] + counts['error']}/{len(jobs)}] {record['model']}: {status}", file=log)
+
+    try:
+        queue = collections.deque(jobs)
+        while queue:
+            crashed = _run_pool(queue, workers or os.cpu_count() or 1, args, write)
+            for job, error in crashed:
+                if _run_pool(collections.deque([job]), 1, args, write):
+                    write(_error_record(job, error))
+    finally:
+        if sink:
+            sink.close()
+
+    if parquet:
+        pd.DataFrame(rows).to_parquet(output, index=False)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="故障树批量分析")
+    parser.add_argument("source", help="模型目录，或 .csv/.json/.jsonl 清单文件")
+    parser.add_argument("-o", "--output", default="fta_results.jsonl", help="输出文件 (.jsonl 或 .parquet)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="工作进程数，缺省为 CPU 核数")
+    parser.add_argument("--events", help="模型没有同名事件表时使用的公共底事件表")
+    parser.add_argument("--strict", action="store_true", help="使用严格的运算符优先级解析表达式（支持任意嵌套括号）")
+    parser.add_argument("--no-cut-sets", action="store_true", help="只输出割集数量，不输出割集内容")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不输出逐个模型的进度")
+    parser.add_argument("--memory-budget", type=float, default=None, metavar="MB",
+                        help="每个工作进程生成最小割集的内存预算，超出部分溢出到磁盘")
+    parser.add_argument("--spill-dir", default=None, help="溢出文件目录，缺省为系统临时目录")
+    args = parser.parse_args(argv)
+
+    if args.output.lower().endswith('.parquet') and not any(
+            importlib.util.find_spec(engine) for engine in ('pyarrow', 'fastparquet')):
+        print("输出 Parquet 需要安装 pyarrow 或 fastparquet", file=sys.stderr)
+        return 2
+
+    jobs = discover_jobs(args.source, args.events)
+    if not jobs:
+        print("未找到任何模型", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    counts = run_batch(jobs, args.output, args.workers, args.strict, not args.no_cut_sets,
+                       None if args.quiet else sys.stderr, args.memory_budget, args.spill_dir)
+    print(f"完成: {counts['ok']} 个成功，{counts['error']} 个失败，用时 {time.perf_counter() - start:.1f} 秒，"
+          f"结果已写入 {args.output}", file=sys.stderr)
+    return 0 if counts["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
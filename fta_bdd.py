@@ -0,0 +1,328 @@
+# fta_bdd.py
+"""
+二元决策图 (BDD) 上的精确分析
+
+非相干故障树（含非门、异或门）中同一底事件可能以正、反两种形式出现，
+割集概率之和与独立性假设都不再成立。本模块把编译后的 DAG 转换为有序 BDD：
+
+- 精确的顶事件概率：沿 BDD 自底向上一次遍历；
+- 质蕴涵：按 Rauzy 的分解 PI(f) = PI(f1·f0) ∪ x·[PI(f1) - PI(f1·f0)] ∪ ¬x·[PI(f0) - PI(f1·f0)] 计算，
+  对相干函数其结果即为最小割集。
+
+BDD 节点在表中按创建顺序存放，子节点的下标总小于父节点；所有运算均使用显式栈。
+"""
+from typing import Dict, List, Optional, Tuple
+
+from fta_engine import CompiledTree, BASIC, VOTE, NOT, XOR, INHIBIT, NEGATION_PREFIX
+from fta_progress import NULL_PROGRESS
+
+FALSE, TRUE = 0, 1
+_AND, _OR, _XOR = 'AND', 'OR', 'XOR'
+
+
+class BDDTooLarge(Exception):
+    """节点数超过 max_nodes，调用方应改用近似方法"""
+
+
+class BDD:
+    """共享唯一表的有序 BDD，变量序为 variables 的顺序"""
+
+    def __init__(self, variables: List[str], max_nodes: Optional[int] = None):
+        self.variables = variables
+        self.max_nodes = max_nodes
+        terminal_level = len(variables)
+        self.level: List[int] = [terminal_level, terminal_level]
+        self.low: List[int] = [FALSE, TRUE]
+        self.high: List[int] = [FALSE, TRUE]
+        self._unique: Dict[Tuple[int, int, int], int] = {}
+        self._apply_cache: Dict[Tuple[str, int, int], int] = {}
+        self._not_cache: Dict[int, int] = {FALSE: TRUE, TRUE: FALSE}
+
+    def __len__(self) -> int:
+        return len(self.level)
+
+    def node(self, level: int, low: int, high: int) -> int:
+        if low == high:
+            return low
+        key = (level, low, high)
+        idx = self._unique.get(key)
+        if idx is None:
+            idx = len(self.level)
+            if self.max_nodes is not None and idx >= self.max_nodes:
+                raise BDDTooLarge(f"BDD 节点数超过上限 {self.max_nodes}")
+            self._unique[key] = idx
+            self.level.append(level)
+            self.low.append(low)
+            self.high.append(high)
+        return idx
+
+    def variable(self, level: int) -> int:
+        return self.node(level, FALSE, TRUE)
+
+    def negate(self, f: int) -> int:
+        cache = self._not_cache
+        stack = [f]
+        while stack:
+            g = stack[-1]
+            if g in cache:
+                stack.pop()
+                continue
+            low, high = self.low[g], self.high[g]
+            if low in cache and high in cache:
+                stack.pop()
+                cache[g] = self.node(self.level[g], cache[low], cache[high])
+            else:
+                stack.extend(child for child in (low, high) if child not in cache)
+        return cache[f]
+
+    def _terminal(self, op: str, f: int, g: int) -> Optional[int]:
+        if op == _AND:
+            if f == FALSE or g == FALSE:
+                return FALSE
+            if f == TRUE or f == g:
+                return g
+            if g == TRUE:
+                return f
+        elif op == _OR:
+            if f == TRUE or g == TRUE:
+                return TRUE
+            if f == FALSE or f == g:
+                return g
+            if g == FALSE:
+                return f
+        else:
+            if f == g:
+                return FALSE
+            if f == FALSE:
+                return g
+            if g == FALSE:
+                return f
+            if f == TRUE:
+                return self.negate(g)
+            if g == TRUE:
+                return self.negate(f)
+        return None
+
+    def apply(self, op: str, f: int, g: int) -> int:
+        """二元运算 AND / OR / XOR（均满足交换律，缓存键按下标排序）"""
+        cache = self._apply_cache
+
+        def key(a, b):
+            return (op, a, b) if a <= b else (op, b, a)
+
+        stack = [(f, g, False)]
+        while stack:
+            a, b, expanded = stack.pop()
+            k = key(a, b)
+            if k in cache:
+                continue
+            terminal = self._terminal(op, a, b)
+            if terminal is not None:
+                cache[k] = terminal
+                continue
+            level = min(self.level[a], self.level[b])
+            a0, a1 = (self.low[a], self.high[a]) if self.level[a] == level else (a, a)
+            b0, b1 = (self.low[b], self.high[b]) if self.level[b] == level else (b, b)
+            if expanded:
+                cache[k] = self.node(level, cache[key(a0, b0)], cache[key(a1, b1)])
+            else:
+                stack.append((a, b, True))
+                stack.append((a0, b0, False))
+                stack.append((a1, b1, False))
+        return cache[key(f, g)]
+
+    def fold(self, op: str, operands: List[int]) -> int:
+        result = operands[0]
+        for operand in operands[1:]:
+            result = self.apply(op, result, operand)
+        return result
+
+    def at_least(self, operands: List[int], k: int) -> int:
+        """至少 k 个操作数为真，at_least[j] = at_least[j] ∨ (at_least[j-1] ∧ x)"""
+        table = [TRUE] + [FALSE] * k
+        for operand in operands:
+            for j in range(k, 0, -1):
+                table[j] = self.apply(_OR, table[j], self.apply(_AND, table[j - 1], operand))
+        return table[k]
+
+    def probability(self, root: int, probabilities: List[float]) -> float:
+        """probabilities 按变量序给出各底事件的概率"""
+        values = [0.0, 1.0]
+        for idx in range(2, root + 1):
+            p = probabilities[self.level[idx]]
+            values.append(p * values[self.high[idx]] + (1 - p) * values[self.low[idx]])
+        return values[root]
+
+    def probabilities(self, roots: List[int], probabilities: List[float]) -> List[float]:
+        """多个根节点的概率，只遍历一次到 max(roots) 为止的节点；顺序与 roots 相同"""
+        values = [0.0, 1.0]
+        for idx in range(2, max(roots) + 1):
+            p = probabilities[self.level[idx]]
+            values.append(p * values[self.high[idx]] + (1 - p) * values[self.low[idx]])
+        return [values[root] for root in roots]
+
+    def gradient(self, root: int, probabilities: List[float]) -> Tuple[float, List[float]]:
+        """
+        顶事件概率及其对每个变量概率的偏导数（Birnbaum 重要度）。
+
+        顶事件概率对单个变量是线性的：P(p_i = x) = P + (x - p_i) · ∂P/∂p_i，
+        因此一次正向、一次反向遍历即可得到任意单变量扰动下的精确值。
+        """
+        values = [0.0, 1.0]
+        for idx in range(2, root + 1):
+            p = probabilities[self.level[idx]]
+            values.append(p * values[self.high[idx]] + (1 - p) * values[self.low[idx]])
+        adjoint = [0.0] * (root + 1)
+        adjoint[root] = 1.0
+        grad = [0.0] * len(self.variables)
+        for idx in range(root, 1, -1):
+            weight = adjoint[idx]
+            if weight == 0.0:
+                continue
+            high, low = self.high[idx], self.low[idx]
+            p = probabilities[self.level[idx]]
+            grad[self.level[idx]] += weight * (values[high] - values[low])
+            adjoint[high] += weight * p
+            adjoint[low] += weight * (1 - p)
+        return values[root], grad
+
+    def prime_implicants(self, root: int, progress=NULL_PROGRESS,
+                         memo: Optional[Dict[int, frozenset]] = None) -> List[frozenset]:
+        """
+        质蕴涵，每个为 (变量层级, 是否为正文字) 的集合；progress 按新完成的 BDD 节点报告。
+
+        memo 为 {BDD 节点: 质蕴涵} 缓存，对多个根节点传入同一个字典时共用已算出的子函数结果。
+        """
+        if memo is None:
+            memo = {}
+        memo.setdefault(FALSE, frozenset())
+        memo.setdefault(TRUE, frozenset((frozenset(),)))
+        stack = [root]
+        while stack:
+            f = stack[-1]
+            if f in memo:
+                stack.pop()
+                continue
+            f0, f1 = self.low[f], self.high[f]
+            common = self.apply(_AND, f0, f1)
+            missing = [g for g in (f1, f0, common) if g not in memo]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            x = self.level[f]
+            shared = memo[common]
+            result = set(shared)
+            result.update(p | {(x, True)} for p in memo[f1] - shared)
+            result.update(p | {(x, False)} for p in memo[f0] - shared)
+            memo[f] = frozenset(result)
+            progress.step(1, len(result))
+        return list(memo[root])
+
+
+def variable_order(tree: CompiledTree, substitutes: Optional[Dict[str, List[str]]] = None) -> List[str]:
+    """
+    按从根节点（依次从各顶事件）深度优先首次访问的顺序排列底事件，结构上相邻的事件在 BDD 中也相邻。
+
+    被 substitutes 替换的底事件在原位置展开为各替换事件（已出现过的事件不重复）。
+    """
+    substitutes = substitutes or {}
+    order, seen, placed = [], set(), set()
+    stack = list(reversed(tree.roots))
+    while stack:
+        idx = stack.pop()
+        if idx in seen:
+            continue
+        seen.add(idx)
+        if tree.types[idx] == BASIC:
+            for name in substitutes.get(tree.names[idx], (tree.names[idx],)):
+                if name not in placed:
+                    placed.add(name)
+                    order.append(name)
+        stack.extend(reversed(tree.children[idx]))
+    return order
+
+
+def build_bdd(tree: CompiledTree, substitutes: Optional[Dict[str, List[str]]] = None,
+              max_nodes: Optional[int] = None, progress=NULL_PROGRESS) -> Tuple[BDD, int]:
+    """
+    把编译后的 DAG 转换为 BDD，返回 (BDD, 顶事件节点)。
+
+    substitutes 中的底事件被视为其替换事件之或，替换事件作为共享变量进入 BDD；
+    给出 max_nodes 时节点数超限会抛出 BDDTooLarge。progress 每转换一个 DAG 节点报告一次。
+    """
+    bdd, roots = build_bdd_tops(tree, substitutes, max_nodes, progress)
+    return bdd, roots[0]
+
+
+def build_bdd_tops(tree: CompiledTree, substitutes: Optional[Dict[str, List[str]]] = None,
+                   max_nodes: Optional[int] = None, progress=NULL_PROGRESS) -> Tuple[BDD, List[int]]:
+    """
+    与 build_bdd 相同，但返回 (BDD, 各顶事件的节点)，顺序与 tree.roots 相同。
+
+    所有顶事件共用一个 BDD（唯一表与运算缓存），共享子树只转换一次。
+    """
+    substitutes = substitutes or {}
+    bdd = BDD(variable_order(tree, substitutes), max_nodes)
+    levels = {name: level for level, name in enumerate(bdd.variables)}
+    nodes: List[int] = []
+    progress.start("bdd", len(tree))
+    for idx, node_type in enumerate(tree.types):
+        kids = [nodes[child] for child in tree.children[idx]]
+        if node_type == BASIC:
+            names = substitutes.get(tree.names[idx], (tree.names[idx],))
+            f = bdd.fold(_OR, [bdd.variable(levels[name]) for name in names])
+        elif not kids:
+            f = FALSE
+        elif node_type in ('AND', INHIBIT):
+            f = bdd.fold(_AND, kids)
+        elif node_type == 'OR':
+            f = bdd.fold(_OR, kids)
+        elif node_type == XOR:
+            f = bdd.fold(_XOR, kids)
+        elif node_type == NOT:
+            f = bdd.negate(kids[0])
+        elif node_type == VOTE:
+            f = bdd.at_least(kids, tree.k[idx])
+        else:
+            f = FALSE
+        nodes.append(f)
+        progress.step()
+    return bdd, [nodes[root] for root in tree.roots]
+
+
+def bdd_probability(tree: CompiledTree, events: Dict[str, float]) -> float:
+    """顶事件的精确概率（对共享事件和非相干结构均成立）"""
+    bdd, root = build_bdd(tree)
+    return bdd.probability(root, [events.get(name, 0.0) for name in bdd.variables])
+
+
+def prime_implicants(tree: CompiledTree, bdd: Optional[BDD] = None, root: Optional[int] = None,
+                     progress=NULL_PROGRESS) -> List[List[str]]:
+    """质蕴涵，按阶数和名称排序；取反的事件写作 "NOT 事件名\""""
+    if bdd is None:
+        bdd, root = build_bdd(tree, progress=progress)
+    # 需要访问的 BDD 节点数事先未知（共同部分 f1·f0 会生成新节点）
+    progress.start("cut_sets")
+    return _decode_implicants(bdd, bdd.prime_implicants(root, progress))
+
+
+def top_prime_implicants(tree: CompiledTree, bdd: Optional[BDD] = None, roots: Optional[List[int]] = None,
+                         progress=NULL_PROGRESS) -> List[List[List[str]]]:
+    """各顶事件的质蕴涵（顺序与 tree.roots 相同），顶事件之间共用子函数的质蕴涵缓存"""
+    if bdd is None:
+        bdd, roots = build_bdd_tops(tree, progress=progress)
+    progress.start("cut_sets")
+    memo: Dict[int, frozenset] = {}
+    return [_decode_implicants(bdd, bdd.prime_implicants(root, progress, memo)) for root in roots]
+
+
+def _decode_implicants(bdd: BDD, implicants: List[frozenset]) -> List[List[str]]:
+    result = []
+    for implicant in implicants:
+        literals = sorted(implicant, key=lambda literal: bdd.variables[literal[0]])
+        result.append([bdd.variables[level] if positive else NEGATION_PREFIX + bdd.variables[level]
+                       for level, positive in literals])
+    result.sort(key=lambda literals: (len(literals), literals))
+    return result
+
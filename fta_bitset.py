@@ -0,0 +1,140 @@
+# fta_bitset.py
+"""
+位集表示的割集与索引化最小化
+
+割集表示为 Python 整数位集：底事件名经 EventIndex 映射为位下标，
+与门的组合就是按位或，子集判断是 (s & ~c) == 0。
+
+最小化先去重并按大小（位数）分桶，从小到大处理：同样大小的不同集合互不包含，
+因此每个候选只需与已保留的更小集合比较。已保留的集合按"签名元素"建立倒排索引，
+集合 s 包含于候选 c 必然要求 s 的签名在 c 中，所以候选只需检查其元素中作为签名出现过的索引桶，
+而不是全部已保留集合。签名缺省取最低位；候选较多（不少于 FREQUENCY_MIN 个）时先统计各位的
+出现次数，取集合中出现次数最少的元素，使索引桶更均匀，统计本身的开销只在大族上才划算。
+"""
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+CHECK_BLOCK = 4096  # minimize 每处理这么多候选调用一次 check
+FREQUENCY_MIN = 4096  # 去重后的候选数不少于此值时按位频率选择签名，否则取最低位
+
+
+class EventIndex:
+    """底事件名与位下标之间的双向映射"""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        for name in names:
+            self.bit(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def bit(self, name: str) -> int:
+        idx = self.ids.get(name)
+        if idx is None:
+            idx = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return idx
+
+    def mask(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            mask |= 1 << self.bit(name)
+        return mask
+
+    def decode(self, mask: int) -> List[str]:
+        """位集 -> 按名称排序的底事件列表"""
+        return sorted(self.names[bit] for bit in iter_bits(mask))
+
+
+def pack_masks(masks: Iterable[int], words: int) -> bytes:
+    """位集 -> 每个 words 个 little-endian uint64 的定长字节串，供溢出文件与共享内存使用"""
+    nbytes = 8 * words
+    return b"".join(mask.to_bytes(nbytes, 'little') for mask in masks)
+
+
+def unpack_masks(buffer, words: int) -> List[int]:
+    nbytes = 8 * words
+    data = bytes(buffer)
+    return [int.from_bytes(data[position:position + nbytes], 'little') for position in range(0, len(data), nbytes)]
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class MinimalSetIndex:
+    """
+    已保留的最小集合及其签名倒排索引。
+
+    调用方须按集合大小从小到大依次 add，covers(c) 判断是否已有保留集合包含于 c。
+    frequency 为各位在候选中的出现次数，用于选择签名元素；缺省时取最低位。
+    """
+
+    def __init__(self, frequency: Optional[Dict[int, int]] = None):
+        self.frequency = frequency
+        self.masks: List[int] = []
+        self._buckets: Dict[int, List[int]] = {}
+        self._signatures = 0  # 各索引桶签名位之并
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+    def covers(self, mask: int) -> bool:
+        buckets = self._buckets
+        for bit in iter_bits(mask & self._signatures):
+            for kept in buckets[bit]:
+                if not kept & ~mask:
+                    return True
+        return False
+
+    def add(self, mask: int) -> None:
+        if self.frequency is None:
+            signature = (mask & -mask).bit_length() - 1
+        else:
+            signature = min(iter_bits(mask), key=lambda bit: self.frequency.get(bit, 0))
+        self._buckets.setdefault(signature, []).append(mask)
+        self._signatures |= 1 << signature
+        self.masks.append(mask)
+
+
+def bit_frequency(masks: Iterable[int], frequency: Optional[Dict[int, int]] = None) -> Dict[int, int]:
+    """各位的出现次数；给出 frequency 时累加到其中"""
+    frequency = {} if frequency is None else frequency
+    for mask in masks:
+        for bit in iter_bits(mask):
+            frequency[bit] = frequency.get(bit, 0) + 1
+    return frequency
+
+
+def minimize(masks: Iterable[int], check: Optional[Callable[[int], None]] = None) -> List[int]:
+    """
+    去除重复位集及包含其他位集的超集，结果按大小排序。
+
+    check(n) 在每处理完 n 个（去重后的）候选后调用一次，可用于报告进度或抛出异常中止。
+    """
+    unique = sorted(set(masks), key=int.bit_count)
+    if len(unique) < 2 or unique[0] == 0:
+        return unique[:1]
+    block = len(unique) if check is None else CHECK_BLOCK
+    frequency = None
+    if len(unique) >= FREQUENCY_MIN:
+        # 统计位频率同样按块进行，块之间调用 check(0)
+        frequency = {}
+        for start in range(0, len(unique), block):
+            bit_frequency(unique[start:start + block], frequency)
+            if check is not None:
+                check(0)
+    index = MinimalSetIndex(frequency)
+    smallest = unique[0].bit_count()
+    for start in range(0, len(unique), block):
+        for mask in unique[start:start + block]:
+            # 最小的一批集合互不包含，无需检查
+            if mask.bit_count() == smallest or not index.covers(mask):
+                index.add(mask)
+        if check is not None:
+            check(min(block, len(unique) - start))
+    return index.masks
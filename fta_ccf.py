@@ -0,0 +1,110 @@
+# fta_ccf.py
+"""
+共因失效 (CCF) 组
+
+请求中声明的 CCF 组不会被展开到逻辑表达式里。分析时每个成员底事件被视为
+"独立失效 or 包含该成员的各共因事件"，由引擎在计算割集 / 构造 BDD 时就地替换
+（substitutes），共因事件作为隐式的共享底事件参与运算，故障树本身保持不变。
+
+- beta 因子模型：一个共因事件（全部成员同时失效），Q_ccf = β·Qt，独立部分为 (1-β)·Q；
+- alpha 因子模型（非交错试验）：每个大小为 k 的成员子集一个共因事件，
+  Q_k = k / C(m-1, k-1) · α_k / α_t · Qt，α_t = Σ k·α_k，独立部分为 α_1 / α_t · Q。
+
+Qt 缺省取各成员概率的平均值；共因事件命名为 "组名[成员1,成员2,...]"。
+"""
+import itertools
+from math import comb
+from typing import Dict, List, NamedTuple, Optional
+
+from fta_engine import literal_event
+
+BETA = 'beta'
+ALPHA = 'alpha'
+
+
+class CCFGroup(NamedTuple):
+    name: str
+    members: List[str]
+    model: str
+    beta: Optional[float] = None
+    alphas: Optional[List[float]] = None  # α_1 ... α_m
+    total_probability: Optional[float] = None
+
+
+class CCFExpansion(NamedTuple):
+    substitutes: Dict[str, List[str]]  # 成员 -> [独立部分(沿用成员名), 共因事件...]
+    probabilities: Dict[str, float]    # 成员独立部分与全部共因事件的概率
+    groups: Dict[str, str]             # 共因事件 -> 组名
+
+
+def validate_group(group: CCFGroup) -> None:
+    if len(group.members) < 2 or len(set(group.members)) != len(group.members):
+        raise ValueError(f"CCF 组 '{group.name}' 至少需要 2 个互不相同的成员")
+    if group.model == BETA:
+        if group.beta is None or not 0 <= group.beta <= 1:
+            raise ValueError(f"CCF 组 '{group.name}' 使用 beta 因子模型，beta 必须在 0 到 1 之间")
+    elif group.model == ALPHA:
+        if not group.alphas or len(group.alphas) != len(group.members):
+            raise ValueError(f"CCF 组 '{group.name}' 使用 alpha 因子模型，需要 {len(group.members)} 个 alpha 参数")
+        if any(a < 0 for a in group.alphas) or sum(group.alphas) <= 0:
+            raise ValueError(f"CCF 组 '{group.name}' 的 alpha 参数必须非负且不全为 0")
+    else:
+        raise ValueError(f"CCF 组 '{group.name}' 的模型 '{group.model}' 无效，应为 beta 或 alpha")
+
+
+def expand_groups(groups: List[CCFGroup], events: Dict[str, float]) -> CCFExpansion:
+    """计算各成员的替换事件及概率；成员必须是已定义的底事件，且只能属于一个组"""
+    substitutes: Dict[str, List[str]] = {}
+    probabilities: Dict[str, float] = {}
+    owners: Dict[str, str] = {}
+    for group in groups:
+        validate_group(group)
+        for member in group.members:
+            if member not in events:
+                raise ValueError(f"CCF 组 '{group.name}' 的成员 '{member}' 未在底事件列表中定义")
+            if member in substitutes:
+                raise ValueError(f"底事件 '{member}' 同时属于多个 CCF 组")
+            substitutes[member] = [member]
+
+        m = len(group.members)
+        q_total = group.total_probability
+        if q_total is None:
+            q_total = sum(events[member] for member in group.members) / m
+        if group.model == BETA:
+            independent = 1 - group.beta
+            subset_probability = {m: group.beta * q_total}
+        else:
+            alpha_t = sum(k * a for k, a in enumerate(group.alphas, 1))
+            independent = group.alphas[0] / alpha_t
+            subset_probability = {k: k / comb(m - 1, k - 1) * group.alphas[k - 1] / alpha_t * q_total
+                                  for k in range(2, m + 1)}
+
+        for member in group.members:
+            probabilities[member] = independent * events[member]
+        for size, probability in subset_probability.items():
+            for subset in itertools.combinations(group.members, size):
+                event = f"{group.name}[{','.join(subset)}]"
+                probabilities[event] = probability
+                owners[event] = group.name
+                for member in subset:
+                    substitutes[member].append(event)
+    return CCFExpansion(substitutes, probabilities, owners)
+
+
+def ccf_contributions(cut_sets: List[List[str]], cut_set_probabilities: List[float], expansion: CCFExpansion,
+                      top_prob: float) -> List[Dict[str, object]]:
+    """按组汇总含共因事件的割集：割集数、概率之和及其占顶事件概率的比例"""
+    summary = {}
+    for name in expansion.groups.values():
+        summary.setdefault(name, {"group": name, "events": {}, "cut_set_count": 0, "contribution": 0.0})
+    for event, name in expansion.groups.items():
+        summary[name]["events"][event] = expansion.probabilities[event]
+    for cut_set, p_cut in zip(cut_sets, cut_set_probabilities):
+        # 只统计共因事件以发生（正文字）形式出现的割集
+        events = [event for event, positive in map(literal_event, cut_set) if positive]
+        for name in {expansion.groups[e] for e in events if e in expansion.groups}:
+            summary[name]["cut_set_count"] += 1
+            summary[name]["contribution"] += p_cut
+    for entry in summary.values():
+        entry["fraction"] = entry["contribution"] / top_prob if top_prob > 0 else 0.0
+    return list(summary.values())
@@ -0,0 +1,509 @@
+# fta_engine.py
+"""
+故障树分析核心引擎
+
+本模块不依赖 tkinter 与 FastAPI，供 GUI (fta_new) 与 API (fta_api) 共同使用。
+它把门结构字典编译为紧凑的有向无环图 (DAG)：相同的子树只保留一个节点，
+所有遍历均使用显式栈完成，不依赖 Python 递归。
+
+只含与门、或门、表决门和禁止门的树是相干的，走最小割集路径；含非门或异或门的
+非相干树需要在 BDD 上计算精确概率与质蕴涵（见 fta_bdd）。
+"""
+import hashlib
+import heapq
+import itertools
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fta_bitset import EventIndex, iter_bits, minimize
+from fta_progress import NULL_PROGRESS
+
+BASIC = 'BASIC'
+VOTE = 'VOTE'
+NOT = 'NOT'
+XOR = 'XOR'
+INHIBIT = 'INHIBIT'  # 条件与门：children 为 [输入, 条件]
+GATE_LABELS = {'OR': "或门 (OR)", 'AND': "与门 (AND)", NOT: "非门 (NOT)", XOR: "异或门 (XOR)",
+               INHIBIT: "禁止门 (INHIBIT)"}
+COHERENT_TYPES = frozenset((BASIC, 'OR', 'AND', VOTE, INHIBIT))
+NEGATION_PREFIX = "NOT "  # 质蕴涵中取反的底事件写作 "NOT 事件名"
+
+
+def gate_label(gate_type: str, k: int = 0, n: int = 0) -> str:
+    """门的显示名称，表决门显示为 k/n"""
+    if gate_type == VOTE:
+        return f"表决门 ({k}/{n})"
+    return GATE_LABELS.get(gate_type, gate_type)
+
+
+class CompiledTree:
+    """编译后的故障树 DAG，节点按拓扑序存放（子节点总在父节点之前）"""
+
+    __slots__ = ('types', 'names', 'children', 'k', 'ids', 'root', 'roots', 'coherent')
+
+    def __init__(self):
+        self.types: List[str] = []
+        self.names: List[Optional[str]] = []
+        self.children: List[Tuple[int, ...]] = []
+        self.k: List[int] = []  # 表决门的 k，其他节点为 0
+        self.ids: List[Optional[int]] = []  # 解析器写入的结构 id（见 fta_parser.assign_node_ids），没有时为 None
+        self.root: int = -1
+        self.roots: List[int] = []  # 各顶事件的节点（见 compile_tops），root 为其中第一个
+        self.coherent: bool = True  # 编译时检查：不含非门与异或门
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def is_basic(self, idx: int) -> bool:
+        return self.types[idx] == BASIC
+
+    def basic_events(self) -> List[str]:
+        """按拓扑序返回所有底事件名称"""
+        return [self.names[i] for i, t in enumerate(self.types) if t == BASIC]
+
+    def edges(self) -> List[Tuple[int, int]]:
+        """返回所有 (父节点, 子节点) 边，共享节点的每个父节点各有一条边"""
+        return [(parent, child) for parent, kids in enumerate(self.children) for child in kids]
+
+    def parents(self) -> List[List[int]]:
+        """每个节点的父节点列表"""
+        parents: List[List[int]] = [[] for _ in self.types]
+        for parent, kids in enumerate(self.children):
+            for child in kids:
+                parents[child].append(parent)
+        return parents
+
+    def node_hashes(self) -> List[str]:
+        """
+        每个节点的结构哈希（类型、名称及子节点哈希的摘要）。
+
+        只依赖节点自身的子树，与节点下标无关，因此可在结构不同的两次编译结果之间匹配相同子树。
+        """
+        hashes: List[str] = []
+        for idx, node_type in enumerate(self.types):
+            digest = hashlib.sha1(f"{node_type}\x00{self.names[idx]}".encode('utf-8'))
+            if node_type == VOTE:
+                digest.update(f"\x00{self.k[idx]}".encode('ascii'))
+            for child in self.children[idx]:
+                digest.update(hashes[child].encode('ascii'))
+            hashes.append(digest.hexdigest())
+        return hashes
+
+    def structure_hash(self, hashes: Optional[List[str]] = None) -> str:
+        """整棵树的结构哈希，概率变化不影响该值；多个顶事件时覆盖全部顶事件及其顺序。hashes 为已算出的 node_hashes()"""
+        hashes = hashes or self.node_hashes()
+        if len(self.roots) <= 1:
+            return hashes[self.root]
+        return hashlib.sha1("".join(hashes[root] for root in self.roots).encode('ascii')).hexdigest()
+
+    def depths(self) -> List[int]:
+        """计算每个节点距根节点（多个顶事件时为最近的顶事件）的最大层级"""
+        depth = [0] * len(self.types)
+        reachable = [False] * len(self.types)
+        for root in self.roots:
+            reachable[root] = True
+        for idx in range(len(self.types) - 1, -1, -1):
+            if not reachable[idx]:
+                continue
+            for child in self.children[idx]:
+                reachable[child] = True
+                if depth[idx] + 1 > depth[child]:
+                    depth[child] = depth[idx] + 1
+        return depth
+
+
+def compile_tree(gate: Dict[str, Any], definitions: Optional[Dict[str, Dict[str, Any]]] = None,
+                 progress=NULL_PROGRESS) -> CompiledTree:
+    """
+    将门结构编译为 DAG。
+
+    definitions 为多行定义解析出的 {事件名: 门结构}，名称出现在其中的 BASIC 子节点
+    会被替换为对应定义。同名底事件、结构相同的门（类型、名称、子节点均相同）只生成一个节点；
+    带有结构 id 的门按 id 合并，名称不同但结构相同的子树也共用一个节点。
+    progress 为 fta_progress.ProgressToken，每完成一个节点报告一次并检查取消。
+    """
+    return compile_tops([gate], definitions, progress)
+
+
+def compile_tops(gates: List[Dict[str, Any]], definitions: Optional[Dict[str, Dict[str, Any]]] = None,
+                 progress=NULL_PROGRESS) -> CompiledTree:
+    """
+    把多个顶事件编译为一个共享的 DAG（各顶事件 DAG 的并），tree.roots[i] 为 gates[i] 的节点。
+
+    顶事件之间共用的子树只有一个节点，之后的概率、割集与 BDD 计算对每个节点只做一次。
+    其余约定与 compile_tree 相同。
+    """
+    if not gates:
+        raise ValueError("至少需要一个顶事件")
+    definitions = definitions or {}
+    progress.start("compile")
+    tree = CompiledTree()
+    interned: Dict[tuple, int] = {}
+    done: Dict[int, int] = {}
+    in_progress = set()
+
+    def resolve(node):
+        if node['type'] == BASIC and node['name'] in definitions:
+            return definitions[node['name']]
+        return node
+
+    roots = [resolve(gate) for gate in gates]
+    stack = [(root, False) for root in reversed(roots)]
+    while stack:
+        node, expanded = stack.pop()
+        key_id = id(node)
+        if key_id in done:
+            continue
+
+        if node['type'] == BASIC:
+            key = (BASIC, node['name'])
+        elif not expanded:
+            if key_id in in_progress:
+                raise ValueError(f"事件定义中存在循环依赖: '{node.get('name')}'")
+            in_progress.add(key_id)
+            stack.append((node, True))
+            for child in reversed(node.get('children', [])):
+                child = resolve(child)
+                if id(child) not in done:
+                    stack.append((child, False))
+            continue
+        else:
+            in_progress.discard(key_id)
+            kids = tuple(done[id(resolve(child))] for child in node.get('children', []))
+            key = (node['type'], node['id'] if 'id' in node else node.get('name'), kids, node.get('k', 0))
+
+        idx = interned.get(key)
+        if idx is None:
+            idx = len(tree.types)
+            interned[key] = idx
+            tree.types.append(node['type'])
+            tree.names.append(node.get('name'))
+            tree.children.append(key[2] if node['type'] != BASIC else ())
+            tree.k.append(node.get('k', 0))
+            tree.ids.append(node.get('id'))
+        done[key_id] = idx
+        progress.step()
+
+    tree.roots = [done[id(root)] for root in roots]
+    tree.root = tree.roots[0]
+    tree.coherent = COHERENT_TYPES.issuperset(tree.types)
+    return tree
+
+
+def gate_probability(gate_type: str, child_probs: List[float], k: int = 0) -> float:
+    """按独立性假设计算门的概率，与 fta_api.calculate_probability 的公式一致"""
+    if gate_type == 'OR':
+        q = 1.0
+        for p in child_probs:
+            q *= (1 - p)
+        return 1 - q
+    if gate_type in ('AND', INHIBIT):
+        p_all = 1.0
+        for p in child_probs:
+            p_all *= p
+        return p_all
+    if gate_type == VOTE:
+        return vote_probability(child_probs, k)
+    if gate_type == NOT:
+        return 1 - child_probs[0]
+    if gate_type == XOR:
+        # 奇数个子节点发生
+        p_odd = 0.0
+        for p in child_probs:
+            p_odd = p_odd * (1 - p) + (1 - p_odd) * p
+        return p_odd
+    return 0.0
+
+
+def vote_probability(child_probs: List[float], k: int) -> float:
+    """
+    k/n 表决门：至少 k 个子节点发生的概率，O(n·k) 动态规划。
+
+    at_least[j] (j < k) 为已处理的子节点中恰有 j 个发生的概率，at_least[k] 为至少 k 个发生的概率。
+    """
+    if k <= 0:
+        return 1.0
+    at_least = [1.0] + [0.0] * k
+    for p in child_probs:
+        at_least[k] += at_least[k - 1] * p
+        for j in range(k - 1, 0, -1):
+            at_least[j] = at_least[j] * (1 - p) + at_least[j - 1] * p
+        at_least[0] *= (1 - p)
+    return at_least[k]
+
+
+class ProbabilityEvaluator:
+    """
+    在编译后的DAG上保存每个节点的概率，并支持增量更新。
+
+    修改底事件概率后只沿父节点向上重新计算受影响的门；由于子节点下标总小于父节点，
+    按下标从小到大处理即可保证每个门只计算一次。
+    """
+
+    def __init__(self, tree: CompiledTree, events: Dict[str, float], progress=NULL_PROGRESS):
+        self.tree = tree
+        self.parents = tree.parents()
+        self.basic_index: Dict[str, int] = {}
+        self.values: List[float] = []
+        progress.start("probability", len(tree))
+        for idx, node_type in enumerate(tree.types):
+            if node_type == BASIC:
+                self.basic_index[tree.names[idx]] = idx
+                self.values.append(events.get(tree.names[idx], 0.0))
+            else:
+                self.values.append(gate_probability(node_type, [self.values[c] for c in tree.children[idx]],
+                                                    tree.k[idx]))
+            progress.step()
+
+    def top_probability(self) -> float:
+        return self.values[self.tree.root]
+
+    def top_probabilities(self) -> List[float]:
+        """各顶事件的概率，顺序与 tree.roots 相同"""
+        return [self.values[root] for root in self.tree.roots]
+
+    def update(self, changes: Dict[str, float]) -> List[int]:
+        """应用 {底事件名: 新概率}，返回概率发生变化的节点下标"""
+        changed: List[int] = []
+        heap: List[int] = []
+        queued = set()
+
+        def enqueue_parents(idx):
+            for parent in self.parents[idx]:
+                if parent not in queued:
+                    queued.add(parent)
+                    heapq.heappush(heap, parent)
+
+        for name, probability in changes.items():
+            idx = self.basic_index.get(name)
+            if idx is None or self.values[idx] == probability:
+                continue
+            self.values[idx] = probability
+            changed.append(idx)
+            enqueue_parents(idx)
+
+        while heap:
+            idx = heapq.heappop(heap)
+            value = gate_probability(self.tree.types[idx], [self.values[c] for c in self.tree.children[idx]],
+                                     self.tree.k[idx])
+            if value != self.values[idx]:
+                self.values[idx] = value
+                changed.append(idx)
+                enqueue_parents(idx)
+        return changed
+
+
+def evaluate_arrays(tree: CompiledTree, events: Dict[str, Any]) -> Any:
+    """
+    按拓扑序计算一次顶事件概率，不保留中间结果。
+
+    events 的值可以是 numpy 数组（各时间点、各抽样），门公式逐元素运算；
+    某个节点的所有父节点算完后即释放其数组，峰值内存只与 DAG 的"宽度"有关。
+    顶事件的数组保留到最后（compile_tops 的树中顶事件可能是另一个顶事件的子节点）。
+    """
+    remaining = [len(parents) for parents in tree.parents()]
+    for root in tree.roots:
+        remaining[root] += 1
+    values: List[Any] = [None] * len(tree.types)
+    for idx, node_type in enumerate(tree.types):
+        kids = tree.children[idx]
+        if node_type == BASIC:
+            values[idx] = events.get(tree.names[idx], 0.0)
+        else:
+            values[idx] = gate_probability(node_type, [values[c] for c in kids], tree.k[idx])
+        for child in kids:
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                values[child] = None
+    return values[tree.root]
+
+
+PRODUCT_BLOCK = 65536  # 与门组合时每生成这么多候选检查一次取消
+
+
+def _product(left: List[int], right: List[int], progress=NULL_PROGRESS) -> List[int]:
+    if len(left) * len(right) <= PRODUCT_BLOCK:
+        progress.step(0, len(left) * len(right))
+        return minimize([a | b for a in left for b in right])
+    # 组合数很大时分块生成，块之间报告候选数并检查取消
+    rows = max(1, PRODUCT_BLOCK // max(1, len(right)))
+    candidates: List[int] = []
+    for start in range(0, len(left), rows):
+        block = left[start:start + rows]
+        candidates.extend([a | b for a in block for b in right])
+        progress.step(0, len(block) * len(right))
+    return minimize(candidates, progress.poll)
+
+
+def minimal_cut_sets(tree: CompiledTree, substitutes: Optional[Dict[str, List[str]]] = None,
+                     product: Optional[Callable[[List[int], List[int]], List[int]]] = None,
+                     progress=NULL_PROGRESS) -> List[List[str]]:
+    """顶事件 (tree.root) 的最小割集，参数见 top_minimal_cut_sets"""
+    return top_minimal_cut_sets(tree, substitutes, product, progress)[0]
+
+
+def top_minimal_cut_sets(tree: CompiledTree, substitutes: Optional[Dict[str, List[str]]] = None,
+                         product: Optional[Callable[[List[int], List[int]], List[int]]] = None,
+                         progress=NULL_PROGRESS) -> List[List[List[str]]]:
+    """
+    按拓扑序计算各顶事件的最小割集，顺序与 tree.roots 相同。
+
+    每个门的割集只计算一次并立即化简，共享子树不会重复展开；
+    某个节点的所有父节点处理完后即释放其割集（顶事件的割集保留到最后），多个顶事件共用的子树
+    只展开一次。割集以位集表示（见 fta_bitset）。
+    非相干树没有最小割集，请使用 fta_bdd.prime_implicants。
+    substitutes 把底事件替换为若干事件之或（如 CCF 组成员，见 fta_ccf），树本身不展开。
+    product(左, 右) 计算两组位集两两之并并化简，缺省在本进程内完成（并行版本见 fta_parallel）。
+    progress 报告已处理的节点数与生成的候选割集数，并在节点之间及大的组合、化简过程中检查取消。
+    """
+    substitutes = substitutes or {}
+    if not tree.coherent:
+        raise ValueError("故障树含非门或异或门（非相干），应计算质蕴涵而不是最小割集")
+    if product is None:
+        def product(left, right):
+            return _product(left, right, progress)
+    index = EventIndex()
+    remaining = [len(parents) for parents in tree.parents()]
+    for root in tree.roots:
+        remaining[root] += 1
+    sets: List[Optional[List[int]]] = [None] * len(tree.types)
+    progress.start("cut_sets", len(tree))
+    for idx, node_type in enumerate(tree.types):
+        kids = tree.children[idx]
+        if node_type == BASIC:
+            result = [1 << index.bit(name) for name in substitutes.get(tree.names[idx], (tree.names[idx],))]
+        elif node_type == 'OR':
+            candidates = [cut_set for child in kids for cut_set in sets[child]]
+            progress.step(0, len(candidates))
+            result = minimize(candidates, progress.poll)
+        elif node_type in ('AND', INHIBIT):
+            result = [0]
+            for child in kids:
+                result = product(result, sets[child])
+            if not kids:
+                result = []
+        elif node_type == VOTE:
+            # 任取 k 个子节点相与，不展开为组合门
+            combined = []
+            for combo in itertools.combinations(kids, tree.k[idx]):
+                partial = [0]
+                for child in combo:
+                    partial = product(partial, sets[child])
+                combined.extend(partial)
+            result = minimize(combined, progress.poll)
+        else:
+            result = []
+        sets[idx] = result
+        for child in kids:
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                sets[child] = None
+        progress.step()
+    return [[index.decode(cut_set) for cut_set in sets[root]] for root in tree.roots]
+
+
+def truncated_cut_sets(tree: CompiledTree, events: Dict[str, float],
+                       cutoff: float) -> Tuple[List[List[str]], List[float], float]:
+    """
+    按概率截断的最小割集，返回 (割集, 各割集概率, 截断质量)。
+
+    展开过程中概率低于 cutoff 的部分割集立即丢弃。由它扩展出的割集都包含它，
+    其并的概率不超过它自身的概率，因此被丢弃部分割集的概率之和（截断质量）
+    是被忽略的顶事件概率的上界。保留的恰好是概率不低于 cutoff 的全部最小割集。
+    """
+    if not tree.coherent:
+        raise ValueError("故障树含非门或异或门（非相干），不能按割集截断")
+    index = EventIndex()
+    probability: List[float] = []
+    remaining = [len(parents) for parents in tree.parents()]
+    for root in tree.roots:
+        remaining[root] += 1
+    sets: List[Optional[Dict[int, float]]] = [None] * len(tree.types)
+    truncated = 0.0
+
+    def product(partial, child_sets):
+        nonlocal truncated
+        combined: Dict[int, float] = {}
+        for a, p_a in partial.items():
+            for b, p_b in child_sets.items():
+                union = a | b
+                if union in combined:
+                    continue
+                p = p_a
+                for bit in iter_bits(b & ~a):
+                    p *= probability[bit]
+                if p < cutoff:
+                    truncated += p
+                else:
+                    combined[union] = p
+        return combined
+
+    def minimal(candidates):
+        return {cut_set: candidates[cut_set] for cut_set in minimize(candidates)}
+
+    for idx, node_type in enumerate(tree.types):
+        kids = tree.children[idx]
+        if node_type == BASIC:
+            name = tree.names[idx]
+            p = events.get(name, 0.0)
+            if p < cutoff:
+                truncated += p
+                result = {}
+            else:
+                bit = index.bit(name)
+                if bit == len(probability):
+                    probability.append(p)
+                result = {1 << bit: p}
+        elif node_type == 'OR':
+            result = minimal({cut_set: p for child in kids for cut_set, p in sets[child].items()})
+        elif node_type in ('AND', INHIBIT):
+            result = {0: 1.0} if kids else {}
+            for child in kids:
+                result = minimal(product(result, sets[child]))
+        elif node_type == VOTE:
+            combined = {}
+            for combo in itertools.combinations(kids, tree.k[idx]):
+                partial = {0: 1.0}
+                for child in combo:
+                    partial = product(partial, sets[child])
+                combined.update(partial)
+            result = minimal(combined)
+        else:
+            result = {}
+        sets[idx] = result
+        for child in kids:
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                sets[child] = None
+    cut_sets = sorted(sets[tree.root].items(), key=lambda item: -item[1])
+    return [index.decode(cut_set) for cut_set, _ in cut_sets], [p for _, p in cut_sets], truncated
+
+
+def literal_event(literal: str) -> Tuple[str, bool]:
+    """质蕴涵中的文字 -> (底事件名, 是否为正文字)"""
+    if literal.startswith(NEGATION_PREFIX):
+        return literal[len(NEGATION_PREFIX):], False
+    return literal, True
+
+
+def cut_set_probability(cut_set: List[str], events: Dict[str, float]) -> float:
+    """割集（或质蕴涵）中各文字概率之积，取反的事件按 1 - p 计"""
+    p_cut = 1.0
+    for literal in cut_set:
+        name, positive = literal_event(literal)
+        p = events.get(name, 0.0)
+        p_cut *= p if positive else 1 - p
+    return p_cut
+
+
+def fussell_vesely(cut_sets: List[List[str]], events: Dict[str, float], top_prob: float) -> Dict[str, float]:
+    """Fussell-Vesely 重要度：含该事件的最小割集（或质蕴涵）概率之和 / 顶事件概率"""
+    sums = {event: 0.0 for event in events}
+    for cut_set in cut_sets:
+        p_cut = cut_set_probability(cut_set, events)
+        for literal in cut_set:
+            name = literal_event(literal)[0]
+            if name in sums:
+                sums[name] += p_cut
+    if top_prob <= 0:
+        return {event: 0.0 for event in sums}
+    return {event: value / top_prob for event, value in sums.items()}
@@ -0,0 +1,151 @@
+# fta_event_table.py
+"""
+底事件表格
+
+EventModel 以列存储底事件（名称列表 + NumPy 概率数组），EventTableView 是其虚拟化视图：
+Treeview 中只保留当前可见的若干行，滚动时按需重建，因此表格规模不影响界面响应。
+"""
+import tkinter as tk
+from tkinter import ttk
+
+import numpy as np
+
+
+class EventModel:
+    """列式底事件模型，行号即数组下标"""
+
+    def __init__(self):
+        self.names = []
+        self.probabilities = np.zeros(0, dtype=float)
+
+    def __len__(self):
+        return len(self.names)
+
+    def replace(self, names, probabilities):
+        self.names = list(names)
+        self.probabilities = np.clip(np.asarray(probabilities, dtype=float), 0.0, 1.0)
+
+    def append(self, name, probability):
+        self.names.append(name)
+        self.probabilities = np.append(self.probabilities, min(max(float(probability), 0.0), 1.0))
+
+    def update(self, row, name, probability):
+        self.names[row] = name
+        self.probabilities[row] = min(max(float(probability), 0.0), 1.0)
+
+    def delete(self, rows):
+        rows = set(rows)
+        keep = np.array([row not in rows for row in range(len(self.names))], dtype=bool)
+        self.names = [name for name, kept in zip(self.names, keep) if kept]
+        self.probabilities = self.probabilities[keep]
+
+    def set_probabilities(self, rows, value):
+        self.probabilities[np.asarray(rows, dtype=int)] = min(max(float(value), 0.0), 1.0)
+
+    def scale_probabilities(self, rows, factor):
+        rows = np.asarray(rows, dtype=int)
+        self.probabilities[rows] = np.clip(self.probabilities[rows] * float(factor), 0.0, 1.0)
+
+    def filter(self, text):
+        """返回名称包含 text 的行号数组，text 为空时返回全部行"""
+        text = text.strip().lower()
+        if not text:
+            return np.arange(len(self.names))
+        return np.array([row for row, name in enumerate(self.names) if text in name.lower()], dtype=int)
+
+    def snapshot(self):
+        """生成 {事件名: 概率} 快照，供分析线程使用，不再回读界面控件"""
+        return dict(zip(self.names, self.probabilities.tolist()))
+
+
+class EventTableView(ttk.Frame):
+    """只实例化可见行的底事件表格，支持名称筛选和多选"""
+
+    def __init__(self, master, model, font=None, height=5):
+        super().__init__(master)
+        self.model = model
+        self.visible_rows = height
+        self.view = np.arange(0)
+        self.offset = 0
+        self.selected = set()
+        self._syncing_selection = False
+
+        search_frame = ttk.Frame(self)
+        search_frame.grid(row=0, column=0, columnspan=2, sticky='ew')
+        ttk.Label(search_frame, text="筛选:").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add('write', lambda *args: self.refresh())
+        ttk.Entry(search_frame, textvariable=self.filter_var, width=18, font=font).pack(side=tk.LEFT, padx=5)
+        self.count_var = tk.StringVar()
+        ttk.Label(search_frame, textvariable=self.count_var, foreground="gray").pack(side=tk.LEFT)
+
+        columns = ("event", "probability")
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height, selectmode='extended')
+        self.tree.grid(row=1, column=0, sticky='ew')
+        self.tree.heading("event", text="事件名称")
+        self.tree.heading("probability", text="发生概率")
+        self.tree.column("event", width=120)
+        self.tree.column("probability", width=80)
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky='ns')
+        self.columnconfigure(0, weight=1)
+
+        self.tree.bind('<<TreeviewSelect>>', self.on_select)
+        self.tree.bind('<MouseWheel>', lambda event: self.scroll_by(-3 if event.delta > 0 else 3))
+        self.tree.bind('<Button-4>', lambda event: self.scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll_by(3))
+
+    def refresh(self):
+        """模型或筛选条件变化后重建视图"""
+        self.view = self.model.filter(self.filter_var.get())
+        self.selected = {row for row in self.selected if row < len(self.model)}
+        self.count_var.set(f"{len(self.view)} / {len(self.model)}")
+        self.offset = min(self.offset, max(len(self.view) - self.visible_rows, 0))
+        self.render()
+
+    def render(self):
+        """只把当前窗口内的行放入 Treeview"""
+        self._syncing_selection = True
+        self.tree.delete(*self.tree.get_children())
+        window = self.view[self.offset:self.offset + self.visible_rows]
+        for row in window.tolist():
+            self.tree.insert("", tk.END, iid=str(row),
+                             values=(self.model.names[row], f"{self.model.probabilities[row]:g}"))
+        self.tree.selection_set([str(row) for row in window.tolist() if row in self.selected])
+        self._syncing_selection = False
+
+        total = max(len(self.view), 1)
+        self.scrollbar.set(self.offset / total, min(self.offset + self.visible_rows, total) / total)
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.offset + rows)
+        return "break"
+
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), len(self.view) - self.visible_rows))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(float(amount) * len(self.view))
+        elif action == 'scroll':
+            step = self.visible_rows if unit == 'pages' else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def on_select(self, event):
+        if self._syncing_selection:
+            return
+        window = set(self.view[self.offset:self.offset + self.visible_rows].tolist())
+        self.selected -= window
+        self.selected.update(int(iid) for iid in self.tree.selection())
+
+    def select_filtered(self):
+        """选中当前筛选结果的全部行（包括不可见行）"""
+        self.selected = set(self.view.tolist())
+        self.render()
+
+    def selected_rows(self):
+        return sorted(self.selected)
@@ -0,0 +1,192 @@
+# fta_layout.py
+"""
+故障树分层布局 (Sugiyama 风格)
+
+不依赖 Graphviz 与 tkinter：输入为按节点下标组织的子节点列表，
+输出每个节点中心的 (x, y) 坐标，单位为点 (1/72 英寸)，y 轴向下。
+步骤依次为：最长路径分层、为跨层边插入虚拟节点、重心法减少交叉、按邻居均值分配横坐标。
+"""
+from typing import List, Optional, Sequence, Tuple
+
+from fta_progress import NULL_PROGRESS
+
+DEFAULT_NODE_WIDTH = 110.0
+NODE_GAP = 24.0
+LAYER_HEIGHT = 90.0
+DUMMY_WIDTH = 8.0
+
+
+def estimate_label_width(label: str) -> float:
+    """按字符估算标签宽度，中文等宽字符按两倍计算"""
+    longest = 0.0
+    for line in label.split('\n'):
+        longest = max(longest, sum(12.0 if ord(ch) > 0x2E80 else 7.0 for ch in line))
+    return longest + 24.0
+
+
+def assign_layers(children: Sequence[Sequence[int]]) -> Tuple[List[int], List[int]]:
+    """最长路径分层，返回 (每个节点的层号, 拓扑序)"""
+    n = len(children)
+    indegree = [0] * n
+    for kids in children:
+        for child in kids:
+            indegree[child] += 1
+
+    order = [node for node in range(n) if indegree[node] == 0]
+    layer = [0] * n
+    i = 0
+    while i < len(order):
+        node = order[i]
+        i += 1
+        for child in children[node]:
+            if layer[node] + 1 > layer[child]:
+                layer[child] = layer[node] + 1
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                order.append(child)
+
+    if len(order) < n:
+        raise ValueError("图中存在环，无法进行分层布局")
+    return layer, order
+
+
+def layered_layout(children: Sequence[Sequence[int]], widths: Optional[Sequence[float]] = None,
+                   sweeps: int = 4, initial_x: Optional[Sequence[Optional[float]]] = None,
+                   progress=NULL_PROGRESS) -> List[Tuple[float, float]]:
+    """
+    计算分层布局。
+
+    children[i] 为节点 i 的子节点下标；widths 为节点宽度（点），缺省使用统一宽度。
+    initial_x 为上一次布局中对应节点的横坐标（未知为 None），用于结构小改动后的增量布局：
+    已知节点以原坐标为起点，新节点取相邻已知节点的均值，配合较少的迭代次数使图形保持稳定。
+    progress 以分层和每一轮扫描为单位报告进度，并在各轮之间检查取消。
+    """
+    n = len(children)
+    if n == 0:
+        return []
+    progress.start("render", 1 + 2 * sweeps)
+    widths = list(widths) if widths is not None else [DEFAULT_NODE_WIDTH] * n
+    layer, _ = assign_layers(children)
+
+    # 跨越多层的边拆分为虚拟节点链，下标从 n 开始
+    up: List[List[int]] = [[] for _ in range(n)]
+    down: List[List[int]] = [[] for _ in range(n)]
+    for parent in range(n):
+        for child in children[parent]:
+            prev = parent
+            for level in range(layer[parent] + 1, layer[child]):
+                dummy = len(layer)
+                layer.append(level)
+                widths.append(DUMMY_WIDTH)
+                up.append([prev])
+                down.append([])
+                down[prev].append(dummy)
+                prev = dummy
+            down[prev].append(child)
+            up[child].append(prev)
+
+    total = len(layer)
+    layers: List[List[int]] = [[] for _ in range(max(layer) + 1)]
+
+    # 初始次序：沿深度优先顺序放置，使同一子树的节点相邻
+    rank = [-1] * total
+    seen = [False] * total
+    counter = 0
+    roots = [node for node in range(n) if not up[node]]
+    stack = list(reversed(roots))
+    while stack:
+        node = stack.pop()
+        if seen[node]:
+            continue
+        seen[node] = True
+        rank[node] = counter
+        counter += 1
+        stack.extend(reversed(down[node]))
+    seed = _propagate_seeds(initial_x, up, down, total) if initial_x is not None else None
+    for node in range(total):
+        layers[layer[node]].append(node)
+    for nodes in layers:
+        if seed is not None:
+            nodes.sort(key=lambda node: (seed[node] is None, seed[node] or 0.0, rank[node]))
+        else:
+            nodes.sort(key=rank.__getitem__)
+
+    position = [0] * total
+    for nodes in layers:
+        for i, node in enumerate(nodes):
+            position[node] = i
+    progress.step()
+
+    # 重心法：自上而下按父节点、自下而上按子节点交替排序
+    for sweep in range(sweeps):
+        downward = sweep % 2 == 0
+        sequence = layers[1:] if downward else layers[-2::-1]
+        for nodes in sequence:
+            keys = {}
+            for node in nodes:
+                neighbours = up[node] if downward else down[node]
+                keys[node] = (sum(position[m] for m in neighbours) / len(neighbours)
+                              if neighbours else position[node])
+            nodes.sort(key=keys.__getitem__)
+            for i, node in enumerate(nodes):
+                position[node] = i
+        progress.step()
+
+    # 横坐标：先紧凑排列，再向相邻层邻居的均值靠拢，同时保持次序与最小间距
+    x = [0.0] * total
+    for nodes in layers:
+        cursor = 0.0
+        for node in nodes:
+            x[node] = cursor + widths[node] / 2
+            cursor += widths[node] + NODE_GAP
+        if seed is not None:
+            _place_in_order(nodes, [x[node] if seed[node] is None else seed[node] for node in nodes], widths, x)
+
+    for sweep in range(sweeps):
+        downward = sweep % 2 == 0
+        sequence = layers[1:] if downward else layers[-2::-1]
+        for nodes in sequence:
+            desired = []
+            for node in nodes:
+                neighbours = up[node] if downward else down[node]
+                desired.append(sum(x[m] for m in neighbours) / len(neighbours) if neighbours else x[node])
+            _place_in_order(nodes, desired, widths, x)
+        progress.step()
+
+    left = min(x[node] - widths[node] / 2 for node in range(n))
+    return [(x[node] - left, layer[node] * LAYER_HEIGHT) for node in range(n)]
+
+
+def _propagate_seeds(initial_x: Sequence[Optional[float]], up: List[List[int]], down: List[List[int]],
+                     total: int) -> List[Optional[float]]:
+    """为没有历史坐标的节点（含虚拟节点）估计起始横坐标：先取已知子节点均值，再取已知父节点均值"""
+    seed: List[Optional[float]] = [None] * total
+    for node, value in enumerate(initial_x):
+        seed[node] = value
+    for neighbours in (down, up):
+        changed = True
+        while changed:
+            changed = False
+            for node in range(total):
+                if seed[node] is not None:
+                    continue
+                known = [seed[m] for m in neighbours[node] if seed[m] is not None]
+                if known:
+                    seed[node] = sum(known) / len(known)
+                    changed = True
+    return seed
+
+
+def _place_in_order(nodes: List[int], desired: List[float], widths: List[float], x: List[float]) -> None:
+    """在保持次序和最小间距的前提下尽量贴近期望坐标：正反两次推挤后取平均"""
+    count = len(nodes)
+    forward = list(desired)
+    for i in range(1, count):
+        gap = (widths[nodes[i - 1]] + widths[nodes[i]]) / 2 + NODE_GAP
+        forward[i] = max(forward[i], forward[i - 1] + gap)
+    backward = list(desired)
+    for i in range(count - 2, -1, -1):
+        gap = (widths[nodes[i]] + widths[nodes[i + 1]]) / 2 + NODE_GAP
+        backward[i] = min(backward[i], backward[i + 1] - gap)
+    for i, node in enumerate(nodes):
+        x[node] = (forward[i] + backward[i]) / 2
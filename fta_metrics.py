@@ -0,0 +1,158 @@
+# fta_metrics.py
+"""
+分析耗时统计与 Prometheus 指标
+
+PhaseTimer 用单调时钟记录一次请求中各阶段的耗时和计数；关闭时使用 NULL_TIMER，
+所有方法均为空操作。MetricsRegistry 在多个请求之间累积直方图与计数器，
+并输出 Prometheus 文本格式 (text/plain; version=0.0.4)。
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple, Union
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+class PhaseTimer:
+    """记录一次分析中各阶段的耗时（秒）与计数"""
+
+    enabled = True
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def total(self) -> float:
+        return time.perf_counter() - self._start
+
+    def server_timing(self) -> str:
+        """Server-Timing 响应头，单位为毫秒"""
+        entries = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.phases.items()]
+        entries.append(f"total;dur={self.total() * 1000:.3f}")
+        return ", ".join(entries)
+
+    def diagnostics(self) -> Dict[str, Dict]:
+        return {
+            "timings_ms": {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            "total_ms": round(self.total() * 1000, 3),
+            "counters": dict(self.counters),
+        }
+
+
+class _NullTimer:
+    """关闭统计时使用，开销仅为一次方法调用"""
+
+    enabled = False
+    phases: Dict[str, float] = {}
+    counters: Dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        yield
+
+    def count(self, name: str, value: int = 1) -> None:
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS, label: str = ""):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.label = label
+        self.series: Dict[str, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, label_value: str = "") -> None:
+        counts, totals = self.series.setdefault(label_value, ([0] * (len(self.buckets) + 1), [0.0]))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        totals[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_value, (counts, totals) in sorted(self.series.items()):
+            prefix = f'{self.label}="{label_value}",' if self.label else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound:g}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+            labels = f'{{{prefix.rstrip(",")}}}' if prefix else ""
+            lines.append(f"{self.name}_sum{labels} {totals[0]:.6g}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label: str = ""):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.values: Dict[str, float] = {}
+
+    def inc(self, value: float = 1, label_value: str = "") -> None:
+        self.values[label_value] = self.values.get(label_value, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_value, value in sorted(self.values.items()):
+            labels = f'{{{self.label}="{label_value}"}}' if self.label else ""
+            lines.append(f"{self.name}{labels} {value:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """跨请求累积的指标，record() 把一次请求的 PhaseTimer 合并进来"""
+
+    def __init__(self, prefix: str = "fta"):
+        self._lock = threading.Lock()
+        self.requests = Counter(f"{prefix}_analyze_requests_total", "分析请求数", label="status")
+        self.phase_seconds = Histogram(f"{prefix}_analyze_phase_seconds", "各分析阶段耗时（秒）", label="phase")
+        self.request_seconds = Histogram(f"{prefix}_analyze_request_seconds", "单次分析总耗时（秒）")
+        self.sizes = Histogram(f"{prefix}_analyze_size", "每次分析的规模计数（节点数、割集数等）",
+                               buckets=SIZE_BUCKETS, label="counter")
+        self.totals = Counter(f"{prefix}_analyze_counter_total", "规模计数与缓存命中的累计值", label="counter")
+
+    def record(self, timer: PhaseTimer, status: str = "ok") -> None:
+        with self._lock:
+            self.requests.inc(label_value=status)
+            self.request_seconds.observe(timer.total())
+            for name, seconds in timer.phases.items():
+                self.phase_seconds.observe(seconds, name)
+            for name, value in timer.counters.items():
+                self.totals.inc(value, name)
+                if not name.endswith(("_hit", "_hits", "_miss", "_misses")):
+                    self.sizes.observe(value, name)
+
+    def render(self) -> str:
+        with self._lock:
+            lines: List[str] = []
+            for metric in (self.requests, self.request_seconds, self.phase_seconds, self.sizes, self.totals):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def new_timer(enabled: bool) -> Union[PhaseTimer, _NullTimer]:
+    return PhaseTimer() if enabled else NULL_TIMER
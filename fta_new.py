@@ -3,17 +3,45 @@ from tkinter import ttk, messagebox, simpledialog, filedialog
 import graphviz
 import os
 import sys
-from PIL import Image, ImageTk
 import pandas as pd
-import re
-from fpdf import FPDF
 import datetime
 import locale
 import collections
 import threading
+import hashlib
+import json
+import re
+
+from fta_engine import (compile_tops, ProbabilityEvaluator, gate_label, cut_set_probability, literal_event,
+                        top_minimal_cut_sets)
+from fta_bdd import build_bdd_tops, top_prime_implicants
+from fta_spill import bounded_minimal_cut_sets
+from fta_parallel import parallel_top_minimal_cut_sets
+from fta_parser import parse_event_definitions, CyclicDefinitionError
+from fta_layout import layered_layout, estimate_label_width
+from fta_viewer import FaultTreeViewer
+from fta_event_table import EventModel, EventTableView
+from fta_report import build_report, ReportCancelled
+from fta_progress import ProgressToken, AnalysisCancelled, NULL_PROGRESS, describe
+
+# 设置 FTA_MEMORY_BUDGET_MB 后，最小割集生成的中间结果超出预算时溢出到 FTA_SPILL_DIR（缺省为系统临时目录）
+MEMORY_BUDGET_MB = float(os.environ.get("FTA_MEMORY_BUDGET_MB", "0") or 0)
+SPILL_DIR = os.environ.get("FTA_SPILL_DIR") or None
+# FTA_CUT_SET_WORKERS 大于 1 时，较大的与门割集组合分配到多个进程（未设置内存预算时生效）
+CUT_SET_WORKERS = int(os.environ.get("FTA_CUT_SET_WORKERS", "0") or 0)
 
 
 class FaultTreeApp:
+    GRAPH_NODE_STYLES = {
+        'TOP': {'shape': 'rectangle', 'fillcolor': 'lightblue'},
+        'BASIC': {'shape': 'box', 'fillcolor': 'lightcoral'},
+        'GATE': {'shape': 'ellipse', 'fillcolor': 'lightyellow'},
+    }
+    GRAPH_CACHE_SIZE = 32
+    GRAPHVIZ_LAYOUT_MAX_NODES = 2000
+    GRAPH_IMAGE_MAX_NODES = 500
+    REPORT_CUT_SET_PROMPT = 200
+
     def __init__(self, root):
         self.root = root
         self.root.title("故障树分析工具")
@@ -53,6 +81,8 @@ class FaultTreeApp:
         self.top_event_var = tk.StringVar(value="T")
         ttk.Entry(self.input_frame, textvariable=self.top_event_var, width=20,
                   font=self.default_font).grid(row=0, column=1, padx=5, pady=5)
+        ttk.Label(self.input_frame, text="多个顶事件用逗号分隔",
+                  font=(self.default_font[0], 8), foreground="gray").grid(row=0, column=2, sticky='w')
 
         # 添加逻辑表达式输入
         ttk.Label(self.input_frame, text="逻辑表达式:").grid(row=1, column=0, padx=5, pady=5, sticky='w')
@@ -61,7 +91,7 @@ class FaultTreeApp:
         self.logic_expr_text.insert(tk.END, "T = A and B\nA = C and D\nB = E and F")
 
         # 添加表达式示例标签
-        ttk.Label(self.input_frame, text="格式: '事件 = 表达式' (每行一个定义)",
+        ttk.Label(self.input_frame, text="格式: '事件 = 表达式' (每行一个定义，运算符 and/or/xor/not，VOTE(k, A, B, ...)，INHIBIT(输入, 条件))",
                   font=(self.default_font[0], 9), foreground="gray").grid(row=2, column=0, columnspan=2, sticky='w',
                                                                           padx=5)
 
@@ -76,26 +106,16 @@ class FaultTreeApp:
 
         ttk.Label(self.input_frame, text="底事件列表:").grid(row=4, column=0, padx=5, pady=5, sticky='nw')
 
-        # 底事件表格
-        columns = ("event", "probability")
-        self.event_tree = ttk.Treeview(self.input_frame, columns=columns, show="headings", height=5)
-        self.event_tree.grid(row=5, column=0, columnspan=2, padx=5, pady=5, sticky='ew')
-
-        self.event_tree.heading("event", text="事件名称")
-        self.event_tree.heading("probability", text="发生概率")
-        self.event_tree.column("event", width=120)
-        self.event_tree.column("probability", width=80)
+        # 底事件表格：列式模型 + 只实例化可见行的视图
+        self.event_model = EventModel()
+        self.event_table = EventTableView(self.input_frame, self.event_model, font=self.default_font, height=5)
+        self.event_table.grid(row=5, column=0, columnspan=3, padx=5, pady=5, sticky='ew')
 
         # 设置表格字体
         style = ttk.Style()
         style.configure("Treeview", font=self.default_font)
         style.configure("Treeview.Heading", font=(self.default_font[0], 10, 'bold'))
 
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(self.input_frame, orient="vertical", command=self.event_tree.yview)
-        scrollbar.grid(row=5, column=2, sticky='ns')
-        self.event_tree.configure(yscrollcommand=scrollbar.set)
-
         # 按钮框架
         btn_frame = ttk.Frame(self.input_frame)
         btn_frame.grid(row=6, column=0, columnspan=3, pady=5)
@@ -103,6 +123,8 @@ class FaultTreeApp:
         ttk.Button(btn_frame, text="添加事件", command=self.add_event).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="编辑事件", command=self.edit_event).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="删除事件", command=self.delete_event).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="全选筛选", command=self.event_table.select_filtered).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="批量缩放", command=self.scale_events).pack(side=tk.LEFT, padx=5)
 
         # 字体选择
         font_frame = ttk.Frame(self.input_frame)
@@ -115,6 +137,10 @@ class FaultTreeApp:
         font_combo = ttk.Combobox(font_frame, textvariable=self.font_var, values=fonts, width=15)
         font_combo.grid(row=0, column=1)
 
+        self.expand_graph_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(font_frame, text="展开共享子树",
+                        variable=self.expand_graph_var).grid(row=0, column=2, padx=(10, 0))
+
         # 分析按钮
         ttk.Button(self.input_frame, text="生成故障树分析",
                    command=self.analyze_fault_tree,
@@ -129,6 +155,10 @@ class FaultTreeApp:
         self.graph_frame = ttk.LabelFrame(self.result_frame, text="故障树图形")
         self.graph_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
+        self.graph_viewer = FaultTreeViewer(self.graph_frame, font_name=self.default_font[0],
+                                            describe_node=self.describe_graph_node)
+        self.graph_viewer.pack(fill=tk.BOTH, expand=True)
+
         result_text_frame = ttk.Frame(self.result_frame)
         result_text_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
@@ -148,17 +178,29 @@ class FaultTreeApp:
             "top_event": "",
             "probability": 0.0,
             "minimal_cut_sets": [],
+            "cut_set_probabilities": [],
             "structure_description": ""
         }
-        self.graph_image_path = "fault_tree.png"
+        self.graph_view = ([], [])
+        self.graph_generation = 0
+        self.graph_layout_cache = collections.OrderedDict()
+        self.graph_render_cache = collections.OrderedDict()
+        self.graph_cache_lock = threading.Lock()
         self.event_hierarchy = {}
         self.event_definitions = {}
+        self.node_probabilities = {}
+        self.live_model = None
+        self.graph_spec = None
 
         # 进度窗口相关
         self.progress = None
         self.progress_window = None
         self.analysis_thread = None
-        self.analysis_canceled = False
+        self.analysis_token = NULL_PROGRESS
+        self.pending_reanalysis = False
+        self.progress_text = None
+        self.report_thread = None
+        self.report_canceled = False
 
         # 添加示例事件
         self.add_example_events()
@@ -170,8 +212,8 @@ class FaultTreeApp:
             ("E", 0.003),
             ("F", 0.004)
         ]
-        for event, prob in example_events:
-            self.event_tree.insert("", tk.END, values=(event, prob))
+        self.event_model.replace([event for event, _ in example_events], [prob for _, prob in example_events])
+        self.event_table.refresh()
 
     def add_event(self):
         event = simpledialog.askstring("添加底事件", "输入事件名称:")
@@ -179,32 +221,118 @@ class FaultTreeApp:
             prob = simpledialog.askfloat("添加底事件", "输入事件发生概率(0-1):",
                                          minvalue=0.0, maxvalue=1.0)
             if prob is not None:
-                self.event_tree.insert("", tk.END, values=(event, prob))
+                self.event_model.append(event, prob)
+                self.event_table.refresh()
+                self.on_structure_changed()
 
     def edit_event(self):
-        selected = self.event_tree.selection()
-        if not selected:
+        rows = self.event_table.selected_rows()
+        if not rows:
             messagebox.showwarning("编辑事件", "请先选择一个事件")
             return
 
-        item = selected[0]
-        values = self.event_tree.item(item, 'values')
+        # 多选时统一修改所选事件的概率
+        if len(rows) > 1:
+            prob = simpledialog.askfloat("编辑事件", f"为选中的 {len(rows)} 个事件设置发生概率(0-1):",
+                                         minvalue=0.0, maxvalue=1.0)
+            if prob is not None:
+                self.event_model.set_probabilities(rows, prob)
+                self.event_table.refresh()
+                self.on_probabilities_changed(rows)
+            return
 
-        event = simpledialog.askstring("编辑事件", "修改事件名称:", initialvalue=values[0])
+        row = rows[0]
+        event = simpledialog.askstring("编辑事件", "修改事件名称:", initialvalue=self.event_model.names[row])
         if event:
             prob = simpledialog.askfloat("编辑事件", "修改事件发生概率(0-1):",
                                          minvalue=0.0, maxvalue=1.0,
-                                         initialvalue=float(values[1]))
+                                         initialvalue=float(self.event_model.probabilities[row]))
             if prob is not None:
-                self.event_tree.item(item, values=(event, prob))
+                renamed = event != self.event_model.names[row]
+                self.event_model.update(row, event, prob)
+                self.event_table.refresh()
+                if renamed:
+                    self.on_structure_changed()
+                else:
+                    self.on_probabilities_changed([row])
+
+    def scale_events(self):
+        """按倍数批量调整所选事件的概率，结果截断到 [0, 1]"""
+        rows = self.event_table.selected_rows()
+        if not rows:
+            messagebox.showwarning("批量缩放", "请先选择事件，或使用“全选筛选”")
+            return
+        factor = simpledialog.askfloat("批量缩放", f"将选中的 {len(rows)} 个事件的概率乘以:", minvalue=0.0)
+        if factor is not None:
+            self.event_model.scale_probabilities(rows, factor)
+            self.event_table.refresh()
+            self.on_probabilities_changed(rows)
 
     def delete_event(self):
-        selected = self.event_tree.selection()
-        if not selected:
+        rows = self.event_table.selected_rows()
+        if not rows:
             messagebox.showwarning("删除事件", "请先选择一个事件")
             return
-        for item in selected:
-            self.event_tree.delete(item)
+        self.event_model.delete(rows)
+        self.event_table.selected.clear()
+        self.event_table.refresh()
+        self.on_structure_changed()
+
+    def on_probabilities_changed(self, rows):
+        """只修改了概率：在已编译的模型上增量更新，不重绘图形、不重新计算割集"""
+        changes = {self.event_model.names[row]: float(self.event_model.probabilities[row]) for row in rows}
+        if self.live_model is None:
+            return
+        if self.analysis_thread and self.analysis_thread.is_alive():
+            # 正在进行的分析使用的是修改前的快照，结束后再重新分析
+            self.pending_reanalysis = True
+            return
+
+        live = self.live_model
+        evaluator = live["evaluator"]
+        tree = evaluator.tree
+        live["events"].update(changes)
+        for idx in evaluator.update(changes):
+            self.node_probabilities[tree.ids[idx]] = evaluator.values[idx]
+
+        # 只重新计算包含被修改事件的割集概率，并修正重要度分子（每个顶事件各一份）
+        for top in live["tops"]:
+            affected = set()
+            for name in changes:
+                affected.update(top["cut_sets_by_event"].get(name, ()))
+            importance_sums = top["importance_sums"]
+            for i in affected:
+                p_cut = cut_set_probability(top["minimal_cut_sets"][i], live["events"])
+                delta = p_cut - top["cut_set_probabilities"][i]
+                top["cut_set_probabilities"][i] = p_cut
+                for literal in top["minimal_cut_sets"][i]:
+                    name = literal_event(literal)[0]
+                    importance_sums[name] = importance_sums.get(name, 0.0) + delta
+
+        if live["exact"] is None:
+            p_tops = evaluator.top_probabilities()
+        else:
+            # 非相干树：BDD 结构不变，按新概率重新遍历一次即得精确值
+            bdd, bdd_roots = live["exact"]
+            probabilities = [live["events"].get(name, 0.0) for name in bdd.variables]
+            p_tops = bdd.probabilities(bdd_roots, probabilities)
+            for root, p_top in zip(tree.roots, p_tops):
+                self.node_probabilities[tree.ids[root]] = p_top
+        for top, p_top in zip(live["tops"], p_tops):
+            top["probability"] = p_top
+        self.analysis_results["probability"] = p_tops[0]
+        self.show_top_probabilities(live["tops"])
+        self.refresh_graph_labels(live["events"])
+
+    def on_structure_changed(self):
+        """事件增删或改名：已编译的模型失效，在后台重新完整分析"""
+        if self.live_model is None:
+            return
+        self.live_model = None
+        if self.analysis_thread and self.analysis_thread.is_alive():
+            self.pending_reanalysis = True
+        else:
+            self.analyze_fault_tree(background=True)
 
     def import_excel(self):
         file_path = filedialog.askopenfilename(
@@ -221,40 +349,43 @@ class FaultTreeApp:
                 messagebox.showerror("导入错误", "Excel文件必须包含至少一列（事件名称）")
                 return
 
-            for item in self.event_tree.get_children():
-                self.event_tree.delete(item)
+            # 整列转换与校验，不再逐行插入表格
+            names = df.iloc[:, 0].map(str).str.strip()
+            if df.shape[1] >= 2:
+                raw = df.iloc[:, 1]
+                probs = pd.to_numeric(raw, errors='coerce')
+                invalid = probs.isna() & raw.notna()
+                out_of_range = (probs < 0) | (probs > 1)
+                probs = probs.fillna(0.0)
+            else:
+                raw = pd.Series([None] * len(df), index=df.index)
+                probs = pd.Series(0.0, index=df.index)
+                invalid = out_of_range = pd.Series(False, index=df.index)
+            empty = names == ""
+            ok = ~(empty | invalid | out_of_range)
+
+            self.event_model.replace(names[ok].tolist(), probs[ok].to_numpy(dtype=float))
+            self.event_table.selected.clear()
+            self.event_table.refresh()
+            self.on_structure_changed()
+            success_count = int(ok.sum())
 
-            success_count = 0
             error_rows = []
-
-            for i, row in df.iterrows():
-                try:
-                    event = str(row.iloc[0]).strip()
-                    if not event:
-                        raise ValueError("事件名称不能为空")
-
-                    prob = 0.0
-                    if df.shape[1] >= 2:
-                        prob_value = row.iloc[1]
-
-                        if pd.notna(prob_value):
-                            try:
-                                prob = float(prob_value)
-                            except ValueError:
-                                prob = 0.0
-                                raise ValueError(f"概率值无效，已设置为0.0: '{prob_value}'")
-
-                            if prob < 0 or prob > 1:
-                                raise ValueError(f"概率值必须在0-1之间: {prob}")
-                    self.event_tree.insert("", tk.END, values=(event, prob))
-                    success_count += 1
-                except Exception as e:
-                    error_rows.append((i + 1, str(e)))
+            for position in (~ok).to_numpy().nonzero()[0]:
+                if empty.iloc[position]:
+                    error = "事件名称不能为空"
+                elif invalid.iloc[position]:
+                    error = f"概率值无效，已设置为0.0: '{raw.iloc[position]}'"
+                else:
+                    error = f"概率值必须在0-1之间: {probs.iloc[position]}"
+                error_rows.append((position + 1, error))
 
             if error_rows:
                 error_msg = f"成功导入 {success_count} 条记录，以下行导入失败:\n"
-                for row_num, error in error_rows:
+                for row_num, error in error_rows[:20]:
                     error_msg += f"行 {row_num}: {error}\n"
+                if len(error_rows) > 20:
+                    error_msg += f"... 另有 {len(error_rows) - 20} 行\n"
                 messagebox.showwarning("部分导入失败", error_msg)
             else:
                 messagebox.showinfo("导入成功", f"成功导入 {success_count} 条记录")
@@ -262,54 +393,40 @@ class FaultTreeApp:
         except Exception as e:
             messagebox.showerror("导入错误", f"导入Excel文件时出错:\n{str(e)}")
 
-    def has_cycle(self, start_event):
-        """检测事件定义中是否存在循环依赖"""
-        visited = set()
-        stack = set()
-
-        def visit(event):
-            if event not in self.event_definitions:
-                return False
-
-            if event in stack:
-                return True
-            if event in visited:
-                return False
-
-            visited.add(event)
-            stack.add(event)
-
-            gate = self.event_definitions[event]
-            if 'children' in gate:
-                for child in gate['children']:
-                    child_name = child['name']
-                    # 只检查已定义的事件
-                    if child_name in self.event_definitions:
-                        if visit(child_name):
-                            return True
-
-            stack.remove(event)
-            return False
-
-        return visit(start_event)
+    def analyze_fault_tree(self, background=False):
+        # 在主线程中读取界面输入，分析线程只使用这份快照
+        inputs = {
+            "top_events": self.split_top_events(self.top_event_var.get()),
+            "events": self.event_model.snapshot(),
+            "logic_expr": self.logic_expr_text.get("1.0", tk.END).strip(),
+            "font_name": self.font_var.get(),
+            "expand_graph": self.expand_graph_var.get(),
+        }
 
-    def analyze_fault_tree(self):
-        # 创建进度窗口
-        self.create_progress_window()
+        # 创建进度窗口（后台重新分析时不打断用户操作）
+        if not background:
+            self.create_progress_window(determinate=True)
 
-        # 在单独的线程中运行分析
-        self.analysis_canceled = False
-        self.analysis_thread = threading.Thread(target=self.perform_analysis)
+        # 在单独的线程中运行分析；仍在运行的上一次分析随之取消
+        self.analysis_token.cancel()
+        self.analysis_token = ProgressToken(
+            lambda snapshot: self.root.after(0, lambda: self.show_analysis_progress(snapshot)))
+        self.analysis_thread = threading.Thread(target=self.perform_analysis, args=(inputs, self.analysis_token))
         self.analysis_thread.daemon = True
         self.analysis_thread.start()
 
         # 定期检查线程状态
         self.check_analysis_thread()
 
-    def create_progress_window(self):
-        """创建分析进度窗口"""
+    def split_top_events(self, text):
+        """顶事件输入框可填写多个名称（逗号或空白分隔），重复的只保留一个"""
+        return list(dict.fromkeys(name for name in re.split(r"[,，;；\s]+", text) if name))
+
+    def create_progress_window(self, text="正在分析故障树，请稍候...", title="分析中...", determinate=False,
+                               on_cancel=None):
+        """创建进度窗口"""
         self.progress_window = tk.Toplevel(self.root)
-        self.progress_window.title("分析中...")
+        self.progress_window.title(title)
         self.progress_window.geometry("400x150")
         self.progress_window.transient(self.root)
         self.progress_window.grab_set()
@@ -317,18 +434,49 @@ class FaultTreeApp:
         frame = ttk.Frame(self.progress_window, padding=20)
         frame.pack(fill=tk.BOTH, expand=True)
 
-        ttk.Label(frame, text="正在分析故障树，请稍候...", font=("Microsoft YaHei", 10)).pack(pady=10)
+        self.progress_text = tk.StringVar(value=text)
+        ttk.Label(frame, textvariable=self.progress_text, font=("Microsoft YaHei", 10)).pack(pady=10)
 
-        self.progress = ttk.Progressbar(frame, orient="horizontal", length=300, mode="indeterminate")
-        self.progress.pack(pady=10)
-        self.progress.start(10)
+        if determinate:
+            self.progress = ttk.Progressbar(frame, orient="horizontal", length=300, mode="determinate", maximum=100)
+            self.progress.pack(pady=10)
+        else:
+            self.progress = ttk.Progressbar(frame, orient="horizontal", length=300, mode="indeterminate")
+            self.progress.pack(pady=10)
+            self.progress.start(10)
 
-        cancel_btn = ttk.Button(frame, text="取消", command=self.cancel_analysis)
+        cancel_btn = ttk.Button(frame, text="取消", command=on_cancel or self.cancel_analysis)
         cancel_btn.pack(pady=5)
 
+    def update_progress(self, fraction, message):
+        """在主线程中更新确定进度条"""
+        if self.progress_window:
+            self.progress['value'] = fraction * 100
+            self.progress_text.set(message)
+
+    def show_analysis_progress(self, snapshot):
+        """在主线程中显示分析进度；阶段工作量未知时进度条改为往复滚动"""
+        if not self.progress_window:
+            return
+        if snapshot['fraction'] is None:
+            if str(self.progress['mode']) != 'indeterminate':
+                self.progress.configure(mode='indeterminate')
+                self.progress.start(10)
+        else:
+            if str(self.progress['mode']) != 'determinate':
+                self.progress.stop()
+                self.progress.configure(mode='determinate')
+            self.progress['value'] = snapshot['fraction'] * 100
+        self.progress_text.set(describe(snapshot))
+
+    def close_progress_window(self):
+        if self.progress_window:
+            self.progress_window.destroy()
+            self.progress_window = None
+
     def cancel_analysis(self):
-        """取消分析过程"""
-        self.analysis_canceled = True
+        """取消分析过程；分析线程在下一次检查进度时退出"""
+        self.analysis_token.cancel()
         if self.progress_window:
             self.progress_window.destroy()
             self.progress_window = None
@@ -346,72 +494,72 @@ class FaultTreeApp:
             if self.progress_window:
                 self.progress_window.destroy()
                 self.progress_window = None
+            if self.pending_reanalysis and not self.analysis_token.cancelled:
+                self.pending_reanalysis = False
+                self.analyze_fault_tree(background=True)
 
-    def perform_analysis(self):
-        """执行实际的分析工作"""
+    def perform_analysis(self, inputs, progress=NULL_PROGRESS):
+        """执行实际的分析工作；progress 被取消时各阶段抛出 AnalysisCancelled，分析静默结束"""
         try:
-            # 获取顶事件
-            top_event = self.top_event_var.get().strip()
-            if not top_event:
+            # 获取顶事件（可以有多个，共用一次分析）
+            top_events = inputs["top_events"]
+            if not top_events:
                 self.root.after(0, lambda: messagebox.showerror("错误", "顶事件名称不能为空"))
                 return
 
-            # 获取底事件
-            events = {}
-            for item in self.event_tree.get_children():
-                values = self.event_tree.item(item, 'values')
-                event_name = values[0]
-
-                try:
-                    prob = float(values[1])
-                    if prob < 0 or prob > 1:
-                        prob = 0.0
-                except ValueError:
-                    prob = 0.0
-
-                events[event_name] = prob
-
+            # 获取底事件（概率已由事件模型限制在 0-1 之间）
+            events = inputs["events"]
             if not events:
                 self.root.after(0, lambda: messagebox.showerror("错误", "请添加至少一个底事件"))
                 return
 
             # 获取逻辑表达式
-            logic_expr = self.logic_expr_text.get("1.0", tk.END).strip()
+            logic_expr = inputs["logic_expr"]
             if not logic_expr:
                 self.root.after(0, lambda: messagebox.showerror("错误", "逻辑表达式不能为空"))
                 return
 
             # 解析逻辑表达式
             try:
-                self.event_definitions = self.parse_event_definitions(logic_expr)
-                if top_event not in self.event_definitions:
-                    raise ValueError(f"顶事件 '{top_event}' 未在逻辑表达式中定义")
-                gate_structure = self.event_definitions[top_event]
-
-                # 检测循环依赖
-                if self.has_cycle(top_event):
-                    self.root.after(0, lambda: messagebox.showerror("循环依赖错误",
-                                                                    "事件定义中存在循环依赖，请检查逻辑表达式"))
-                    return
-
+                self.event_definitions = self.parse_event_definitions(logic_expr, progress)
+                for top_event in top_events:
+                    if top_event not in self.event_definitions:
+                        raise ValueError(f"顶事件 '{top_event}' 未在逻辑表达式中定义")
+                gate_structures = [self.event_definitions[top_event] for top_event in top_events]
+
+            except CyclicDefinitionError as e:
+                # 循环依赖在解析的同一遍中已检测出来，错误信息带有环路路径
+                message = str(e)
+                self.root.after(0, lambda: messagebox.showerror("循环依赖错误", message))
+                return
+            except AnalysisCancelled:
+                return
             except Exception as e:
                 self.root.after(0, lambda: messagebox.showerror("解析错误", f"逻辑表达式解析失败:\n{str(e)}"))
                 return
 
             # 检查所有基本事件是否已定义
             missing_events = []
-            self.collect_basic_events(gate_structure, events, missing_events)
+            for gate_structure in gate_structures:
+                self.collect_basic_events(gate_structure, events, missing_events)
+            missing_events = list(dict.fromkeys(missing_events))
             if missing_events:
                 self.root.after(0, lambda: messagebox.showwarning("缺失事件",
                                                                   f"以下基本事件未在底事件列表中定义: {', '.join(missing_events)}\n请添加这些事件及其概率。"))
                 return
 
+            # 多个顶事件编译为一个共享的 DAG，图形与计算共用
+            tree = compile_tops(gate_structures, self.event_definitions, progress)
+
             # 生成故障树图形
-            self.generate_fault_tree(top_event, events, gate_structure)
+            self.generate_fault_tree(top_events, events, gate_structures, tree, inputs["font_name"],
+                                     inputs["expand_graph"], progress)
 
-            # 计算顶事件概率和最小割集
-            self.calculate_results(top_event, events, gate_structure)
+            # 计算各顶事件的概率和最小割集（共享子树只计算一次）
+            self.calculate_results(top_events, events, gate_structures, tree, progress)
 
+        except AnalysisCancelled:
+            return
         except RecursionError:
             # 处理递归深度错误
             self.root.after(0, self.show_recursion_error)
@@ -444,384 +592,434 @@ class FaultTreeApp:
                 else:
                     self.collect_basic_events(child, events, missing_events)
 
-    def parse_event_definitions(self, expr):
+    def parse_event_definitions(self, expr, progress=NULL_PROGRESS):
         """解析多行事件定义"""
-        event_definitions = {}
-        lines = expr.splitlines()
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            match = re.match(r'^\s*(\w+)\s*=\s*(.+)$', line)
-            if not match:
-                raise ValueError(f"无效的事件定义格式: '{line}'")
-
-            event_name = match.group(1)
-            expr_part = match.group(2).strip()
-            event_definitions[event_name] = self.parse_expression(expr_part, event_name)
-
-        return event_definitions
-
-    def parse_expression(self, expr, event_name):
-        """解析表达式为门结构"""
-        expr = re.sub(r'\s+', ' ', expr).strip()
-
-        if expr.startswith("(") and expr.endswith(")"):
-            expr = expr[1:-1].strip()
-
-        or_parts = self.split_by_operator(expr, " or ")
-        if len(or_parts) > 1:
-            return {
-                "type": "OR",
-                "name": event_name,
-                "children": [self.parse_expression(part, f"{event_name}_OR") for part in or_parts]
-            }
-
-        and_parts = self.split_by_operator(expr, " and ")
-        if len(and_parts) > 1:
-            return {
-                "type": "AND",
-                "name": event_name,
-                "children": [self.parse_expression(part, f"{event_name}_AND") for part in and_parts]
-            }
-
-        return {
-            "type": "BASIC",
-            "name": expr
-        }
-
-    def split_by_operator(self, expr, operator):
-        """按运算符分割表达式"""
-        parts = []
-        current = []
-        paren_count = 0
-        tokens = expr.split()
-
-        for token in tokens:
-            if token == "(":
-                paren_count += 1
-            elif token == ")":
-                paren_count -= 1
-
-            if paren_count == 0 and token == operator.strip():
-                parts.append(" ".join(current))
-                current = []
-            else:
-                current.append(token)
-
-        parts.append(" ".join(current))
-        return [p.strip() for p in parts if p.strip()]
-
-    def generate_fault_tree(self, top_event, events, gate_structure):
-        """生成故障树图形 - 使用迭代方法替代递归"""
-        if self.analysis_canceled:
-            return
-
-        font_name = self.font_var.get()
-
-        graph_attr = {
-            'rankdir': 'TB',
-            'fontname': font_name,
-            'fontsize': '12'
-        }
-
-        node_attr = {
-            'fontname': font_name,
-            'fontsize': '10'
-        }
-
-        edge_attr = {
-            'fontname': font_name,
-            'fontsize': '9'
-        }
-
-        dot = graphviz.Digraph(comment='Fault Tree',
-                               graph_attr=graph_attr,
-                               node_attr=node_attr,
-                               edge_attr=edge_attr)
-
+        return parse_event_definitions(expr, progress=progress)
+
+    def generate_fault_tree(self, top_events, events, gate_structures, tree, font_name, expanded=False,
+                            progress=NULL_PROGRESS):
+        """生成故障树图形结构（多个顶事件画在同一张图中），并交给后台线程渲染；tree 为 compile_tops 的结果"""
+        # ids: 图形节点 -> 结构 id，查看器据此查找节点概率
+        top_ids = ['TOP' if i == 0 else f'TOP{i}' for i in range(len(top_events))]
+        graph = {'nodes': [(top_id, 'TOP', name) for top_id, name in zip(top_ids, top_events)], 'edges': [], 'ids': {}}
+        if expanded:
+            self.add_expanded_nodes(graph, top_ids, gate_structures, progress)
+        else:
+            self.add_dag_nodes(graph, top_ids, tree, progress)
+
+        # 新的渲染会使尚未完成的旧渲染结果作废；布局与分析并行进行，取消分析时一并取消
+        # graph_spec 为 (图形, 当前标签, 字体)，报告图像在保存时才按它渲染
+        labels = [self.graph_node_label(gate_type, name, events) for _, gate_type, name in graph['nodes']]
+        self.graph_generation += 1
+        self.graph_spec = (graph, labels, font_name)
+        render_thread = threading.Thread(target=self.render_graph,
+                                         args=(self.graph_generation, graph, labels, font_name, progress.child()))
+        render_thread.daemon = True
+        render_thread.start()
+
+    def add_dag_nodes(self, graph, top_ids, tree, progress=NULL_PROGRESS):
+        """每个结构 id 只添加一个节点，共享节点（包括不同顶事件之间共用的节点）为每个父节点各连一条边"""
+        depths = tree.depths()
+        self.event_hierarchy = {}
+        node_ids = [f"node_{structure_id}" for structure_id in tree.ids]
+
+        progress.start("graph", len(tree))
+        for idx in range(len(tree) - 1, -1, -1):
+            progress.step()
+            structure_id = tree.ids[idx]
+            self.event_hierarchy[structure_id] = max(self.event_hierarchy.get(structure_id, 0), depths[idx])
+            graph['nodes'].append((node_ids[idx], self.graph_node_type(tree.types[idx], tree.k[idx],
+                                                                       len(tree.children[idx])), tree.names[idx]))
+            graph['ids'][node_ids[idx]] = structure_id
+
+        graph['edges'].extend((top_id, node_ids[root]) for top_id, root in zip(top_ids, tree.roots))
+        graph['edges'].extend((node_ids[parent], node_ids[child]) for parent, child in tree.edges())
+
+    def add_expanded_nodes(self, graph, top_ids, gate_structures, progress=NULL_PROGRESS):
+        """按树形展开所有节点，共享子树在每个引用处重复添加"""
         # 使用栈替代递归
         stack = collections.deque()
         self.event_hierarchy = {}
         node_counter = 0
+        for top_id, gate_structure in reversed(list(zip(top_ids, gate_structures))):
+            stack.append((top_id, gate_structure, 0))
 
-        # 添加顶事件
-        dot.node('TOP', f'顶事件: {top_event}',
-                 shape='rectangle', style='filled', fillcolor='lightblue')
-
-        # 添加顶部门
-        stack.append(('TOP', gate_structure, 0))
-
-        while stack and not self.analysis_canceled:
+        # 展开后的节点数事先未知
+        progress.start("graph")
+        while stack:
+            progress.step()
             parent_id, gate, level = stack.pop()
 
             # 创建节点ID
             node_id = f"node{node_counter}"
             node_counter += 1
-            self.event_hierarchy[gate['name']] = level
-
-            # 创建节点
-            if gate['type'] == 'BASIC':
-                prob = events.get(gate['name'], 0.0)
-                dot.node(node_id, f"{gate['name']}\nP={prob:.4f}",
-                         shape='box', style='filled', fillcolor='lightcoral')
-            else:
-                gate_label = "或门 (OR)" if gate['type'] == 'OR' else "与门 (AND)"
-                dot.node(node_id, f"{gate_label}\n{gate['name']}",
-                         shape='ellipse', style='filled', fillcolor='lightyellow')
+            self.event_hierarchy[gate['id']] = max(self.event_hierarchy.get(gate['id'], 0), level)
+            graph['ids'][node_id] = gate['id']
 
-            # 添加边
-            dot.edge(parent_id, node_id)
+            # 创建节点和边
+            graph['nodes'].append((node_id, self.graph_node_type(gate['type'], gate.get('k', 0),
+                                                                 len(gate.get('children', []))), gate['name']))
+            graph['edges'].append((parent_id, node_id))
 
             # 添加子节点到栈中
             if 'children' in gate:
                 # 反转子节点列表，以便按顺序处理
                 children = list(reversed(gate['children']))
                 for child in children:
-                    if child['name'] in self.event_definitions:
+                    if child['type'] == 'BASIC' and child['name'] in self.event_definitions:
                         stack.append((node_id, self.event_definitions[child['name']], level + 1))
                     else:
                         stack.append((node_id, child, level + 1))
 
-        # 保存并渲染图形
+    def graph_node_type(self, gate_type, k, n):
+        """图形节点类型；表决门带上 k/n，使标签与结构哈希都能区分不同的表决门"""
+        return f"VOTE {k}/{n}" if gate_type == 'VOTE' else gate_type
+
+    def graph_node_label(self, gate_type, name, events):
+        if gate_type == 'TOP':
+            return f'顶事件: {name}'
+        if gate_type == 'BASIC':
+            return f"{name}\nP={events.get(name, 0.0):.4f}"
+        if gate_type.startswith('VOTE '):
+            k, n = gate_type[len('VOTE '):].split('/')
+            return f"{gate_label('VOTE', k, n)}\n{name}"
+        return f"{gate_label(gate_type)}\n{name}"
+
+    def graph_structure_key(self, graph, font_name):
+        """图形结构哈希：只包含影响布局的内容，不包含概率标签"""
+        digest = hashlib.sha1(font_name.encode('utf-8'))
+        for node in graph['nodes']:
+            digest.update(repr(node).encode('utf-8'))
+        for edge in graph['edges']:
+            digest.update(repr(edge).encode('utf-8'))
+        return digest.hexdigest()
+
+    def build_dot(self, graph, labels, font_name, layout=None):
+        """构建 Graphviz 图；给定布局时固定节点与边的位置，渲染时不再重新布局"""
+        dot = graphviz.Digraph(comment='Fault Tree',
+                               graph_attr={'rankdir': 'TB', 'fontname': font_name, 'fontsize': '12'},
+                               node_attr={'fontname': font_name, 'fontsize': '10'},
+                               edge_attr={'fontname': font_name, 'fontsize': '9'})
+        if layout:
+            dot.engine = 'neato'
+
+        for (node_id, gate_type, _), label in zip(graph['nodes'], labels):
+            attrs = dict(self.GRAPH_NODE_STYLES.get(gate_type, self.GRAPH_NODE_STYLES['GATE']))
+            if layout and node_id in layout['nodes']:
+                attrs.update(layout['nodes'][node_id])
+            dot.node(node_id, label, style='filled', **attrs)
+
+        for i, (tail, head) in enumerate(graph['edges']):
+            if layout and i < len(layout['edges']) and layout['edges'][i]:
+                dot.edge(tail, head, pos=layout['edges'][i])
+            else:
+                dot.edge(tail, head)
+        return dot
+
+    def layout_graph(self, graph, labels, font_name, progress=NULL_PROGRESS):
+        """
+        计算节点坐标。规模适中时使用 Graphviz JSON 输出的坐标、尺寸与边样条，
+        规模过大或 Graphviz 不可用时改用内置分层布局。
+        """
+        if len(graph['nodes']) > self.GRAPHVIZ_LAYOUT_MAX_NODES:
+            return self.builtin_layout(graph, labels, progress)
+        progress.start("render")
         try:
-            os.environ["LANG"] = "zh_CN.UTF-8"
-            os.environ["LC_ALL"] = "zh_CN.UTF-8"
-
-            dot.render('fault_tree', format='png', cleanup=True)
-
-            img = Image.open('fault_tree.png')
-            max_width = 800
-            max_height = 600
-            img.thumbnail((max_width, max_height))
-            photo = ImageTk.PhotoImage(img)
-
-            # 在主线程中更新UI
-            self.root.after(0, lambda: self.update_graph(photo))
-
+            data = json.loads(self.build_dot(graph, labels, font_name).pipe(format='json'))
         except Exception as e:
-            error_msg = f"无法生成故障树图形: {str(e)}\n\n可能的原因:\n"
-            error_msg += "1. 未安装Graphviz或未添加到系统PATH\n"
-            error_msg += "2. 系统中缺少指定的中文字体\n"
-            error_msg += "3. 文件写入权限问题"
-            self.root.after(0, lambda: messagebox.showerror("图形生成错误", error_msg))
-
-    def update_graph(self, photo):
-        """在主线程中更新图形显示"""
-        for widget in self.graph_frame.winfo_children():
-            widget.destroy()
+            layout = self.builtin_layout(graph, labels, progress)
+            layout['error'] = str(e)
+            return layout
+        # Graphviz 在外部进程中运行，只能在其返回后检查取消
+        progress.poll()
+
+        nodes = {}
+        for obj in data.get('objects', []):
+            if 'pos' in obj:
+                nodes[obj['name']] = {'pos': obj['pos'], 'width': obj['width'], 'height': obj['height']}
+        edges = [edge.get('pos') for edge in sorted(data.get('edges', []), key=lambda e: e['_gvid'])]
+        return {'bb': data.get('bb'), 'nodes': nodes, 'edges': edges}
+
+    def builtin_layout(self, graph, labels, progress=NULL_PROGRESS):
+        """内置分层布局，输出格式与 Graphviz 布局相同（单位为点，y 轴向上）"""
+        index = {node[0]: i for i, node in enumerate(graph['nodes'])}
+        children = [[] for _ in graph['nodes']]
+        for tail, head in graph['edges']:
+            children[index[tail]].append(index[head])
+        widths = [estimate_label_width(label) for label in labels]
+        coords = layered_layout(children, widths, progress=progress)
+
+        node_height = 40.0
+        width = max(x + w / 2 for (x, _), w in zip(coords, widths))
+        height = max(y for _, y in coords) + node_height
+        nodes = {}
+        for (node_id, _, _), (x, y), w in zip(graph['nodes'], coords, widths):
+            nodes[node_id] = {'pos': f"{x:.2f},{height - node_height / 2 - y:.2f}",
+                              'width': f"{w / 72:.3f}", 'height': f"{node_height / 72:.3f}"}
+        return {'bb': f"0,0,{width:.2f},{height:.2f}", 'nodes': nodes, 'edges': [None] * len(graph['edges'])}
+
+    def graph_view_model(self, graph, labels, layout):
+        """把布局转换为查看器使用的节点与边（y 轴向下）"""
+        top = float(layout['bb'].split(',')[3])
+        index = {}
+        nodes = []
+        for (node_id, gate_type, name), label in zip(graph['nodes'], labels):
+            info = layout['nodes'][node_id]
+            x, y = (float(v) for v in info['pos'].split(','))
+            index[node_id] = len(nodes)
+            nodes.append({'id': node_id, 'key': graph['ids'].get(node_id), 'type': gate_type, 'name': name,
+                          'label': label, 'x': x, 'y': top - y, 'w': float(info['width']) * 72, 'h': float(info['height']) * 72})
+        edges = [(index[tail], index[head]) for tail, head in graph['edges']]
+        return nodes, edges
+
+    def cache_graph_result(self, cache, key, value):
+        with self.graph_cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.GRAPH_CACHE_SIZE:
+                cache.popitem(last=False)
+
+    def cached_graph_result(self, cache, key):
+        with self.graph_cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def render_graph(self, generation, graph, labels, font_name, progress=NULL_PROGRESS):
+        """
+        在后台线程中布局图形并更新查看器；结构不变时复用布局。
+        PNG 图像只为报告而渲染，保存报告时才生成（见 report_graph_image）。progress 被取消时放弃本次布局。
+        """
+        structure_key = self.graph_structure_key(graph, font_name)
 
-        label = ttk.Label(self.graph_frame, image=photo)
-        label.image = photo
-        label.pack(padx=10, pady=10)
+        os.environ["LANG"] = "zh_CN.UTF-8"
+        os.environ["LC_ALL"] = "zh_CN.UTF-8"
 
-    def calculate_results(self, top_event, events, gate_structure):
-        """计算顶事件概率和最小割集 - 使用迭代方法替代递归"""
-        if self.analysis_canceled:
+        try:
+            layout = self.cached_graph_result(self.graph_layout_cache, structure_key)
+            if layout is None:
+                layout = self.layout_graph(graph, labels, font_name, progress)
+                self.cache_graph_result(self.graph_layout_cache, structure_key, layout)
+            nodes, edges = self.graph_view_model(graph, labels, layout)
+        except AnalysisCancelled:
+            return
+        except Exception as e:
+            self.root.after(0, lambda: self.graph_viewer.clear(f"无法生成故障树图形: {str(e)}"))
             return
 
-        # 使用迭代方法计算概率
-        def calculate_probability_iterative(gate):
-            """使用迭代方法计算事件概率"""
-            # 后序遍历栈
-            stack = []
-            # 结果缓存
-            cache = {}
-            # 访问标记
-            visited = set()
-
-            # 初始节点入栈
-            stack.append(gate)
-
-            while stack:
-                current = stack[-1]
-
-                # 如果当前节点是基本事件，直接计算
-                if current['type'] == 'BASIC':
-                    cache[current['name']] = events.get(current['name'], 0.0)
-                    visited.add(current['name'])
-                    stack.pop()
-                    continue
-
-                # 如果当前节点在缓存中，直接使用
-                if current['name'] in cache:
-                    stack.pop()
-                    continue
-
-                # 检查所有子节点是否已计算
-                all_children_calculated = True
-                children_to_process = []
-
-                for child in current.get('children', []):
-                    # 如果子节点是已定义的事件，使用定义
-                    child_node = self.event_definitions[child['name']] if child[
-                                                                              'name'] in self.event_definitions else child
-
-                    if child_node['name'] not in cache:
-                        all_children_calculated = False
-                        if child_node['name'] not in visited:
-                            stack.append(child_node)
-                            visited.add(child_node['name'])
-                    else:
-                        children_to_process.append(cache[child_node['name']])
-
-                # 如果所有子节点都已计算，计算当前节点
-                if all_children_calculated:
-                    if current['type'] == 'OR':
-                        product = 1.0
-                        for p in children_to_process:
-                            product *= (1 - p)
-                        cache[current['name']] = 1 - product
-                    elif current['type'] == 'AND':
-                        product = 1.0
-                        for p in children_to_process:
-                            product *= p
-                        cache[current['name']] = product
-                    else:
-                        cache[current['name']] = 0.0
-                    stack.pop()
-
-            return cache.get(gate['name'], 0.0)
-
-        # 使用迭代方法计算最小割集
-        def find_cut_sets_iterative(gate):
-            """使用迭代方法计算最小割集"""
-            # 后序遍历栈
-            stack = []
-            # 结果缓存
-            cache = {}
-            # 访问标记
-            visited = set()
-
-            # 初始节点入栈
-            stack.append(gate)
-
-            while stack:
-                current = stack[-1]
-
-                # 如果当前节点是基本事件，直接计算
-                if current['type'] == 'BASIC':
-                    cache[current['name']] = [[current['name']]]
-                    visited.add(current['name'])
-                    stack.pop()
-                    continue
-
-                # 如果当前节点在缓存中，直接使用
-                if current['name'] in cache:
-                    stack.pop()
-                    continue
-
-                # 检查所有子节点是否已计算
-                all_children_calculated = True
-                children_cut_sets = []
-
-                for child in current.get('children', []):
-                    # 如果子节点是已定义的事件，使用定义
-                    child_node = self.event_definitions[child['name']] if child[
-                                                                              'name'] in self.event_definitions else child
-
-                    if child_node['name'] not in cache:
-                        all_children_calculated = False
-                        if child_node['name'] not in visited:
-                            stack.append(child_node)
-                            visited.add(child_node['name'])
-                    else:
-                        children_cut_sets.append(cache[child_node['name']])
-
-                # 如果所有子节点都已计算，计算当前节点
-                if all_children_calculated:
-                    if current['type'] == 'OR':
-                        result = []
-                        for cut_sets in children_cut_sets:
-                            result.extend(cut_sets)
-                        cache[current['name']] = result
-                    elif current['type'] == 'AND':
-                        result = []
-                        if children_cut_sets:
-                            # 从第一个子节点开始
-                            result = children_cut_sets[0]
-                            for i in range(1, len(children_cut_sets)):
-                                new_result = []
-                                for cs1 in result:
-                                    for cs2 in children_cut_sets[i]:
-                                        new_result.append(cs1 + cs2)
-                                result = new_result
-                        cache[current['name']] = result
-                    else:
-                        cache[current['name']] = []
-                    stack.pop()
+        message = None
+        if 'error' in layout:
+            message = (f"Graphviz 不可用，已使用内置分层布局: {layout['error']} "
+                       "(请确认已安装Graphviz并添加到系统PATH)")
+        self.root.after(0, lambda: self.update_graph(generation, nodes, edges, message))
+
+    def report_graph_image(self, graph, labels, font_name):
+        """
+        保存报告时按缓存的布局渲染 PNG（neato -n2，不重新布局），标签不变时直接复用上次的图像。
+
+        图形过大、没有 Graphviz 布局或渲染失败时返回 None，报告改为绘制查看器中的图形。
+        """
+        if len(graph['nodes']) > self.GRAPH_IMAGE_MAX_NODES:
+            return None
+        structure_key = self.graph_structure_key(graph, font_name)
+        layout = self.cached_graph_result(self.graph_layout_cache, structure_key)
+        if layout is None or 'error' in layout:
+            return None
+        render_key = (structure_key, hashlib.sha1("\x00".join(labels).encode('utf-8')).hexdigest())
+        png = self.cached_graph_result(self.graph_render_cache, render_key)
+        if png is None:
+            try:
+                png = self.build_dot(graph, labels, font_name, layout).pipe(format='png', neato_no_op=2)
+            except Exception:
+                return None
+            self.cache_graph_result(self.graph_render_cache, render_key, png)
+        return png
 
-            return cache.get(gate['name'], [])
+    def update_graph(self, generation, nodes, edges, message=None):
+        """在主线程中更新图形显示"""
+        if generation != self.graph_generation:
+            return
+        self.graph_view = (nodes, edges)
+        self.graph_viewer.set_graph(nodes, edges, message)
 
+    def refresh_graph_labels(self, events):
+        """概率变化后只更新查看器标签，不重新渲染图像；报告图像在保存时按新标签渲染"""
+        if self.graph_spec is None:
+            return
+        graph, _, font_name = self.graph_spec
+        labels = [self.graph_node_label(gate_type, name, events) for _, gate_type, name in graph['nodes']]
+        self.graph_spec = (graph, labels, font_name)
+        self.graph_viewer.update_labels({node[0]: label for node, label in zip(graph['nodes'], labels)
+                                         if node[1] == 'BASIC'})
+
+    def describe_graph_node(self, node):
+        """查看器中单击节点时显示的概率与重要度"""
+        tops = self.analysis_results.get('tops', [])
+        if node['type'] == 'TOP':
+            text = f"顶事件 {node['name']}"
+            probability = next((top['probability'] for top in tops if top['top_event'] == node['name']), None)
+        else:
+            text = f"{node['name']} ({node['type']})"
+            probability = self.node_probabilities.get(node['key'])
+        if probability is not None:
+            text += f"  P={probability:.6g}"
+        if node['type'] == 'BASIC':
+            # 多个顶事件时分别给出相对于各顶事件的重要度
+            importance = [(top['top_event'], top['importance_sums'][node['name']] / top['probability'])
+                          for top in tops if node['name'] in top['importance_sums'] and top['probability'] > 0]
+            if len(tops) == 1 and importance:
+                text += f"  FV重要度={importance[0][1]:.4f}"
+            elif importance:
+                text += "  FV重要度 " + ", ".join(f"{name}={value:.4f}" for name, value in importance)
+        return text
+
+    def calculate_results(self, top_events, events, gate_structures, tree, progress=NULL_PROGRESS):
+        """
+        计算各顶事件的概率和最小割集 - 使用迭代方法替代递归。
+
+        tree 为各顶事件编译成的共享 DAG（compile_tops），概率在其上一次算出；
+        多个顶事件共用割集缓存，共享子树只计算一次。
+        每完成一个节点向 progress 报告一次（与门组合很大时按块报告生成的候选割集数），
+        被取消时各阶段抛出 AnalysisCancelled，不保存任何结果。
+        """
         try:
-            # 计算顶事件概率
-            p_top = calculate_probability_iterative(gate_structure)
-
-            # 计算最小割集
-            all_cut_sets = find_cut_sets_iterative(gate_structure)
-            minimal_cut_sets = []
-
-            # 按长度排序以便更有效地找到最小割集
-            all_cut_sets.sort(key=len)
-
-            # 转换为集合以进行子集检查
-            all_cut_sets_sets = [set(cs) for cs in all_cut_sets]
-
-            # 找出最小割集
-            for i, cut_set in enumerate(all_cut_sets_sets):
-                is_minimal = True
-                for j, existing_set in enumerate(all_cut_sets_sets):
-                    if i != j and existing_set.issubset(cut_set) and len(existing_set) < len(cut_set):
-                        is_minimal = False
-                        break
-                if is_minimal:
-                    minimal_cut_sets.append(list(cut_set))
-
-            # 保存分析结果
+            # 计算各顶事件概率：每个节点只计算一次（中间的非门、异或门按独立性近似显示，顶事件概率由 BDD 精确计算）
+            evaluator = ProbabilityEvaluator(tree, events, progress)
+            p_tops = evaluator.top_probabilities()
+            self.node_probabilities = {tree.ids[idx]: value for idx, value in enumerate(evaluator.values)}
+
+            # 编译时已检查相干性：含非门或异或门的树改走 BDD
+
+            spill = None
+            if tree.coherent and MEMORY_BUDGET_MB:
+                exact = None
+                # 设置了内存预算：中间割集族超出预算时溢出到磁盘
+                with bounded_minimal_cut_sets(tree, int(MEMORY_BUDGET_MB * 2 ** 20), SPILL_DIR,
+                                              progress=progress) as spilled:
+                    cut_sets_tops = [list(top) for top in spilled.tops]
+                    spill = spilled.stats
+            elif tree.coherent and CUT_SET_WORKERS > 1:
+                exact = None
+                cut_sets_tops, _ = parallel_top_minimal_cut_sets(tree, CUT_SET_WORKERS, progress=progress)
+            elif tree.coherent:
+                exact = None
+                # 与 API 相同：按拓扑序逐门计算并立即化简，各顶事件共用子树的割集
+                cut_sets_tops = top_minimal_cut_sets(tree, progress=progress)
+            else:
+                # 非相干树：BDD 上的精确概率，质蕴涵代替最小割集
+                exact = build_bdd_tops(tree, progress=progress)
+                bdd, bdd_roots = exact
+                probabilities = [events.get(name, 0.0) for name in bdd.variables]
+                p_tops = bdd.probabilities(bdd_roots, probabilities)
+                for root, p_top in zip(tree.roots, p_tops):
+                    self.node_probabilities[tree.ids[root]] = p_top
+                cut_sets_tops = top_prime_implicants(tree, bdd, bdd_roots, progress)
+
+            # Fussell-Vesely 重要度的分子（含该事件的割集概率之和），供图形查看器显示
+            progress.start("importance", sum(len(cut_sets) for cut_sets in cut_sets_tops))
+            depth = max(self.event_hierarchy.values()) if self.event_hierarchy else 0
+            tops = []
+            for top_event, gate_structure, p_top, minimal_cut_sets in zip(top_events, gate_structures, p_tops,
+                                                                          cut_sets_tops):
+                importance = collections.defaultdict(float)
+                cut_set_probabilities = []
+                cut_sets_by_event = collections.defaultdict(list)
+                for i, cut_set in enumerate(minimal_cut_sets):
+                    progress.step()
+                    p_cut = cut_set_probability(cut_set, events)
+                    for literal in cut_set:
+                        name = literal_event(literal)[0]
+                        cut_sets_by_event[name].append(i)
+                        importance[name] += p_cut
+                    cut_set_probabilities.append(p_cut)
+                tops.append({
+                    "top_event": top_event,
+                    "probability": p_top,
+                    "minimal_cut_sets": minimal_cut_sets,
+                    "cut_set_probabilities": cut_set_probabilities,
+                    "cut_sets_by_event": dict(cut_sets_by_event),
+                    "importance_sums": dict(importance),
+                    "structure_description": {
+                        "gate_type": gate_structure['type'],
+                        "children_count": len(gate_structure.get('children', [])),
+                        "max_depth": depth
+                    }
+                })
+
+            # 保留编译后的模型，之后修改底事件概率时只做增量计算
+            self.live_model = {
+                "evaluator": evaluator,
+                "exact": exact,
+                "events": dict(events),
+                "tops": tops,
+            }
+
+            # 保存分析结果：顶层字段为第一个顶事件，tops 为全部顶事件（报告逐个列出）
+            first = tops[0]
             self.analysis_results = {
-                "top_event": top_event,
-                "probability": p_top,
-                "minimal_cut_sets": minimal_cut_sets,
-                "structure_description": {
-                    "gate_type": gate_structure['type'],
-                    "children_count": len(gate_structure.get('children', [])),
-                    "max_depth": max(self.event_hierarchy.values()) if self.event_hierarchy else 0
-                }
+                "top_event": first["top_event"],
+                "probability": first["probability"],
+                "coherent": tree.coherent,
+                "spill": spill,
+                "minimal_cut_sets": first["minimal_cut_sets"],
+                "cut_set_probabilities": first["cut_set_probabilities"],
+                "structure_description": first["structure_description"],
+                "tops": tops,
             }
 
             # 在主线程中更新结果
-            self.root.after(0, lambda: self.update_results(top_event, p_top, minimal_cut_sets, gate_structure))
+            self.root.after(0, lambda: self.update_results(tops))
 
+        except AnalysisCancelled:
+            return
         except Exception as e:
             # 在主线程中显示错误
             self.root.after(0, lambda: self.show_error(f"分析过程中出错:\n{str(e)}"))
 
-    def update_results(self, top_event, p_top, minimal_cut_sets, gate_structure):
-        """在主线程中更新结果文本框"""
+    def update_results(self, tops):
+        """在主线程中更新结果文本框；多个顶事件时各部分按顶事件依次列出"""
         self.result_text.configure(state='normal')
         self.result_text.delete(1.0, tk.END)
+        multiple = len(tops) > 1
 
         self.result_text.insert(tk.END, f"故障树分析结果\n", 'header')
-        self.result_text.insert(tk.END, f"顶事件: {top_event}\n\n")
+        self.result_text.insert(tk.END, f"顶事件: {', '.join(top['top_event'] for top in tops)}\n\n")
 
         self.result_text.insert(tk.END, "1. 顶事件发生概率:\n", 'subheader')
-        self.result_text.insert(tk.END, f"   P({top_event}) = {p_top:.12f}\n\n")
-
-        self.result_text.insert(tk.END, "2. 最小割集:\n", 'subheader')
-        if minimal_cut_sets:
-            for i, cut_set in enumerate(minimal_cut_sets, 1):
-                self.result_text.insert(tk.END, f"   割集 {i}: {' and '.join(cut_set)}\n")
+        for i, top in enumerate(tops):
+            self.result_text.insert(tk.END, f"   P({top['top_event']}) = {top['probability']:.12f}",
+                                    f'top_probability{i}')
+            self.result_text.insert(tk.END, "\n")
+        self.result_text.insert(tk.END, "\n")
+
+        if self.analysis_results.get('coherent', True):
+            kind, item = "最小割集", "割集"
+            self.result_text.insert(tk.END, "2. 最小割集:\n", 'subheader')
         else:
-            self.result_text.insert(tk.END, "   未找到最小割集\n")
+            kind, item = "质蕴涵", "质蕴涵"
+            self.result_text.insert(tk.END, "2. 质蕴涵 (含非门/异或门的非相干故障树，概率为 BDD 精确值):\n",
+                                    'subheader')
+        for top in tops:
+            if multiple:
+                self.result_text.insert(tk.END, f"  {top['top_event']}:\n")
+            if top['minimal_cut_sets']:
+                for i, cut_set in enumerate(top['minimal_cut_sets'], 1):
+                    self.result_text.insert(tk.END, f"   {item} {i}: {' and '.join(cut_set)}\n")
+            else:
+                self.result_text.insert(tk.END, f"   未找到{kind}\n")
 
         self.result_text.insert(tk.END, "\n3. 故障树结构说明:\n", 'subheader')
-        self.result_text.insert(tk.END, f"   顶事件: {top_event}\n")
-        self.result_text.insert(tk.END, f"   门类型: {gate_structure['type']}\n")
-        self.result_text.insert(tk.END, f"   子节点数: {len(gate_structure.get('children', []))}\n")
+        for top in tops:
+            self.result_text.insert(tk.END, f"   顶事件: {top['top_event']}\n")
+            self.result_text.insert(tk.END, f"   门类型: {top['structure_description']['gate_type']}\n")
+            self.result_text.insert(tk.END, f"   子节点数: {top['structure_description']['children_count']}\n")
         self.result_text.insert(tk.END,
                                 f"   最大深度: {self.analysis_results['structure_description']['max_depth']}\n")
+        spill = self.analysis_results.get('spill')
+        if spill and spill['runs']:
+            self.result_text.insert(tk.END, f"   割集生成溢出: {spill['runs']} 段，{spill['spilled_sets']} 个割集，"
+                                            f"{spill['spilled_bytes'] / 2 ** 20:.1f} MB\n")
 
         # 添加样式标签
         self.result_text.tag_configure('header', font=(self.default_font[0], 12, 'bold'), foreground='navy')
@@ -829,6 +1027,18 @@ class FaultTreeApp:
 
         self.result_text.configure(state='disabled')
 
+    def show_top_probabilities(self, tops):
+        """只替换结果面板中各顶事件的概率行"""
+        self.result_text.configure(state='normal')
+        for i, top in enumerate(tops):
+            ranges = self.result_text.tag_ranges(f'top_probability{i}')
+            if not ranges:
+                continue
+            self.result_text.delete(ranges[0], ranges[1])
+            self.result_text.insert(ranges[0], f"   P({top['top_event']}) = {top['probability']:.12f}",
+                                    f'top_probability{i}')
+        self.result_text.configure(state='disabled')
+
     def show_error(self, message):
         """在主线程中显示错误"""
         self.result_text.configure(state='normal')
@@ -841,8 +1051,12 @@ class FaultTreeApp:
             messagebox.showwarning("保存失败", "请先生成故障树分析结果")
             return
 
-        if not os.path.exists(self.graph_image_path):
-            messagebox.showwarning("保存失败", "未找到故障树图形文件")
+        if self.graph_spec is None or not self.graph_view[0]:
+            messagebox.showwarning("保存失败", "故障树图形尚未生成")
+            return
+
+        if self.report_thread and self.report_thread.is_alive():
+            messagebox.showwarning("保存失败", "正在生成上一份报告，请稍候")
             return
 
         default_filename = f"故障树分析_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
@@ -855,81 +1069,57 @@ class FaultTreeApp:
         if not file_path:
             return
 
-        try:
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_auto_page_break(auto=True, margin=15)
-
-            try:
-                if sys.platform.startswith('win'):
-                    pdf.add_font("SimSun", "", "C:/Windows/Fonts/simsun.ttc", uni=True)
-                    pdf.set_font("SimSun", size=14)
-                else:
-                    pdf.add_font("SimSun", "", "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf", uni=True)
-                    pdf.set_font("SimSun", size=14)
-            except:
-                try:
-                    if sys.platform.startswith('win'):
-                        pdf.add_font("SimHei", "", "C:/Windows/Fonts/simhei.ttf", uni=True)
-                        pdf.set_font("SimHei", size=14)
-                    else:
-                        pdf.add_font("SimHei", "", "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
-                                     uni=True)
-                        pdf.set_font("SimHei", size=14)
-                except:
-                    pdf.set_font("Arial", size=14)
-
-            pdf.set_font_size(16)
-            pdf.cell(0, 10, "故障树分析报告", ln=True, align='C')
-            pdf.ln(10)
-
-            pdf.set_font_size(12)
-            pdf.cell(0, 10, f"生成日期: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True)
-            pdf.cell(0, 10, f"顶事件: {self.analysis_results['top_event']}", ln=True)
-            pdf.ln(10)
-
-            pdf.set_font_size(14)
-            pdf.cell(0, 10, "分析结果", ln=True)
-            pdf.set_font_size(12)
-
-            pdf.cell(0, 10,
-                     f"1. 顶事件发生概率: P({self.analysis_results['top_event']}) = {self.analysis_results['probability']:.12f}",
-                     ln=True)
-
-            pdf.cell(0, 10, "2. 最小割集:", ln=True)
-            if self.analysis_results["minimal_cut_sets"]:
-                for i, cut_set in enumerate(self.analysis_results["minimal_cut_sets"], 1):
-                    pdf.cell(20)
-                    pdf.cell(0, 10, f"割集 {i}: {' and '.join(cut_set)}", ln=True)
-            else:
-                pdf.cell(20)
-                pdf.cell(0, 10, "未找到最小割集", ln=True)
-
-            pdf.cell(0, 10, "3. 故障树结构说明:", ln=True)
-            pdf.cell(20)
-            pdf.cell(0, 10, f"顶事件: {self.analysis_results['top_event']}", ln=True)
-            pdf.cell(20)
-            pdf.cell(0, 10, f"门类型: {self.analysis_results['structure_description']['gate_type']}", ln=True)
-            pdf.cell(20)
-            pdf.cell(0, 10, f"子节点数: {self.analysis_results['structure_description']['children_count']}", ln=True)
-            pdf.cell(20)
-            pdf.cell(0, 10, f"最大深度: {self.analysis_results['structure_description']['max_depth']}", ln=True)
-
-            pdf.ln(10)
+        top_k = None
+        tops = self.analysis_results["tops"]
+        cut_set_count = max(len(top["minimal_cut_sets"]) for top in tops)
+        if cut_set_count > self.REPORT_CUT_SET_PROMPT:
+            scope = "共有" if len(tops) == 1 else "割集最多的顶事件有"
+            target = "" if len(tops) == 1 else "每个顶事件"
+            top_k = simpledialog.askinteger(
+                "最小割集数量",
+                f"{scope} {cut_set_count} 个最小割集，请输入报告中{target}列出的数量（按概率从高到低，取消则全部列出）:",
+                initialvalue=self.REPORT_CUT_SET_PROMPT, minvalue=1, maxvalue=cut_set_count)
+
+        # 报告在后台线程中生成，这里只传递结果与图形的快照
+        results = dict(self.analysis_results)
+        graph_spec = self.graph_spec
+        self.report_canceled = False
+        self.create_progress_window("正在生成分析报告...", "保存报告", determinate=True, on_cancel=self.cancel_report)
+        self.report_thread = threading.Thread(
+            target=self.generate_report,
+            args=(file_path, results, graph_spec, self.graph_view, top_k))
+        self.report_thread.daemon = True
+        self.report_thread.start()
+
+    def generate_report(self, file_path, results, graph_spec, graph_view, top_k):
+        """在后台线程中生成PDF报告；报告图像在这里按当前标签渲染一次"""
+        def progress(fraction, message):
+            self.root.after(0, lambda: self.update_progress(fraction, message))
 
-            pdf.set_font_size(14)
-            pdf.cell(0, 10, "故障树图形", ln=True)
-            pdf.ln(5)
+        try:
+            progress(0.0, "正在渲染故障树图形...")
+            graph_image = self.report_graph_image(*graph_spec)
+            build_report(file_path, results, graph_image=graph_image, graph_view=graph_view, top_k=top_k,
+                         progress=progress, cancelled=lambda: self.report_canceled)
+        except ReportCancelled:
+            return
+        except Exception as e:
+            self.root.after(0, lambda: self.finish_report(error=str(e)))
+            return
+        self.root.after(0, lambda: self.finish_report(file_path=file_path))
 
-            pdf.image(self.graph_image_path, x=10, w=180)
+    def cancel_report(self):
+        """取消报告生成"""
+        self.report_canceled = True
+        self.close_progress_window()
 
-            pdf.output(file_path)
+    def finish_report(self, file_path=None, error=None):
+        self.close_progress_window()
+        if error is not None:
+            messagebox.showerror("保存失败", f"保存分析报告时出错:\n{error}")
+        else:
             messagebox.showinfo("保存成功", f"分析报告已保存至: {file_path}")
 
-        except Exception as e:
-            messagebox.showerror("保存失败", f"保存分析报告时出错:\n{str(e)}")
-
-
 if __name__ == "__main__":
     if sys.platform.startswith('win'):
         if locale.getdefaultlocale()[0] is None:
@@ -0,0 +1,167 @@
+# fta_parallel.py
+"""
+多进程展开与门的割集组合
+
+与门的组合是两组位集两两按位或，天然可以并行：左操作数按块划分，每个工作进程计算
+自己那一块与整个右操作数的组合并在本地化简，父进程汇总后再做一次全局化简。
+
+操作数以定长 uint64 位集数组（见 fta_bitset.pack_masks）放在 multiprocessing.shared_memory 中，
+工作进程按名称挂接，不经过 pickle；本地化简的结果同样写入工作进程创建的共享内存块，
+父进程读取后负责释放。组合数低于 min_products 时直接在本进程内计算，避免进程间开销。
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+from fta_bitset import minimize, pack_masks, unpack_masks
+from fta_engine import CompiledTree, top_minimal_cut_sets
+from fta_progress import NULL_PROGRESS, AnalysisCancelled
+
+MIN_PRODUCTS = 200_000
+CHUNKS_PER_WORKER = 4
+POLL_SECONDS = 0.1  # 等待工作进程时检查取消的间隔
+
+
+def _share(data: bytes) -> shared_memory.SharedMemory:
+    block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    block.buf[:len(data)] = data
+    return block
+
+
+def _product_chunk(left_name: str, start: int, stop: int, right_name: str, right_count: int,
+                   words: int) -> Tuple[Optional[str], int]:
+    """工作进程：左操作数 [start, stop) 行与右操作数的组合，本地化简后写入新的共享内存块"""
+    nbytes = 8 * words
+    left_block = shared_memory.SharedMemory(name=left_name)
+    right_block = shared_memory.SharedMemory(name=right_name)
+    try:
+        left = unpack_masks(left_block.buf[start * nbytes:stop * nbytes], words)
+        right = unpack_masks(right_block.buf[:right_count * nbytes], words)
+    finally:
+        left_block.close()
+        right_block.close()
+    result = minimize([a | b for a in left for b in right])
+    if not result:
+        return None, 0
+    output = _share(pack_masks(result, words))
+    name = output.name
+    output.close()
+    # 共享内存块交给父进程释放
+    resource_tracker.unregister(output._name, "shared_memory")
+    return name, len(result)
+
+
+def _take_block(name: str, count: int, words: int) -> List[int]:
+    """读取工作进程写入的结果块并释放它"""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return unpack_masks(block.buf[:count * 8 * words], words)
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _release_result(future) -> None:
+    """丢弃已完成块的结果，只释放其共享内存"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    name, _ = future.result()
+    if name is not None:
+        block = shared_memory.SharedMemory(name=name)
+        block.close()
+        block.unlink()
+
+
+def _discard(futures) -> None:
+    """取消尚未开始的块；正在运行的块不等待，算完后由完成回调释放其结果"""
+    for future in futures:
+        if not future.cancel():
+            future.add_done_callback(_release_result)
+
+
+class ParallelProduct:
+    """可作为 fta_engine.minimal_cut_sets 的 product 参数；words 为位集的 uint64 字数"""
+
+    def __init__(self, executor: ProcessPoolExecutor, workers: int, words: int, min_products: int = MIN_PRODUCTS,
+                 progress=NULL_PROGRESS):
+        self.executor = executor
+        self.workers = workers
+        self.words = words
+        self.min_products = min_products
+        self.progress = progress
+        self.stats = {"parallel_products": 0, "chunks": 0, "local_candidates": 0}
+
+    def __call__(self, left: List[int], right: List[int]) -> List[int]:
+        if len(left) * len(right) < self.min_products or len(left) < 2:
+            self.progress.step(0, len(left) * len(right))
+            return minimize([a | b for a in left for b in right], self.progress.poll)
+        words = self.words
+        chunk = max(1, math.ceil(len(left) / (self.workers * CHUNKS_PER_WORKER)))
+        left_block = _share(pack_masks(left, words))
+        right_block = _share(pack_masks(right, words))
+        try:
+            starts = range(0, len(left), chunk)
+            futures = [self.executor.submit(_product_chunk, left_block.name, start, min(start + chunk, len(left)),
+                                            right_block.name, len(right), words)
+                       for start in starts]
+            candidates: List[int] = []
+            consumed = 0
+            try:
+                for future, start in zip(futures, starts):
+                    while not wait([future], timeout=POLL_SECONDS).done:
+                        self.progress.poll()
+                    name, count = future.result()
+                    consumed += 1
+                    if name is not None:
+                        candidates.extend(_take_block(name, count, words))
+                    # 每块返回时报告该块的组合数，并检查取消
+                    self.progress.step(0, (min(start + chunk, len(left)) - start) * len(right))
+            except BaseException:
+                _discard(futures[consumed:])
+                raise
+        finally:
+            for block in (left_block, right_block):
+                block.close()
+                block.unlink()
+        self.stats["parallel_products"] += 1
+        self.stats["chunks"] += len(futures)
+        self.stats["local_candidates"] += len(candidates)
+        # 各块内部已化简，全局再做一次包含检查
+        return minimize(candidates, self.progress.poll)
+
+
+def parallel_minimal_cut_sets(tree: CompiledTree, workers: Optional[int] = None,
+                              substitutes: Optional[Dict[str, List[str]]] = None,
+                              min_products: int = MIN_PRODUCTS,
+                              progress=NULL_PROGRESS) -> Tuple[List[List[str]], Dict[str, int]]:
+    """
+    与 fta_engine.minimal_cut_sets 结果相同，较大的与门组合分配到 workers 个进程；返回 (割集, 统计)。
+
+    取消时尚未开始的块不再计算，也不等待正在运行的块，其结果算完后即被丢弃。
+    """
+    tops, stats = parallel_top_minimal_cut_sets(tree, workers, substitutes, min_products, progress)
+    return tops[0], stats
+
+
+def parallel_top_minimal_cut_sets(tree: CompiledTree, workers: Optional[int] = None,
+                                  substitutes: Optional[Dict[str, List[str]]] = None,
+                                  min_products: int = MIN_PRODUCTS,
+                                  progress=NULL_PROGRESS) -> Tuple[List[List[List[str]]], Dict[str, int]]:
+    """与 fta_engine.top_minimal_cut_sets 结果相同（各顶事件共用一个进程池）；返回 (各顶事件的割集, 统计)"""
+    workers = workers or os.cpu_count() or 1
+    substitutes = substitutes or {}
+    names = {substitute for name in tree.basic_events() for substitute in substitutes.get(name, (name,))}
+    words = max(1, (len(names) + 63) // 64)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    cancelled = False
+    try:
+        product = ParallelProduct(executor, workers, words, min_products, progress)
+        tops = top_minimal_cut_sets(tree, substitutes, product, progress)
+    except AnalysisCancelled:
+        cancelled = True
+        raise
+    finally:
+        executor.shutdown(wait=not cancelled, cancel_futures=cancelled)
+    return tops, {"workers": workers, **product.stats}
@@ -0,0 +1,447 @@
+# fta_parser.py
+"""
+故障树逻辑表达式解析
+
+本模块不依赖 tkinter 与 FastAPI，供 GUI (fta_new)、API (fta_api) 与批处理命令行 (fta_batch) 共同使用。
+解析结果为门结构字典：{"type": "OR"/"AND", "name": ..., "children": [...]} 或 {"type": "BASIC", "name": ...}；
+表决门写作 VOTE(k, 子表达式1, 子表达式2, ...)，解析为 {"type": "VOTE", "k": k, "children": [...]}。
+非门写作 not A，异或门写作 A xor B（奇数个输入发生时输出发生），禁止门写作 INHIBIT(输入, 条件)。
+运算符优先级从高到低为 not、and、xor、or。
+
+GUI、API 与批处理共用同一个记号化器和以显式栈实现的运算符优先级分析器，耗时与输入长度成正比，
+嵌套深度只受内存限制。多行定义整体只扫描一遍，得到 {事件名: 门结构} 符号表：定义可以引用后面才出现的事件，
+定义之间的循环引用抛出 CyclicDefinitionError。
+parse_event_definitions 为每个解析出的节点写入结构 id（见 assign_node_ids），GUI 的缓存与图形节点均以此为键。
+"""
+import re
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fta_progress import NULL_PROGRESS
+
+
+class CyclicDefinitionError(ValueError):
+    """事件定义之间存在循环引用，cycle 为环上的事件名（首尾相同）"""
+
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__(f"事件定义中存在循环依赖: {' -> '.join(cycle)}")
+
+
+def vote_gate(k: int, children: List[Dict[str, Any]], name: Optional[str] = None) -> Dict[str, Any]:
+    """构造 k/n 表决门，k 必须在 1 到子节点数之间"""
+    if not 1 <= k <= len(children):
+        raise ValueError(f"表决门 VOTE({k}, ...) 的 k 必须在 1 到子节点数 {len(children)} 之间")
+    gate = {"type": "VOTE", "k": k, "children": children}
+    if name is not None:
+        gate["name"] = name
+    return gate
+
+
+def inhibit_gate(children: List[Dict[str, Any]], name: Optional[str] = None) -> Dict[str, Any]:
+    """构造禁止门（条件与门），children 为 [输入, 条件]"""
+    if len(children) != 2:
+        raise ValueError(f"禁止门 INHIBIT 需要 2 个参数（输入, 条件），实际为 {len(children)} 个")
+    gate = {"type": "INHIBIT", "children": children}
+    if name is not None:
+        gate["name"] = name
+    return gate
+
+
+# 事件名由字母、数字（含中文等 Unicode 字符）、下划线、连字符与点组成，纯数字（isdecimal）为表决门的 k；
+# 其他无法识别的字符各自成为一个单字符记号。findall 直接得到记号字符串，不为每个记号生成元组
+_TOKEN = re.compile(r"\s*([(),=]|\w[\w.\-]*|\S)")
+# 多行定义中换行也是记号，标志一条定义结束
+_LINE_TOKEN = re.compile(r"[^\S\n]*([(),=\n]|\w[\w.\-]*|\S)")
+# 记号列表末尾追加的结束标记，与换行同样结束一个表达式，分析器因此无需逐个检查下标越界
+_END = "\n"
+_BINARY = {"and": ("AND", 3), "xor": ("XOR", 2), "or": ("OR", 1)}
+_NOT_PRECEDENCE = 4
+# 标点与关键字；不在其中的记号首字符为字母数字或下划线（str.isalnum() 与正则的 \w 一致）时是事件名或数字，
+# 否则是无法识别的字符
+_SPECIAL = frozenset(("(", ")", ",", "=", _END, "not", *_BINARY))
+_FUNCTIONS = ("VOTE", "INHIBIT")
+_child_id = itemgetter("id")
+
+
+class _TokenError(Exception):
+    """第 index 个记号处的语法错误，由调用方换算为行列位置"""
+
+    def __init__(self, index: int, message: str):
+        super().__init__(message)
+        self.index = index
+        self.message = message
+
+
+def _tokenize(expr: str, pattern) -> List[str]:
+    tokens = pattern.findall(expr)
+    tokens.append(_END)
+    return tokens
+
+
+def _basic_node(name: str, ids: Optional[Dict[tuple, int]],
+                basics: Optional[Dict[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """名为 name 的底事件节点；给出 basics 时同名底事件共用一个节点"""
+    node = basics.get(name) if basics is not None else None
+    if node is None:
+        node = {"type": "BASIC", "name": name}
+        if ids is not None:
+            node["id"] = ids.setdefault(name, len(ids))
+        if basics is not None:
+            basics[name] = node
+    return node
+
+
+def _location(expr: str, at: int) -> str:
+    """出错位置；多行文本给出行号与列号"""
+    if "\n" not in expr:
+        return f"第 {at + 1} 个字符"
+    line = expr.count("\n", 0, at) + 1
+    column = at - expr.rfind("\n", 0, at)
+    return f"第 {line} 行第 {column} 个字符"
+
+
+def _token_offset(expr: str, pattern, index: int) -> int:
+    """第 index 个记号在 expr 中的字符位置；只在出错时重新扫描一遍，正常解析不记录位置"""
+    for i, match in enumerate(pattern.finditer(expr)):
+        if i == index:
+            return match.start(1)
+    return len(expr)
+
+
+def _syntax_error(expr: str, pattern, error: _TokenError) -> ValueError:
+    at = _token_offset(expr, pattern, error.index)
+    return ValueError(f"逻辑表达式语法错误: {_location(expr, at)}处{error.message}")
+
+
+def _parse_tokens(tokens: List[str], position: int, ids: Optional[Dict[tuple, int]] = None,
+                  basics: Optional[Dict[str, Dict[str, Any]]] = None, gates: Optional[List[Dict[str, Any]]] = None,
+                  references: Optional[List[str]] = None) -> Tuple[Dict[str, Any], int]:
+    """
+    从 tokens[position] 开始解析一个表达式，遇到换行或结束标记时停止，返回 (门结构, 停止处下标)。
+
+    tokens 由 _tokenize 生成（以 _END 结尾）。同类运算连写时一次生成一个多输入门，门生成后不再修改，
+    因此子节点总是先于父节点生成。给出 ids（{结构: id} 表）时每个节点生成时即写入结构 id，
+    basics 缓存同名底事件节点；gates 按生成顺序收集门，references 按出现顺序收集底事件名。
+    """
+    # 快速路径：只由事件名与同一种二元运算组成的表达式（最常见的定义形式）直接生成一个门，不经过运算符栈
+    operator = tokens[position + 1] if tokens[position] != _END else None
+    if operator in _BINARY:
+        stop = position
+        while True:
+            operand = tokens[stop]
+            if operand in _SPECIAL or not (operand[0].isalnum() or operand[0] == "_"):
+                break
+            following = tokens[stop + 1]
+            if following == operator:
+                stop += 2
+                continue
+            if following == _END:
+                names = tokens[position:stop + 1:2]
+                children = [_basic_node(name, ids, basics) for name in names]
+                gate_type = _BINARY[operator][0]
+                gate = {"type": gate_type, "children": children}
+                if ids is not None:
+                    gate["id"] = ids.setdefault((gate_type, 0, *map(_child_id, children)), len(ids))
+                if gates is not None:
+                    gates.append(gate)
+                if references is not None:
+                    references.extend(names)
+                return gate, stop + 1
+            break
+
+    values: List[Dict[str, Any]] = []
+    # 运算符栈元素：(门类型, 优先级, 操作数在 values 中的起点, k)；"(" 与 VOTE/INHIBIT 调用的优先级为 0
+    operators: List[tuple] = []
+    expect_operand = True
+
+    def reduce() -> None:
+        gate_type, _, start, k = operators.pop()
+        children = values[start:]
+        del values[start:]
+        if gate_type == "VOTE":
+            gate = vote_gate(k, children)
+        elif gate_type == "INHIBIT":
+            gate = inhibit_gate(children)
+        else:
+            gate = {"type": gate_type, "children": children}
+        if ids is not None:
+            key = (gate_type, k, *map(_child_id, children))
+            gate["id"] = ids.setdefault(key, len(ids))
+        if gates is not None:
+            gates.append(gate)
+        values.append(gate)
+
+    try:
+        while True:
+            token = tokens[position]
+            if token == _END:
+                break
+            if expect_operand:
+                if token in _SPECIAL:
+                    if token == "not":
+                        operators.append(("NOT", _NOT_PRECEDENCE, len(values), 0))
+                    elif token == "(":
+                        operators.append(("(", 0, 0, 0))
+                    else:
+                        raise _TokenError(position, f"应为事件名或子表达式，实际为 '{token}'")
+                elif tokens[position + 1] == "(" and token.upper() in _FUNCTIONS:
+                    function, k = token.upper(), 0
+                    if function == "VOTE":
+                        if (position + 3 >= len(tokens) or not tokens[position + 2].isdecimal()
+                                or tokens[position + 3] != ","):
+                            raise _TokenError(position, "表决门格式应为 VOTE(k, 事件1, 事件2, ...)")
+                        k = int(tokens[position + 2])
+                        position += 2
+                    position += 1
+                    operators.append((function, 0, len(values), k))
+                elif token[0].isalnum() or token[0] == "_":
+                    values.append(_basic_node(token, ids, basics))
+                    if references is not None:
+                        references.append(token)
+                    expect_operand = False
+                else:
+                    raise _TokenError(position, f"应为事件名或子表达式，实际为 '{token}'")
+            elif token in _BINARY:
+                gate_type, precedence = _BINARY[token]
+                while operators and operators[-1][1] > precedence:
+                    reduce()
+                # 各二元运算的优先级互不相同，优先级相等即为同类运算，并入同一个门
+                if not operators or operators[-1][1] != precedence:
+                    operators.append((gate_type, precedence, len(values) - 1, 0))
+                expect_operand = True
+            elif token == ")" or token == ",":
+                while operators and operators[-1][1] > 0:
+                    reduce()
+                if not operators or (token == "," and operators[-1][0] == "("):
+                    raise _TokenError(position, f"'{token}' 没有匹配的左括号或函数调用")
+                if token == ",":
+                    expect_operand = True
+                elif operators[-1][0] == "(":
+                    operators.pop()
+                else:
+                    reduce()
+            else:
+                raise _TokenError(position, f"应为运算符，实际为 '{token}'")
+            position += 1
+
+        if expect_operand:
+            raise _TokenError(position, "表达式不完整")
+        while operators and operators[-1][1] > 0:
+            reduce()
+        if operators:
+            raise _TokenError(position, "括号不匹配")
+    except ValueError as e:
+        # 表决门的 k 越界、禁止门参数个数不对等
+        raise _TokenError(position, str(e))
+    return values[0], position
+
+
+def parse_logic_expression(expr: str) -> Dict[str, Any]:
+    """
+    以显式栈的运算符优先级分析解析表达式，不使用 Python 递归，嵌套深度不受递归深度限制。
+
+    运算符 and/or/xor/not 为小写关键字，VOTE 与 INHIBIT 不区分大小写；同类运算连写时合并为一个门。
+    """
+    try:
+        gate, _ = _parse_tokens(_tokenize(expr, _TOKEN), 0)
+    except _TokenError as e:
+        raise _syntax_error(expr, _TOKEN, e)
+    return gate
+
+
+def robust_parse_logic_expression(expr_str: str) -> Dict[str, Any]:
+    try:
+        return parse_logic_expression(expr_str)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"解析表达式时发生未知错误: {e}")
+
+
+def parse_event_definitions(expr: str,
+                            parse: Optional[Callable[[str, str], Dict[str, Any]]] = None,
+                            progress=NULL_PROGRESS) -> Dict[str, Dict[str, Any]]:
+    """
+    解析多行事件定义（每行 "事件 = 表达式"），返回 {事件名: 门结构}。
+
+    缺省对整段文本只做一次记号化与一遍分析，匿名子门按 GUI 的约定命名（见 parse_expression），
+    同名底事件共用一个节点；给出 parse(表达式, 事件名) 时逐行用它解析等号右侧。
+    两种方式都记录每条定义引用的名称，最后线性检查一遍循环引用，存在时抛出 CyclicDefinitionError。
+    progress 为 fta_progress.ProgressToken，按已解析的行数报告进度并检查取消。
+    """
+    event_definitions: Dict[str, Dict[str, Any]] = {}
+    # references[事件] = 该定义引用的名称在 names 中的范围；各定义共用一个列表，不为每条定义保留一个列表
+    names: List[str] = []
+    references: Dict[str, Tuple[int, int]] = {}
+    ids: Dict[tuple, int] = {}
+    if parse is None:
+        _parse_definition_tokens(expr, event_definitions, names, references, ids, progress)
+    else:
+        lines = expr.splitlines()
+        progress.start("parse", len(lines))
+        for line in lines:
+            progress.step()
+            line = line.strip()
+            if not line:
+                continue
+
+            match = re.match(r'^\s*(\w+)\s*=\s*(.+)$', line)
+            if not match:
+                raise ValueError(f"无效的事件定义格式: '{line}'")
+
+            event_name = match.group(1)
+            gate = parse(match.group(2).strip(), event_name)
+            assign_node_ids(gate, ids)
+            event_definitions[event_name] = gate
+            start = len(names)
+            names.extend(_basic_names(gate))
+            references[event_name] = (start, len(names))
+    _check_cycles(names, references)
+    return event_definitions
+
+
+def _parse_definition_tokens(expr: str, event_definitions: Dict[str, Dict[str, Any]], names: List[str],
+                             references: Dict[str, Tuple[int, int]], ids: Dict[tuple, int],
+                             progress=NULL_PROGRESS) -> None:
+    """对整段文本记号化一次，逐条解析 "事件 = 表达式"，结果写入 event_definitions、names 与 references"""
+    progress.start("parse", expr.count("\n") + 1)
+    tokens = _tokenize(expr, _LINE_TOKEN)
+    basics: Dict[str, Dict[str, Any]] = {}
+    position, end = 0, len(tokens) - 1
+    lines = 0
+    try:
+        while position < end:
+            token = tokens[position]
+            if token == "\n":
+                position += 1
+                lines += 1
+                # 每 1024 行报告一次，逐行调用的开销在大文件上也不可忽略
+                if not lines & 1023:
+                    progress.step(1024)
+                continue
+            if not (token[0].isalnum() or token[0] == "_") or tokens[position + 1] != "=":
+                at = _token_offset(expr, _LINE_TOKEN, position)
+                line_end = expr.find("\n", at)
+                line = expr[expr.rfind("\n", 0, at) + 1:line_end if line_end >= 0 else len(expr)]
+                raise ValueError(f"无效的事件定义格式: '{line.strip()}'")
+            event_name = token
+            gates: List[Dict[str, Any]] = []
+            start = len(names)
+            gate, position = _parse_tokens(tokens, position + 2, ids, basics, gates, names)
+            if len(gates) == 1:
+                # 只有一个门时其子节点都是底事件，只需给根门命名
+                gate['name'] = event_name
+            elif gates:
+                _name_gates(gates, event_name)
+            event_definitions[event_name] = gate
+            references[event_name] = (start, len(names))
+    except _TokenError as e:
+        raise _syntax_error(expr, _LINE_TOKEN, e)
+
+
+def _basic_names(gate: Dict[str, Any]) -> List[str]:
+    names, stack = [], [gate]
+    while stack:
+        node = stack.pop()
+        if node['type'] == 'BASIC':
+            names.append(node['name'])
+        else:
+            stack.extend(node['children'])
+    return names
+
+
+def _check_cycles(names: List[str], references: Dict[str, Tuple[int, int]]) -> None:
+    """
+    以显式栈的深度优先搜索检查定义之间的引用，每条定义和每个引用只访问一次。
+
+    references[事件] = (start, stop) 为该定义引用的名称在 names 中的范围。
+    """
+    # 0: 未检查；1: 在当前路径上；2: 已检查；不是定义的名称（底事件）不在表中
+    state: Dict[str, int] = dict.fromkeys(references, 0)
+    for root in references:
+        if state[root]:
+            continue
+        state[root] = 1
+        # positions[i] 为 path[i] 下一个待检查的引用在 names 中的位置
+        path, positions = [root], [references[root][0]]
+        while path:
+            position, stop = positions[-1], references[path[-1]][1]
+            while position < stop:
+                name = names[position]
+                position += 1
+                seen = state.get(name)
+                if seen == 0:
+                    break
+                if seen == 1:
+                    raise CyclicDefinitionError(path[path.index(name):] + [name])
+            else:
+                state[path.pop()] = 2
+                positions.pop()
+                continue
+            positions[-1] = position
+            state[name] = 1
+            path.append(name)
+            positions.append(references[name][0])
+
+
+def assign_node_ids(gate: Dict[str, Any], ids: Optional[Dict[tuple, int]] = None) -> int:
+    """
+    为 gate 及其所有子节点写入结构 id（node['id']），返回 gate 的 id。
+
+    ids 是哈希一致化 (hash-consing) 表 {(类型, k, 子节点 id...): id}，底事件的键为其名称（不会与门的元组键冲突）；
+    新结构按出现顺序编号，因此结构相同的子树得到同一个 id，不同结构的 id 必然不同。
+    门的名称（如自动生成的 "X_OR"）不参与计算，结构不同的同名子表达式互不冲突。
+    引用其他定义的子节点按底事件处理，其 id 只取决于被引用的名称。同一次解析的各定义应共用一张表。
+    """
+    ids = {} if ids is None else ids
+    stack = [(gate, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if 'id' in node:
+            continue
+        children = node.get('children', [])
+        if children and not expanded:
+            stack.append((node, True))
+            stack.extend((child, False) for child in children if 'id' not in child)
+            continue
+        if node['type'] == 'BASIC':
+            key = node['name']
+        else:
+            key = (node['type'], node.get('k', 0), *[child['id'] for child in children])
+        node['id'] = ids.setdefault(key, len(ids))
+    return gate['id']
+
+
+def _name_gates(gates: List[Dict[str, Any]], event_name: str) -> None:
+    """
+    按 GUI 的约定命名一条定义中的门：根门取事件名，匿名子门取 "父门名_父门类型"。
+
+    gates 按生成顺序排列（子门在前、根门在最后），倒序遍历时父门总是先于子门命名。
+    """
+    gates[-1]['name'] = event_name
+    for gate in reversed(gates):
+        child_name = f"{gate['name']}_{gate['type']}"
+        for child in gate['children']:
+            if child['type'] != 'BASIC':
+                child['name'] = child_name
+
+
+def parse_expression(expr: str, event_name: str) -> Dict[str, Any]:
+    """解析单条定义的等号右侧，门按 GUI 的约定命名（与 parse_event_definitions 的缺省方式相同）"""
+    gates: List[Dict[str, Any]] = []
+    try:
+        gate, _ = _parse_tokens(_tokenize(expr, _TOKEN), 0, gates=gates)
+    except _TokenError as e:
+        raise _syntax_error(expr, _TOKEN, e)
+    if gates:
+        _name_gates(gates, event_name)
+    return gate
+
+
+def parse_strict_expression(expr: str, event_name: str) -> Dict[str, Any]:
+    """以 parse_logic_expression 解析等号右侧（支持任意嵌套括号），供 parse_event_definitions 使用"""
+    gate = robust_parse_logic_expression(expr)
+    if gate['type'] != 'BASIC':
+        gate['name'] = event_name
+    return gate
@@ -0,0 +1,157 @@
+# fta_progress.py
+"""
+协作式取消与分析进度
+
+ProgressToken 贯穿一次分析的各阶段（解析、编译、概率、割集、化简、布局）：引擎在循环中
+调用 step() 报告已处理的节点数与生成的候选割集数，同时检查是否已请求取消，已取消时抛出
+AnalysisCancelled。回调按时间间隔节流，参数为 snapshot() 给出的字典，可在任意线程中调用
+cancel()。不需要进度与取消时使用 NULL_PROGRESS，所有方法均为空操作。
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# 阶段名 -> (说明, 工作量单位)
+PHASES = {
+    "parse": ("解析逻辑表达式", "行"),
+    "compile": ("编译故障树", "个节点"),
+    "probability": ("计算概率", "个节点"),
+    "cut_sets": ("生成割集", "个节点"),
+    "minimize": ("化简割集", "个候选"),
+    "bdd": ("构造 BDD", "个节点"),
+    "importance": ("计算重要度", "个割集"),
+    "graph": ("生成图形", "个节点"),
+    "render": ("布局图形", "轮"),
+}
+
+
+class AnalysisCancelled(Exception):
+    """分析已被取消"""
+
+
+class ProgressToken:
+    """一次分析的取消标志与当前阶段进度"""
+
+    enabled = True
+
+    def __init__(self, callback: Optional[Callable[[Dict[str, Any]], None]] = None, interval: float = 0.1):
+        self.callback = callback
+        self.interval = interval
+        self._cancel = threading.Event()
+        self.phase: Optional[str] = None
+        self.done = 0
+        self.total: Optional[int] = None
+        self.candidates = 0
+        self._start = self._phase_start = time.monotonic()
+        self._last_report = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def child(self) -> "ProgressToken":
+        """共享取消标志、但不报告进度的令牌，供并行的后台任务（如图形布局）使用"""
+        token = ProgressToken()
+        token._cancel = self._cancel
+        return token
+
+    def start(self, phase: str, total: Optional[int] = None) -> None:
+        """进入新阶段；total 为该阶段的工作量（节点数等），未知时为 None"""
+        if self._cancel.is_set():
+            raise AnalysisCancelled()
+        self.phase = phase
+        self.done = 0
+        self.total = total
+        self.candidates = 0
+        self._phase_start = time.monotonic()
+        self._report(self._phase_start)
+
+    def step(self, count: int = 1, candidates: int = 0) -> None:
+        """完成 count 个工作单位并生成 candidates 个候选割集；已取消时抛出 AnalysisCancelled"""
+        self.done += count
+        self.candidates += candidates
+        if self._cancel.is_set():
+            raise AnalysisCancelled()
+        if self.callback is not None:
+            now = time.monotonic()
+            if now - self._last_report >= self.interval:
+                self._report(now)
+
+    def poll(self, *_) -> None:
+        """只检查取消并按间隔报告，不计入工作量（可直接用作 fta_bitset.minimize 的 check 回调）"""
+        self.step(0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        elapsed = now - self._phase_start
+        fraction = remaining = None
+        if self.total:
+            fraction = min(1.0, self.done / self.total)
+            if self.done:
+                remaining = elapsed * (self.total - self.done) / self.done
+        label, unit = PHASES.get(self.phase, (self.phase, ""))
+        return {
+            "phase": self.phase,
+            "label": label,
+            "unit": unit,
+            "done": self.done,
+            "total": self.total,
+            "candidates": self.candidates,
+            "fraction": fraction,
+            "elapsed_s": round(elapsed, 3),
+            "remaining_s": None if remaining is None else round(max(remaining, 0.0), 3),
+            "total_elapsed_s": round(now - self._start, 3),
+            "cancelled": self._cancel.is_set(),
+        }
+
+    def _report(self, now: float) -> None:
+        self._last_report = now
+        if self.callback is not None:
+            self.callback(self.snapshot())
+
+
+class _NullProgress:
+    """关闭进度与取消时使用，开销仅为一次方法调用"""
+
+    enabled = False
+    cancelled = False
+
+    def cancel(self) -> None:
+        pass
+
+    def child(self) -> "_NullProgress":
+        return self
+
+    def start(self, phase: str, total: Optional[int] = None) -> None:
+        pass
+
+    def step(self, count: int = 1, candidates: int = 0) -> None:
+        pass
+
+    def poll(self, *_) -> None:
+        pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {}
+
+
+NULL_PROGRESS = _NullProgress()
+
+
+def describe(snapshot: Dict[str, Any]) -> str:
+    """进度快照 -> 一行中文说明，如 "生成割集: 1200/5000 个节点，候选割集 35000 个，预计剩余 3 秒\""""
+    if not snapshot.get("phase"):
+        return "正在分析故障树，请稍候..."
+    text = snapshot["label"]
+    if snapshot["total"]:
+        text += f": {snapshot['done']}/{snapshot['total']} {snapshot['unit']}"
+    elif snapshot["done"]:
+        text += f": 已处理 {snapshot['done']} {snapshot['unit']}"
+    if snapshot["candidates"]:
+        text += f"，候选割集 {snapshot['candidates']} 个"
+    if snapshot["remaining_s"] is not None and snapshot["elapsed_s"] >= 1.0:
+        text += f"，预计剩余 {snapshot['remaining_s']:.0f} 秒"
+    return text
@@ -0,0 +1,105 @@
+# fta_reliability.py
+"""
+时变不可用度
+
+底事件可以用可靠性模型代替固定概率：
+
+- constant：固定概率 q；
+- exponential：不可修部件，q(t) = 1 - exp(-λt)；
+- repairable：可修部件，q(t) = λ/(λ+μ) · (1 - exp(-(λ+μ)t))；
+- periodic：定期试验部件，首次试验在 θ（缺省为 τ），之后每隔 τ 试验一次并恢复为新，
+  q(t) = 1 - exp(-λ·s)，s 为距上次试验的时间。
+
+unavailability_matrix 按模型类型分组，用广播一次算出 (T × E) 的不可用度矩阵；
+矩阵的各列作为底事件概率送入编译后的故障树，门公式与 fta_engine.gate_probability
+（即 fta_api.calculate_probability）相同，numpy 数组逐元素参与运算，一次遍历得到整条曲线。
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from fta_engine import CompiledTree, evaluate_arrays
+
+CONSTANT = 'constant'
+EXPONENTIAL = 'exponential'
+REPAIRABLE = 'repairable'
+PERIODIC = 'periodic'
+MODEL_KINDS = (CONSTANT, EXPONENTIAL, REPAIRABLE, PERIODIC)
+
+
+def validate_model(name: str, model: Dict[str, Any]) -> None:
+    kind = model.get('kind')
+    if kind not in MODEL_KINDS:
+        raise ValueError(f"底事件 '{name}' 的可靠性模型 '{kind}' 无效，应为 {', '.join(MODEL_KINDS)} 之一")
+    required = {CONSTANT: ('probability',), EXPONENTIAL: ('failure_rate',),
+                REPAIRABLE: ('failure_rate', 'repair_rate'), PERIODIC: ('failure_rate', 'test_interval')}[kind]
+    for field in required:
+        value = model.get(field)
+        if value is None or value < 0:
+            raise ValueError(f"底事件 '{name}' 的 {kind} 模型需要非负的 {field}")
+    if kind == CONSTANT and model['probability'] > 1:
+        raise ValueError(f"底事件 '{name}' 的概率必须在 0 到 1 之间")
+    if kind == PERIODIC and model['test_interval'] <= 0:
+        raise ValueError(f"底事件 '{name}' 的试验间隔 test_interval 必须大于 0")
+
+
+def time_grid(times: Optional[Sequence[float]] = None, mission_time: Optional[float] = None,
+              points: int = 101) -> np.ndarray:
+    """显式给出的时间点，或 [0, mission_time] 上等间距的 points 个点"""
+    if times:
+        grid = np.asarray(times, dtype=float)
+        if np.any(grid < 0) or np.any(np.diff(grid) < 0):
+            raise ValueError("时间点必须非负且按升序排列")
+        return grid
+    if mission_time is None or mission_time <= 0:
+        raise ValueError("请给出 times 或大于 0 的 mission_time")
+    if points < 2:
+        raise ValueError("points 至少为 2")
+    return np.linspace(0.0, mission_time, points)
+
+
+def unavailability_matrix(models: List[Dict[str, Any]], times: np.ndarray) -> np.ndarray:
+    """(T × E) 不可用度矩阵，第 j 列为第 j 个模型在各时间点的值"""
+    matrix = np.empty((len(times), len(models)))
+    t = times[:, None]
+    by_kind: Dict[str, List[int]] = {}
+    for j, model in enumerate(models):
+        by_kind.setdefault(model['kind'], []).append(j)
+
+    def column(field, columns, default=None):
+        return np.array([models[j].get(field) if models[j].get(field) is not None else default for j in columns],
+                        dtype=float)
+
+    for kind, columns in by_kind.items():
+        if kind == CONSTANT:
+            matrix[:, columns] = column('probability', columns)
+        elif kind == EXPONENTIAL:
+            matrix[:, columns] = -np.expm1(-column('failure_rate', columns) * t)
+        elif kind == REPAIRABLE:
+            lam, mu = column('failure_rate', columns), column('repair_rate', columns)
+            total = lam + mu
+            with np.errstate(invalid='ignore', divide='ignore'):
+                steady = np.where(total > 0, lam / total, 0.0)
+            matrix[:, columns] = steady * -np.expm1(-total * t)
+        else:
+            tau = column('test_interval', columns)
+            first = column('first_test', columns, default=np.nan)
+            first = np.where(np.isnan(first), tau, first)
+            since_test = np.where(t < first, t, np.mod(t - first, tau))
+            matrix[:, columns] = -np.expm1(-column('failure_rate', columns) * since_test)
+    return matrix
+
+
+def propagate(tree: CompiledTree, names: List[str], matrix: np.ndarray) -> np.ndarray:
+    """把 (T × E) 矩阵的各列作为底事件概率送入故障树，返回顶事件在各时间点的概率"""
+    events = {name: matrix[:, j] for j, name in enumerate(names)}
+    top = evaluate_arrays(tree, events)
+    return np.broadcast_to(top, (matrix.shape[0],)).astype(float)
+
+
+def mean_value(curve: np.ndarray, times: np.ndarray) -> float:
+    """按梯形法求时间平均值；只有一个时间点（或时长为 0）时返回该点的值"""
+    span = times[-1] - times[0]
+    if len(times) < 2 or span <= 0:
+        return float(curve[0])
+    return float(np.sum((curve[1:] + curve[:-1]) * np.diff(times)) / 2 / span)
@@ -0,0 +1,285 @@
+# fta_report.py
+"""
+故障树分析报告 (PDF) 生成
+
+不依赖 tkinter，可在后台线程中运行并通过回调报告进度。
+割集以多栏紧凑表格排版，可只保留概率最高的前 K 个；
+故障树图形过大时切分为多页瓦片，每页保持可读的比例。
+"""
+import datetime
+import functools
+import io
+import math
+import os
+
+from fpdf import FPDF
+from PIL import Image, ImageDraw, ImageFont
+
+FONT_CANDIDATES = [
+    "C:/Windows/Fonts/simsun.ttc",
+    "C:/Windows/Fonts/simhei.ttf",
+    "C:/Windows/Fonts/msyh.ttc",
+    "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+    "/System/Library/Fonts/STHeiti Light.ttc",
+]
+
+PAGE_WIDTH = 190.0       # A4 去掉左右页边距后的可用宽度 (mm)
+PAGE_HEIGHT = 265.0      # 图形页可用高度 (mm)
+ROW_HEIGHT = 5.0
+MIN_MM_PER_PX = 0.18     # 图像缩得比这更小时改为分页瓦片
+TILE_HEADING_HEIGHT = 8.0  # 瓦片页标题行高 (mm)
+TILE_WIDTH_PX = int(PAGE_WIDTH / MIN_MM_PER_PX)
+TILE_MM_PER_PX = PAGE_WIDTH / TILE_WIDTH_PX
+# 整块瓦片须与标题放进同一页，否则会被自动分页推到下一页，留下只有标题的空页
+TILE_HEIGHT_PX = int((PAGE_HEIGHT - TILE_HEADING_HEIGHT) / TILE_MM_PER_PX)
+MAX_GRAPH_PAGES = 40
+NODE_COLORS = {'TOP': (173, 216, 230), 'BASIC': (240, 128, 128)}
+GATE_COLOR = (255, 255, 224)
+
+
+class ReportCancelled(Exception):
+    pass
+
+
+@functools.lru_cache(maxsize=None)
+def find_report_font():
+    """查找可显示中文的字体文件，只在第一次调用时扫描磁盘"""
+    for path in FONT_CANDIDATES:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class _Progress:
+    """把阶段内的进度映射到整体进度，并限制回调频率"""
+
+    def __init__(self, callback, cancelled):
+        self.callback = callback
+        self.cancelled = cancelled
+        self.last = -1.0
+
+    def report(self, fraction, message):
+        if self.cancelled and self.cancelled():
+            raise ReportCancelled()
+        if self.callback and (fraction - self.last >= 0.01 or fraction >= 1.0):
+            self.last = fraction
+            self.callback(fraction, message)
+
+
+def build_report(file_path, results, graph_image=None, graph_view=None, top_k=None,
+                 progress=None, cancelled=None):
+    """
+    生成PDF报告。
+
+    results 为分析结果字典（top_event、probability、minimal_cut_sets、cut_set_probabilities、
+    structure_description）；一次分析多个顶事件时 tops 为各顶事件的同类字典，报告逐个列出。graph_image 为已渲染的 PNG 字节，缺省时根据 graph_view
+    （查看器使用的节点与边）直接绘制瓦片；top_k 限制列出的割集数量（按概率降序）。
+    progress(fraction, message) 报告进度，cancelled() 返回 True 时中止并抛出 ReportCancelled。
+    """
+    tracker = _Progress(progress, cancelled)
+    font_path = find_report_font()
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    if font_path:
+        pdf.add_font("CJK", "", font_path)
+        font_family = "CJK"
+    else:
+        font_family = "Helvetica"
+    pdf.add_page()
+    pdf.set_font(font_family, size=16)
+
+    pdf.cell(0, 10, "故障树分析报告", ln=True, align='C')
+    pdf.ln(10)
+
+    pdf.set_font_size(12)
+    pdf.cell(0, 10, f"生成日期: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True)
+    tops = results.get('tops') or [results]
+    pdf.cell(0, 10, f"顶事件: {', '.join(top['top_event'] for top in tops)}", ln=True)
+    pdf.ln(10)
+
+    pdf.set_font_size(14)
+    pdf.cell(0, 10, "分析结果", ln=True)
+    pdf.set_font_size(12)
+    if len(tops) == 1:
+        pdf.cell(0, 10, f"1. 顶事件发生概率: P({results['top_event']}) = {results['probability']:.12f}", ln=True)
+        _write_cut_sets(pdf, results, top_k, tracker)
+    else:
+        pdf.cell(0, 10, "1. 顶事件发生概率:", ln=True)
+        for top in tops:
+            pdf.cell(20)
+            pdf.cell(0, 10, f"P({top['top_event']}) = {top['probability']:.12f}", ln=True)
+        # 割集排版占整体进度的前 60%，按顶事件平分
+        for i, top in enumerate(tops):
+            _write_cut_sets(pdf, {**top, 'coherent': results.get('coherent', True)}, top_k, tracker,
+                            f"2.{i + 1} {top['top_event']} 的", (0.6 * i / len(tops), 0.6 / len(tops)))
+
+    pdf.ln(5)
+    pdf.set_font_size(12)
+    pdf.cell(0, 10, "3. 故障树结构说明:", ln=True)
+    for top in tops:
+        structure = top['structure_description']
+        for line in (f"顶事件: {top['top_event']}", f"门类型: {structure['gate_type']}",
+                     f"子节点数: {structure['children_count']}"):
+            pdf.cell(20)
+            pdf.cell(0, 10, line, ln=True)
+    pdf.cell(20)
+    pdf.cell(0, 10, f"最大深度: {results['structure_description']['max_depth']}", ln=True)
+    _write_graph(pdf, graph_image, graph_view, font_path, tracker)
+
+    tracker.report(0.99, "正在写入文件...")
+    pdf.output(file_path)
+    tracker.report(1.0, "完成")
+
+
+def _write_cut_sets(pdf, results, top_k, tracker, heading="2. ", span=(0.0, 0.6)):
+    """割集按概率降序排版为多栏表格；heading 为标题前缀，span 为 (起点, 跨度)，即本节在整体进度中的范围"""
+    cut_sets = results['minimal_cut_sets']
+    probabilities = results.get('cut_set_probabilities') or [0.0] * len(cut_sets)
+    order = sorted(range(len(cut_sets)), key=lambda i: probabilities[i], reverse=True)
+    if top_k:
+        order = order[:top_k]
+
+    kind = "最小割集" if results.get('coherent', True) else "质蕴涵"
+    pdf.set_font_size(12)
+    title = f"{heading}{kind} (共 {len(cut_sets)} 个"
+    title += f"，列出概率最高的 {len(order)} 个)" if len(order) < len(cut_sets) else ")"
+    pdf.cell(0, 10, title, ln=True)
+    if not order:
+        pdf.cell(20)
+        pdf.cell(0, 10, f"未找到{kind}", ln=True)
+        return
+
+    pdf.set_font_size(8)
+    texts = [' and '.join(cut_sets[i]) for i in order]
+    index_width, prob_width = 14.0, 20.0
+    longest = max(pdf.get_string_width(text) for text in texts) + 2
+    columns = 3 if longest <= PAGE_WIDTH / 3 - index_width - prob_width else \
+        2 if longest <= PAGE_WIDTH / 2 - index_width - prob_width else 1
+    column_width = PAGE_WIDTH / columns
+    text_width = column_width - index_width - prob_width
+
+    rows = math.ceil(len(order) / columns)
+    for row in range(rows):
+        if row % 200 == 0:
+            tracker.report(span[0] + span[1] * row / rows, f"正在排版割集 {row * columns}/{len(order)}")
+        if columns == 1:
+            pdf.cell(index_width, ROW_HEIGHT, f"{row + 1}.")
+            pdf.cell(prob_width, ROW_HEIGHT, f"{probabilities[order[row]]:.3e}")
+            pdf.multi_cell(text_width, ROW_HEIGHT, texts[row], new_x="LMARGIN", new_y="NEXT")
+            continue
+        for column in range(columns):
+            position = row * columns + column
+            if position >= len(order):
+                break
+            pdf.cell(index_width, ROW_HEIGHT, f"{position + 1}.")
+            pdf.cell(prob_width, ROW_HEIGHT, f"{probabilities[order[position]]:.3e}")
+            pdf.cell(text_width, ROW_HEIGHT, texts[position])
+        pdf.ln(ROW_HEIGHT)
+
+
+def _write_graph(pdf, graph_image, graph_view, font_path, tracker):
+    """图形能以可读比例放进一页时整页插入，否则切分为多页瓦片"""
+    if graph_image:
+        image = Image.open(io.BytesIO(graph_image))
+        if image.width * MIN_MM_PER_PX <= PAGE_WIDTH and image.height * MIN_MM_PER_PX <= PAGE_HEIGHT - 20:
+            pdf.add_page()
+            pdf.set_font_size(14)
+            pdf.cell(0, 10, "故障树图形", ln=True)
+            pdf.image(image, x=10, w=min(PAGE_WIDTH - 10, (PAGE_HEIGHT - 20) * image.width / image.height))
+            return
+        tiles = _image_tiles(image)
+    elif graph_view and graph_view[0]:
+        tiles = _drawn_tiles(graph_view[0], graph_view[1], font_path)
+    else:
+        return
+
+    for done, total, (row, column), tile in tiles:
+        tracker.report(0.6 + 0.38 * done / total, f"正在生成图形分页 {done + 1}/{total}")
+        pdf.add_page()
+        pdf.set_font_size(10)
+        pdf.cell(0, TILE_HEADING_HEIGHT, f"故障树图形 (第 {row + 1} 行, 第 {column + 1} 列)", ln=True)
+        pdf.image(tile, x=10, w=tile.width * TILE_MM_PER_PX, h=tile.height * TILE_MM_PER_PX)
+
+
+def _image_tiles(image):
+    """把已渲染的大图切成页面大小的瓦片"""
+    columns = math.ceil(image.width / TILE_WIDTH_PX)
+    rows = math.ceil(image.height / TILE_HEIGHT_PX)
+    for row in range(rows):
+        for column in range(columns):
+            box = (column * TILE_WIDTH_PX, row * TILE_HEIGHT_PX,
+                   min((column + 1) * TILE_WIDTH_PX, image.width), min((row + 1) * TILE_HEIGHT_PX, image.height))
+            yield row * columns + column, rows * columns, (row, column), image.crop(box)
+
+
+def _drawn_tiles(nodes, edges, font_path):
+    """
+    没有整图时直接按节点坐标逐页绘制瓦片，同一时间只在内存中保留一页图像。
+    超过 MAX_GRAPH_PAGES 页时整体缩小，字号过小时省略文字。
+    """
+    x0 = min(node['x'] - node['w'] / 2 for node in nodes)
+    y0 = min(node['y'] - node['h'] / 2 for node in nodes)
+    width = max(node['x'] + node['w'] / 2 for node in nodes) - x0
+    height = max(node['y'] + node['h'] / 2 for node in nodes) - y0
+
+    scale = 1.5
+    while math.ceil(width * scale / TILE_WIDTH_PX) * math.ceil(height * scale / TILE_HEIGHT_PX) > MAX_GRAPH_PAGES:
+        scale *= 0.8
+    columns = math.ceil(width * scale / TILE_WIDTH_PX)
+    rows = math.ceil(height * scale / TILE_HEIGHT_PX)
+
+    font_size = int(9 * scale)
+    font = None
+    if font_size >= 6:
+        font = ImageFont.truetype(font_path, font_size) if font_path else ImageFont.load_default()
+
+    def tiles_of(left, top, right, bottom):
+        for column in range(max(int((left - x0) * scale // TILE_WIDTH_PX), 0),
+                            min(int((right - x0) * scale // TILE_WIDTH_PX), columns - 1) + 1):
+            for row in range(max(int((top - y0) * scale // TILE_HEIGHT_PX), 0),
+                             min(int((bottom - y0) * scale // TILE_HEIGHT_PX), rows - 1) + 1):
+                yield row, column
+
+    node_tiles, edge_tiles = {}, {}
+    for i, node in enumerate(nodes):
+        for tile in tiles_of(node['x'] - node['w'] / 2, node['y'] - node['h'] / 2,
+                             node['x'] + node['w'] / 2, node['y'] + node['h'] / 2):
+            node_tiles.setdefault(tile, []).append(i)
+    for i, (parent, child) in enumerate(edges):
+        a, b = nodes[parent], nodes[child]
+        for tile in tiles_of(min(a['x'], b['x']), min(a['y'], b['y']), max(a['x'], b['x']), max(a['y'], b['y'])):
+            edge_tiles.setdefault(tile, []).append(i)
+
+    for row in range(rows):
+        for column in range(columns):
+            if (row, column) not in node_tiles and (row, column) not in edge_tiles:
+                continue
+            origin_x = x0 + column * TILE_WIDTH_PX / scale
+            origin_y = y0 + row * TILE_HEIGHT_PX / scale
+
+            def to_px(x, y):
+                return (x - origin_x) * scale, (y - origin_y) * scale
+
+            tile = Image.new('RGB', (TILE_WIDTH_PX, TILE_HEIGHT_PX), 'white')
+            draw = ImageDraw.Draw(tile)
+            for i in edge_tiles.get((row, column), ()):
+                a, b = nodes[edges[i][0]], nodes[edges[i][1]]
+                draw.line([to_px(a['x'], a['y'] + a['h'] / 2), to_px(b['x'], b['y'] - b['h'] / 2)],
+                          fill=(90, 90, 90))
+            for i in node_tiles.get((row, column), ()):
+                node = nodes[i]
+                box = [to_px(node['x'] - node['w'] / 2, node['y'] - node['h'] / 2),
+                       to_px(node['x'] + node['w'] / 2, node['y'] + node['h'] / 2)]
+                fill = NODE_COLORS.get(node['type'], GATE_COLOR)
+                if node['type'] in NODE_COLORS:
+                    draw.rectangle(box, fill=fill, outline='black')
+                else:
+                    draw.ellipse(box, fill=fill, outline='black')
+                if font:
+                    draw.multiline_text(to_px(node['x'], node['y']), node['label'], fill='black',
+                                        font=font, anchor='mm', align='center')
+            yield row * columns + column, rows * columns, (row, column), tile
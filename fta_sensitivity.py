@@ -0,0 +1,130 @@
+# fta_sensitivity.py
+"""
+单因素敏感性扫描与龙卷风图数据
+
+每次只改变一个底事件的概率，计算顶事件概率随之的变化。两种批量算法：
+
+- bdd：顶事件的精确概率对单个底事件概率是线性的，P(p_i = x) = P + (x - p_i)·∂P/∂p_i，
+  在 BDD 上一次正向、一次反向遍历得到全部偏导数后，任意扰动只需一次乘加；
+- vectorized：按独立性公式（与 calculate_probability 相同）计算，把一批扰动排成数组，
+  只有被扰动的事件取数组、其余事件保持常数，经 evaluate_arrays 一次遍历得到整批结果。
+
+auto 优先使用 bdd，BDD 节点数超过 BDD_NODE_LIMIT 时退回 vectorized。
+"""
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from fta_bdd import BDDTooLarge, build_bdd
+from fta_engine import CompiledTree, evaluate_arrays
+
+BDD_NODE_LIMIT = 2_000_000
+VECTOR_BLOCK = 200_000  # vectorized 每批扰动数
+VECTOR_ELEMENTS = 4_000_000  # vectorized 每批扰动列的元素总数（批内事件数 × 批内扰动数）
+
+
+def sweep_levels(events: Dict[str, float], factors: List[float], ranges: Dict[str, List[float]],
+                 selected: List[str]) -> Dict[str, List[float]]:
+    """每个事件的扰动取值：ranges 中的绝对值优先，否则为基准概率乘以各因子（截断到 [0, 1]）"""
+    levels = {}
+    for name in selected:
+        if name in ranges:
+            values = ranges[name]
+        else:
+            values = [min(max(events[name] * factor, 0.0), 1.0) for factor in factors]
+        if any(not 0 <= value <= 1 for value in values):
+            raise ValueError(f"底事件 '{name}' 的扰动取值必须在 0 到 1 之间")
+        if values:
+            levels[name] = list(values)
+    return levels
+
+
+def sweep_bdd(tree: CompiledTree, events: Dict[str, float],
+              levels: Dict[str, List[float]]) -> Tuple[float, Dict[str, List[float]], Dict[str, float]]:
+    """返回 (基准顶事件概率, {事件: 各扰动下的顶事件概率}, Birnbaum 重要度)"""
+    bdd, root = build_bdd(tree, max_nodes=BDD_NODE_LIMIT)
+    base, grad = bdd.gradient(root, [events.get(name, 0.0) for name in bdd.variables])
+    birnbaum = dict(zip(bdd.variables, grad))
+    results = {}
+    for name, values in levels.items():
+        slope = birnbaum.get(name, 0.0)  # 不在树中的事件不影响顶事件
+        results[name] = [base + (value - events[name]) * slope for value in values]
+    return base, results, birnbaum
+
+
+def sweep_vectorized(tree: CompiledTree, events: Dict[str, float],
+                     levels: Dict[str, List[float]]) -> Tuple[float, Dict[str, List[float]]]:
+    """
+    按独立性公式批量计算，每批最多 VECTOR_BLOCK 个扰动。
+
+    批内每个事件都占一整列（长度为批内扰动总数），列的元素总数限制在 VECTOR_ELEMENTS 以内，
+    事件很多时改为多个较小的批，内存不随事件数 × 扰动数增长。
+    """
+    base = float(evaluate_arrays(tree, events))
+    results: Dict[str, List[float]] = {}
+    batch: List[Tuple[str, List[float]]] = []
+    size = 0
+
+    def flush():
+        columns: Dict[str, Any] = dict(events)
+        total = sum(len(values) for _, values in batch)
+        start = 0
+        for name, values in batch:
+            column = np.full(total, events[name])
+            column[start:start + len(values)] = values
+            columns[name] = column
+            start += len(values)
+        top = np.broadcast_to(np.asarray(evaluate_arrays(tree, columns), dtype=float), (total,))
+        start = 0
+        for name, values in batch:
+            results[name] = top[start:start + len(values)].tolist()
+            start += len(values)
+
+    for name, values in levels.items():
+        total = size + len(values)
+        if batch and (total > VECTOR_BLOCK or (len(batch) + 1) * total > VECTOR_ELEMENTS):
+            flush()
+            batch, size = [], 0
+        batch.append((name, values))
+        size += len(values)
+    if batch:
+        flush()
+    return base, results
+
+
+def run_sweep(tree: CompiledTree, events: Dict[str, float], levels: Dict[str, List[float]],
+              method: str = 'auto') -> Dict[str, Any]:
+    if method not in ('auto', 'bdd', 'vectorized'):
+        raise ValueError(f"未知的敏感性算法 '{method}'，应为 auto、bdd 或 vectorized")
+    if method != 'vectorized':
+        try:
+            base, results, birnbaum = sweep_bdd(tree, events, levels)
+            return {"method": "bdd", "base": base, "results": results, "birnbaum": birnbaum}
+        except BDDTooLarge:
+            if method == 'bdd':
+                raise ValueError(f"BDD 节点数超过 {BDD_NODE_LIMIT}，请改用 vectorized")
+    base, results = sweep_vectorized(tree, events, levels)
+    return {"method": "vectorized", "base": base, "results": results, "birnbaum": None}
+
+
+def tornado(events: Dict[str, float], levels: Dict[str, List[float]], sweep: Dict[str, Any],
+            top_n: int = 0) -> List[Dict[str, Any]]:
+    """龙卷风图数据：每个事件的最低 / 最高顶事件概率及摆幅，按摆幅降序"""
+    base = sweep["base"]
+    bars = []
+    for name, tops in sweep["results"].items():
+        low, high = int(np.argmin(tops)), int(np.argmax(tops))
+        bars.append({
+            "event": name,
+            "baseline_probability": events[name],
+            "low_input": levels[name][low],
+            "high_input": levels[name][high],
+            "low_top": tops[low],
+            "high_top": tops[high],
+            "low_delta": tops[low] - base,
+            "high_delta": tops[high] - base,
+            "swing": tops[high] - tops[low],
+            "points": [{"input": value, "top": top} for value, top in zip(levels[name], tops)],
+        })
+    bars.sort(key=lambda bar: bar["swing"], reverse=True)
+    return bars[:top_n] if top_n else bars
@@ -0,0 +1,351 @@
+# fta_spill.py
+"""
+内存受限的最小割集生成（溢出到磁盘）
+
+与 fta_engine.minimal_cut_sets 相同地按拓扑序处理 DAG，但每个节点的割集族 (Family)
+可以留在内存中，也可以写入临时目录中的溢出文件：每个割集是 words 个 little-endian uint64
+组成的定长位集，读取时用 numpy.memmap 按块惰性解码。
+
+与门、或门产生的候选流经 SpillingMinimizer：缓冲区达到预算时先在内存中化简，
+再按大小排序写成一个有序段 (run)；结束时按外排序的方式按大小归并各段，
+与已保留集合（内存中的签名索引 + 已写入结果文件的部分）比较去掉超集。
+内存只与预算有关，超大的中间结果以更多磁盘读写为代价完成，而不是耗尽内存。
+"""
+import heapq
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from fta_bitset import EventIndex, MinimalSetIndex, bit_frequency, minimize, pack_masks, unpack_masks
+from fta_engine import CompiledTree, BASIC, VOTE, INHIBIT
+from fta_progress import NULL_PROGRESS
+
+READ_CHUNK = 8192     # 惰性读取时每块的割集数
+CHECK_BLOCK = 2048    # 与已溢出的保留集合按块比较时，每块的保留集合数
+MIN_BUDGET_SETS = 1024
+
+
+class SpillArena:
+    """一次生成过程使用的临时目录、内存计数、溢出统计与进度令牌"""
+
+    def __init__(self, words: int, budget_bytes: int, directory: Optional[str] = None, progress=NULL_PROGRESS):
+        self.words = words
+        self.progress = progress
+        self.nbytes = 8 * words
+        # 每个内存中割集的开销：Python 整数本身 + 列表 / 字典 / 索引中的引用
+        per_set = sys.getsizeof(1 << max(8 * self.nbytes - 1, 1)) + 64
+        self.budget_sets = max(MIN_BUDGET_SETS, budget_bytes // per_set)
+        self.path = tempfile.mkdtemp(prefix="fta_spill_", dir=directory)
+        self.resident = 0
+        self._files = 0
+        self.stats = {"budget_sets": self.budget_sets, "runs": 0, "merges": 0, "files": 0,
+                      "spilled_sets": 0, "spilled_bytes": 0, "peak_resident_sets": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def new_file(self) -> str:
+        self._files += 1
+        return os.path.join(self.path, f"{self._files}.bits")
+
+    def track(self, delta: int) -> None:
+        self.resident += delta
+        if self.resident > self.stats["peak_resident_sets"]:
+            self.stats["peak_resident_sets"] = self.resident
+
+    def encode(self, masks: List[int]) -> np.ndarray:
+        return np.frombuffer(pack_masks(masks, self.words), dtype='<u8').reshape(-1, self.words)
+
+    def append(self, path: str, masks: List[int]) -> None:
+        if not masks:
+            return
+        if not os.path.exists(path):
+            self.stats["files"] += 1
+        with open(path, 'ab') as f:
+            self.encode(masks).tofile(f)
+        self.stats["spilled_sets"] += len(masks)
+        self.stats["spilled_bytes"] += len(masks) * self.nbytes
+
+    def read(self, path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[int]:
+        """按块惰性解码文件中 [start, stop) 行的位集"""
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        rows = np.memmap(path, dtype='<u8', mode='r').reshape(-1, self.words)
+        stop = len(rows) if stop is None else stop
+        for offset in range(start, stop, READ_CHUNK):
+            yield from unpack_masks(rows[offset:min(offset + READ_CHUNK, stop)], self.words)
+        del rows
+
+    def rows(self, path: str, stop: int) -> np.ndarray:
+        return np.memmap(path, dtype='<u8', mode='r', shape=(stop, self.words))
+
+
+class Family:
+    """一个节点的割集族：内存中的位集列表或溢出文件，可重复迭代"""
+
+    def __init__(self, arena: SpillArena, masks: Optional[List[int]] = None, path: Optional[str] = None,
+                 count: int = 0):
+        self.arena = arena
+        self.masks = masks
+        self.path = path
+        self.count = len(masks) if masks is not None else count
+        if masks is not None:
+            arena.track(len(masks))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[int]:
+        if self.masks is not None:
+            return iter(self.masks)
+        return self.arena.read(self.path)
+
+    @property
+    def resident(self) -> bool:
+        return self.masks is not None
+
+    def release(self) -> None:
+        if self.masks is not None:
+            self.arena.track(-len(self.masks))
+            self.masks = None
+        elif self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        self.count = 0
+
+
+class SpillingMinimizer:
+    """接收候选位集流，返回化简后的 Family；缓冲区满时化简并写出有序段"""
+
+    def __init__(self, arena: SpillArena):
+        self.arena = arena
+        self.limit = max(MIN_BUDGET_SETS // 2, arena.budget_sets // 2)
+        self.buffer: List[int] = []
+        self.runs: List[Tuple[str, int]] = []
+        self.frequency: Dict[int, int] = {}
+
+    def add(self, mask: int) -> None:
+        self.buffer.append(mask)
+        if len(self.buffer) >= self.limit:
+            self._flush()
+
+    def extend(self, masks: Iterable[int]) -> None:
+        for mask in masks:
+            self.add(mask)
+
+    def _flush(self) -> None:
+        progress = self.arena.progress
+        progress.step(0, len(self.buffer))
+        run = minimize(self.buffer, progress.poll)
+        self.buffer = []
+        for bit, count in bit_frequency(run).items():
+            self.frequency[bit] = self.frequency.get(bit, 0) + count
+        path = self.arena.new_file()
+        self.arena.append(path, run)
+        self.arena.stats["runs"] += 1
+        self.runs.append((path, len(run)))
+
+    def finish(self) -> Family:
+        arena = self.arena
+        if not self.runs:
+            self.arena.progress.step(0, len(self.buffer))
+            result = minimize(self.buffer, self.arena.progress.poll)
+            self.buffer = []
+            if arena.resident + len(result) <= arena.budget_sets:
+                return Family(arena, masks=result)
+            path = arena.new_file()
+            arena.append(path, result)
+            return Family(arena, path=path, count=len(result))
+        if self.buffer:
+            self._flush()
+        arena.stats["merges"] += 1
+        family = self._merge()
+        for path, _ in self.runs:
+            if os.path.exists(path):
+                os.remove(path)
+        self.runs = []
+        return family
+
+    def _merge(self) -> Family:
+        """按大小归并各有序段；保留集合超出预算时写入结果文件，之后的候选与其按块向量化比较"""
+        arena = self.arena
+        output = arena.new_file()
+        written = 0
+        index = MinimalSetIndex(self.frequency)
+        streams = [((mask.bit_count(), mask) for mask in arena.read(path)) for path, _ in self.runs]
+        batch: List[int] = []
+
+        def process(candidates):
+            nonlocal index, written
+            arena.progress.poll()
+            if written:
+                candidates = self._uncovered(candidates, output, written)
+            for mask in candidates:
+                if not index.covers(mask):
+                    index.add(mask)
+            if len(index) >= self.limit:
+                arena.append(output, index.masks)
+                written += len(index)
+                index = MinimalSetIndex(self.frequency)
+
+        previous = None
+        for _, mask in heapq.merge(*streams):
+            if mask == previous:
+                continue
+            previous = mask
+            batch.append(mask)
+            if len(batch) >= CHECK_BLOCK:
+                process(batch)
+                batch = []
+        if batch:
+            process(batch)
+        if not written and arena.resident + len(index) <= arena.budget_sets:
+            return Family(arena, masks=index.masks)
+        arena.append(output, index.masks)
+        return Family(arena, path=output, count=written + len(index))
+
+    def _uncovered(self, candidates: List[int], path: str, stop: int) -> List[int]:
+        """去掉被结果文件前 stop 行中某个集合包含的候选"""
+        arena = self.arena
+        encoded = arena.encode(candidates)
+        complement = ~encoded
+        covered = np.zeros(len(candidates), dtype=bool)
+        kept = arena.rows(path, stop)
+        for start in range(0, stop, CHECK_BLOCK):
+            block = np.asarray(kept[start:start + CHECK_BLOCK])
+            subset = np.ones((len(candidates), len(block)), dtype=bool)
+            for word in range(arena.words):
+                subset &= (block[None, :, word] & complement[:, None, word]) == 0
+            covered |= subset.any(axis=1)
+        del kept
+        return [mask for mask, hit in zip(candidates, covered) if not hit]
+
+
+class TopCutSets:
+    """一个顶事件的结果：len() 为割集数，迭代时从内存或溢出文件惰性解码为按名称排序的事件列表"""
+
+    def __init__(self, family: Family, index: EventIndex):
+        self.family = family
+        self.index = index
+
+    def __len__(self) -> int:
+        return len(self.family)
+
+    def __iter__(self) -> Iterator[List[str]]:
+        for mask in self.family:
+            yield self.index.decode(mask)
+
+
+class SpilledCutSets(TopCutSets):
+    """
+    生成结果，本身对应第一个顶事件 (tree.root)；tops[i] 为 tree.roots[i] 的结果。
+
+    各顶事件的割集族共用同一个临时目录，close() 时一并删除。
+    """
+
+    def __init__(self, arena: SpillArena, families: List[Family], index: EventIndex):
+        super().__init__(families[0], index)
+        self.arena = arena
+        self.tops = [TopCutSets(family, index) for family in families]
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self.arena.stats)
+
+    def close(self) -> None:
+        for top in self.tops:
+            top.family.release()
+        self.arena.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def bounded_minimal_cut_sets(tree: CompiledTree, memory_budget: int, directory: Optional[str] = None,
+                             substitutes: Optional[Dict[str, List[str]]] = None,
+                             progress=NULL_PROGRESS) -> SpilledCutSets:
+    """
+    内存预算为 memory_budget 字节的最小割集生成，结果与 fta_engine.minimal_cut_sets 相同。
+
+    返回的 SpilledCutSets 持有临时目录，使用完毕后应调用 close()（或用作上下文管理器）；
+    多个顶事件 (tree.roots) 的结果见其 tops，共用子树的割集族只生成一次。
+    directory 为溢出文件所在目录，缺省为系统临时目录。progress 在写出有序段、归并及节点之间
+    报告进度并检查取消；取消时临时目录随之删除。
+    """
+    substitutes = substitutes or {}
+    if not tree.coherent:
+        raise ValueError("故障树含非门或异或门（非相干），应计算质蕴涵而不是最小割集")
+    index = EventIndex()
+    for name in tree.basic_events():
+        for substitute in substitutes.get(name, (name,)):
+            index.bit(substitute)
+    arena = SpillArena(max(1, (len(index) + 63) // 64), memory_budget, directory, progress)
+    try:
+        progress.start("cut_sets", len(tree))
+        remaining = [len(parents) for parents in tree.parents()]
+        for root in tree.roots:
+            remaining[root] += 1
+        families: List[Optional[Family]] = [None] * len(tree.types)
+
+        def product(left: Family, right: Family) -> Family:
+            minimizer = SpillingMinimizer(arena)
+            for a in left:
+                for b in right:
+                    minimizer.add(a | b)
+            return minimizer.finish()
+
+        for idx, node_type in enumerate(tree.types):
+            kids = tree.children[idx]
+            if node_type == BASIC:
+                names = substitutes.get(tree.names[idx], (tree.names[idx],))
+                family = Family(arena, masks=[1 << index.bit(name) for name in names])
+            elif node_type == 'OR':
+                minimizer = SpillingMinimizer(arena)
+                for child in kids:
+                    minimizer.extend(families[child])
+                family = minimizer.finish()
+            elif node_type in ('AND', INHIBIT):
+                family = Family(arena, masks=[0] if kids else [])
+                for child in kids:
+                    previous, family = family, product(family, families[child])
+                    previous.release()
+            elif node_type == VOTE:
+                minimizer = SpillingMinimizer(arena)
+                for combo in itertools.combinations(kids, tree.k[idx]):
+                    partial = Family(arena, masks=[0])
+                    for child in combo:
+                        previous, partial = partial, product(partial, families[child])
+                        previous.release()
+                    minimizer.extend(partial)
+                    partial.release()
+                family = minimizer.finish()
+            else:
+                family = Family(arena, masks=[])
+            families[idx] = family
+            for child in kids:
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    families[child].release()
+                    families[child] = None
+            progress.step()
+        return SpilledCutSets(arena, [families[root] for root in tree.roots], index)
+    except BaseException:
+        arena.close()
+        raise
+
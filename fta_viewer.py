@@ -0,0 +1,239 @@
+# fta_viewer.py
+"""
+故障树画布查看器
+
+基于 tkinter Canvas 的可缩放、可平移查看器。节点按固定大小的瓦片建立空间索引，
+每次重绘只绘制与当前视口相交的节点和边，画布上的图元数量只与视口有关，与树的规模无关。
+缩小到一定比例后依次省略文字、连线，最后以瓦片密度块代替单个节点。
+"""
+import tkinter as tk
+from tkinter import ttk
+
+NODE_COLORS = {'TOP': 'lightblue', 'BASIC': 'lightcoral'}
+GATE_COLOR = 'lightyellow'
+
+
+class FaultTreeViewer(ttk.Frame):
+    TILE_SIZE = 512.0
+    MIN_SCALE = 0.01
+    MAX_SCALE = 4.0
+    TEXT_SCALE = 0.45     # 低于该比例不绘制文字
+    EDGE_SCALE = 0.12     # 低于该比例不绘制连线
+    DENSITY_SCALE = 0.04  # 低于该比例以瓦片密度块代替节点
+
+    def __init__(self, master, font_name="Microsoft YaHei", describe_node=None):
+        super().__init__(master)
+        self.font_name = font_name
+        self.describe_node = describe_node
+
+        self.canvas = tk.Canvas(self, background='white', highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+
+        bottom = ttk.Frame(self)
+        bottom.pack(fill=tk.X)
+        self.info_var = tk.StringVar(value="滚轮缩放，拖动平移，单击节点查看概率与重要度")
+        ttk.Label(bottom, textvariable=self.info_var, font=(font_name, 9)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(bottom, text="适应窗口", command=self.fit).pack(side=tk.RIGHT, padx=5, pady=2)
+
+        self.nodes = []
+        self.edges = []
+        self.node_tiles = {}
+        self.edge_tiles = {}
+        self.selected = None
+        self.scale = 1.0
+        self.origin_x = 0.0
+        self.origin_y = 0.0
+        self._drag_start = None
+        self._dragged = False
+        self._redraw_pending = False
+        self._auto_fit = True
+
+        self.canvas.bind('<Configure>', self.on_resize)
+        self.canvas.bind('<ButtonPress-1>', self.on_press)
+        self.canvas.bind('<B1-Motion>', self.on_drag)
+        self.canvas.bind('<ButtonRelease-1>', self.on_release)
+        self.canvas.bind('<MouseWheel>', lambda event: self.zoom_at(event.x, event.y, 1.2 if event.delta > 0 else 1 / 1.2))
+        self.canvas.bind('<Button-4>', lambda event: self.zoom_at(event.x, event.y, 1.2))
+        self.canvas.bind('<Button-5>', lambda event: self.zoom_at(event.x, event.y, 1 / 1.2))
+
+    def set_graph(self, nodes, edges, message=None):
+        """
+        载入图形。
+
+        nodes 为字典列表，包含 id、type、name、label 以及世界坐标下的中心 x、y 与宽高 w、h（y 轴向下）；
+        edges 为 (父节点下标, 子节点下标) 列表。
+        """
+        self.nodes = nodes
+        self.edges = edges
+        self.selected = None
+        self.node_tiles = {}
+        self.edge_tiles = {}
+
+        for i, node in enumerate(nodes):
+            for tile in self._tiles(node['x'] - node['w'] / 2, node['y'] - node['h'] / 2,
+                                    node['x'] + node['w'] / 2, node['y'] + node['h'] / 2):
+                self.node_tiles.setdefault(tile, []).append(i)
+        for i, (parent, child) in enumerate(edges):
+            a, b = nodes[parent], nodes[child]
+            for tile in self._tiles(min(a['x'], b['x']), min(a['y'], b['y']),
+                                    max(a['x'], b['x']), max(a['y'], b['y'])):
+                self.edge_tiles.setdefault(tile, []).append(i)
+
+        if message:
+            self.info_var.set(message)
+        self._auto_fit = True
+        self.fit()
+
+    def update_labels(self, labels):
+        """按节点 id 替换标签文字（布局不变），只重绘当前视口"""
+        for node in self.nodes:
+            if node['id'] in labels:
+                node['label'] = labels[node['id']]
+        self.schedule_redraw()
+
+    def clear(self, message=""):
+        self.set_graph([], [], message)
+
+    def _tiles(self, x0, y0, x1, y1):
+        size = self.TILE_SIZE
+        for tx in range(int(x0 // size), int(x1 // size) + 1):
+            for ty in range(int(y0 // size), int(y1 // size) + 1):
+                yield tx, ty
+
+    def fit(self):
+        """缩放到完整显示整棵树"""
+        if not self.nodes:
+            self.canvas.delete('all')
+            return
+        width = max(self.canvas.winfo_width(), 100)
+        height = max(self.canvas.winfo_height(), 100)
+        x0 = min(node['x'] - node['w'] / 2 for node in self.nodes)
+        y0 = min(node['y'] - node['h'] / 2 for node in self.nodes)
+        x1 = max(node['x'] + node['w'] / 2 for node in self.nodes)
+        y1 = max(node['y'] + node['h'] / 2 for node in self.nodes)
+        self.scale = max(self.MIN_SCALE, min(self.MAX_SCALE, 1.0,
+                                             (width - 20) / max(x1 - x0, 1), (height - 20) / max(y1 - y0, 1)))
+        self.origin_x = (x0 + x1) / 2 - width / 2 / self.scale
+        self.origin_y = y0 - 10 / self.scale
+        self.schedule_redraw()
+
+    def on_resize(self, event):
+        # 用户缩放或平移之前，窗口尺寸变化时保持整棵树可见
+        if self._auto_fit:
+            self.fit()
+        else:
+            self.schedule_redraw()
+
+    def zoom_at(self, screen_x, screen_y, factor):
+        """以鼠标位置为中心缩放"""
+        self._auto_fit = False
+        new_scale = max(self.MIN_SCALE, min(self.MAX_SCALE, self.scale * factor))
+        world_x = self.origin_x + screen_x / self.scale
+        world_y = self.origin_y + screen_y / self.scale
+        self.scale = new_scale
+        self.origin_x = world_x - screen_x / new_scale
+        self.origin_y = world_y - screen_y / new_scale
+        self.schedule_redraw()
+
+    def on_press(self, event):
+        self._drag_start = (event.x, event.y)
+        self._dragged = False
+
+    def on_drag(self, event):
+        if self._drag_start is None:
+            return
+        dx, dy = event.x - self._drag_start[0], event.y - self._drag_start[1]
+        if abs(dx) + abs(dy) > 2:
+            self._dragged = True
+            self._auto_fit = False
+        self.origin_x -= dx / self.scale
+        self.origin_y -= dy / self.scale
+        self._drag_start = (event.x, event.y)
+        self.schedule_redraw()
+
+    def on_release(self, event):
+        if not self._dragged:
+            self.select_at(event.x, event.y)
+        self._drag_start = None
+
+    def node_at(self, screen_x, screen_y):
+        """命中测试：返回屏幕坐标处节点的下标，未命中返回 None"""
+        world_x = self.origin_x + screen_x / self.scale
+        world_y = self.origin_y + screen_y / self.scale
+        tile = (int(world_x // self.TILE_SIZE), int(world_y // self.TILE_SIZE))
+        for i in self.node_tiles.get(tile, []):
+            node = self.nodes[i]
+            if abs(world_x - node['x']) <= node['w'] / 2 and abs(world_y - node['y']) <= node['h'] / 2:
+                return i
+        return None
+
+    def select_at(self, screen_x, screen_y):
+        index = self.node_at(screen_x, screen_y)
+        self.selected = index
+        if index is not None:
+            node = self.nodes[index]
+            text = self.describe_node(node) if self.describe_node else node['label'].replace('\n', ' ')
+            self.info_var.set(text)
+        self.schedule_redraw()
+
+    def schedule_redraw(self):
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self.redraw)
+
+    def redraw(self):
+        """只绘制与视口相交的瓦片中的图元"""
+        self._redraw_pending = False
+        canvas = self.canvas
+        canvas.delete('all')
+        if not self.nodes:
+            return
+
+        scale = self.scale
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        x0, y0 = self.origin_x, self.origin_y
+        x1, y1 = x0 + width / scale, y0 + height / scale
+        tiles = list(self._tiles(x0, y0, x1, y1))
+
+        def to_screen(x, y):
+            return (x - x0) * scale, (y - y0) * scale
+
+        if scale < self.DENSITY_SCALE:
+            size = self.TILE_SIZE
+            for tile in tiles:
+                count = len(self.node_tiles.get(tile, ()))
+                if count:
+                    sx, sy = to_screen(tile[0] * size, tile[1] * size)
+                    shade = 'gray80' if count < 10 else 'gray60' if count < 100 else 'gray40'
+                    canvas.create_rectangle(sx, sy, sx + size * scale, sy + size * scale, fill=shade, outline='')
+            return
+
+        if scale >= self.EDGE_SCALE:
+            drawn = set()
+            for tile in tiles:
+                for i in self.edge_tiles.get(tile, ()):
+                    if i in drawn:
+                        continue
+                    drawn.add(i)
+                    parent, child = self.nodes[self.edges[i][0]], self.nodes[self.edges[i][1]]
+                    canvas.create_line(*to_screen(parent['x'], parent['y'] + parent['h'] / 2),
+                                       *to_screen(child['x'], child['y'] - child['h'] / 2), fill='gray40')
+
+        font = (self.font_name, max(6, int(9 * scale)))
+        drawn = set()
+        for tile in tiles:
+            for i in self.node_tiles.get(tile, ()):
+                if i in drawn:
+                    continue
+                drawn.add(i)
+                node = self.nodes[i]
+                left, top = to_screen(node['x'] - node['w'] / 2, node['y'] - node['h'] / 2)
+                right, bottom = to_screen(node['x'] + node['w'] / 2, node['y'] + node['h'] / 2)
+                fill = NODE_COLORS.get(node['type'], GATE_COLOR)
+                outline = 'red' if i == self.selected else 'black'
+                if node['type'] in NODE_COLORS:
+                    canvas.create_rectangle(left, top, right, bottom, fill=fill, outline=outline)
+                else:
+                    canvas.create_oval(left, top, right, bottom, fill=fill, outline=outline)
+                if scale >= self.TEXT_SCALE:
+                    canvas.create_text((left + right) / 2, (top + bottom) / 2, text=node['label'], font=font)